@@ -5,15 +5,21 @@ from datetime import datetime
 from logging import getLogger
 import collections
 
+from flask import g
+from flask import has_request_context
+from sqlalchemy import event
+from sqlalchemy.orm.session import Session
 from sqlalchemy.sql.expression import tuple_
 
 from ggrc import db
 from ggrc import models
 from ggrc.automapper.rules import rules
 from ggrc.login import get_current_user
+from ggrc.models import object_link
 from ggrc.models.relationship import Relationship
 from ggrc.rbac.permissions import is_allowed_update
 from ggrc.services.common import Resource, get_cache
+from ggrc.services.common import mark_query_tables_modified
 from ggrc.utils import benchmark, with_nop
 
 
@@ -32,26 +38,33 @@ class Stub(collections.namedtuple("Stub", ["type", "id"])):
     return Stub(relationship.destination_type, relationship.destination_id)
 
 
-class AutomapperGenerator(object):
+class RelationshipAdjacency(object):
+  """Index of relationship neighbours of object stubs.
 
-  def __init__(self, use_benchmark=True):
-    self.processed = set()
-    self.queue = set()
-    self.cache = collections.defaultdict(set)
-    self.instance_cache = {}
-    self.auto_mappings = set()
-    if use_benchmark:
-      self.benchmark = benchmark
-    else:
-      self.benchmark = with_nop
+  Only the type and id columns of relationships are fetched, so no model
+  instances get loaded while building the index. The neighbourhood of every
+  stub in the index is complete. The index used within a request is shared
+  between all automapper runs and kept up to date with relationships that
+  are inserted or deleted through the ORM in that request. Code that inserts
+  relationships without the ORM has to drop the shared index.
+  """
 
-  def related(self, obj):
-    if obj in self.cache:
-      return self.cache[obj]
-    # Pre-fetch neighborhood for enqueued object since we're gonna need that
-    # results in a few steps. This drastically reduces number of queries.
-    stubs = {s for rel in self.queue for s in rel}
-    stubs.add(obj)
+  def __init__(self):
+    self.neighbours = {}
+
+  def __contains__(self, stub):
+    return stub in self.neighbours
+
+  def get(self, stub, default=()):
+    return self.neighbours.get(stub, default)
+
+  def load(self, stubs):
+    """Fetch neighbourhoods of all stubs that are not in the index yet."""
+    stubs = {stub for stub in stubs if stub not in self.neighbours}
+    if not stubs:
+      return
+    for stub in stubs:
+      self.neighbours[stub] = set()
     # Union is here to convince mysql to use two separate indices and
     # merge te results. Just using `or` results in a full-table scan
     # Manual column list avoids loading the full object which would also try to
@@ -69,25 +82,111 @@ class AutomapperGenerator(object):
                    Relationship.destination_id).in_(
                        [(s.type, s.id) for s in stubs]))
     ).all()
-    batch_requests = collections.defaultdict(set)
     for (src_type, src_id, dst_type, dst_id) in relationships:
       src = Stub(src_type, src_id)
       dst = Stub(dst_type, dst_id)
       # only store a neighbor if we queried for it since this way we know
       # we'll be storing complete neighborhood by the end of the loop
-      batch_requests[src_type].add(src_id)
-      batch_requests[dst_type].add(dst_id)
       if src in stubs:
-        self.cache[src].add(dst)
+        self.neighbours[src].add(dst)
       if dst in stubs:
-        self.cache[dst].add(src)
+        self.neighbours[dst].add(src)
+
+  def add(self, src, dst):
+    """Add a new edge to neighbourhoods that are already in the index."""
+    if src in self.neighbours:
+      self.neighbours[src].add(dst)
+    if dst in self.neighbours:
+      self.neighbours[dst].add(src)
+
+  def remove(self, src, dst):
+    """Remove an edge from neighbourhoods that are in the index."""
+    if src in self.neighbours:
+      self.neighbours[src].discard(dst)
+    if dst in self.neighbours:
+      self.neighbours[dst].discard(src)
+
+
+def get_relationship_adjacency():
+  """Get relationship adjacency index shared within the current request."""
+  if not has_request_context():
+    return RelationshipAdjacency()
+  adjacency = getattr(g, "_automapper_adjacency", None)
+  if adjacency is None:
+    adjacency = RelationshipAdjacency()
+    setattr(g, "_automapper_adjacency", adjacency)
+  return adjacency
+
+
+def _get_request_adjacency():
+  if not has_request_context():
+    return None
+  return getattr(g, "_automapper_adjacency", None)
+
 
-    for type_, ids in batch_requests.iteritems():
-      model = getattr(models.all_models, type_)
-      instances = model.query.filter(model.id.in_(ids))
-      for instance in instances:
-        self.instance_cache[Stub(type_, instance.id)] = instance
-    return self.cache[obj]
+def drop_relationship_adjacency(*_):
+  """Drop the shared index when it can no longer be kept consistent."""
+  if has_request_context() and hasattr(g, "_automapper_adjacency"):
+    delattr(g, "_automapper_adjacency")
+
+
+def _add_relationship_to_adjacency(_, __, relationship):
+  adjacency = _get_request_adjacency()
+  if adjacency is not None:
+    adjacency.add(Stub.from_source(relationship),
+                  Stub.from_destination(relationship))
+
+
+def _remove_relationship_from_adjacency(_, __, relationship):
+  adjacency = _get_request_adjacency()
+  if adjacency is not None:
+    adjacency.remove(Stub.from_source(relationship),
+                     Stub.from_destination(relationship))
+
+
+class AutomapperGenerator(object):
+
+  def __init__(self, use_benchmark=True):
+    self.processed = set()
+    self.queue = set()
+    self.cache = get_relationship_adjacency()
+    self.instance_cache = {}
+    self.auto_mappings = set()
+    # Edges of auto_mappings, which are not in the shared index until they
+    # are inserted.
+    self.pending = collections.defaultdict(set)
+    if use_benchmark:
+      self.benchmark = benchmark
+    else:
+      self.benchmark = with_nop
+
+  def related(self, obj):
+    if obj not in self.cache:
+      # Pre-fetch neighborhood for enqueued object since we're gonna need
+      # that results in a few steps. This drastically reduces number of
+      # queries.
+      stubs = {s for rel in self.queue for s in rel}
+      stubs.add(obj)
+      self.cache.load(stubs)
+    return self.cache.get(obj, set()) | self.pending.get(obj, set())
+
+  def _get_instance(self, stub):
+    """Get model instance for a stub.
+
+    Instances are only needed for following implicit mappings, so they are
+    loaded when first needed together with all enqueued stubs of the same
+    type.
+    """
+    if stub not in self.instance_cache:
+      ids = {s.id for rel in self.queue for s in rel
+             if s.type == stub.type and s not in self.instance_cache}
+      ids.add(stub.id)
+      model = getattr(models.all_models, stub.type)
+      for id_ in ids:
+        self.instance_cache[Stub(stub.type, id_)] = None
+      for instance in model.query.filter(model.id.in_(ids)):
+        self.instance_cache[Stub(stub.type, instance.id)] = instance
+    return self.instance_cache[stub]
 
   def relate(self, src, dst):
     if src < dst:
@@ -96,7 +195,10 @@ class AutomapperGenerator(object):
       return (dst, src)
 
   def generate_automappings(self, relationship):
+    # the shared index might have been dropped since the last run
+    self.cache = get_relationship_adjacency()
     self.auto_mappings = set()
+    self.pending = collections.defaultdict(set)
     with self.benchmark("Automapping generate_automappings"):
       # initial relationship is special since it is already created and
       # processing it would abort the loop so we manually enqueue the
@@ -163,13 +265,20 @@ class AutomapperGenerator(object):
           "automapping_id": parent_relationship.id}
           for src, dst in self.auto_mappings
           if (src, dst) != original]))  # (src, dst) is sorted
+      mark_query_tables_modified([Relationship.__tablename__])
+      object_link.insert_missing_links(
+          "relationship",
+          Relationship.automapping_id == parent_relationship.id,
+      )
+      for src, dst in self.auto_mappings:
+        self.cache.add(src, dst)
       cache = get_cache(create=True)
       if cache:
         # Add inserted relationships into new objects collection of the cache,
         # so that they will be logged within event and appropriate revisions
         # will be created.
         cache.new.update(
-            (relationship, relationship.log_json())
+            (relationship, None)
             for relationship in Relationship.query.filter_by(
                 automapping_id=parent_relationship.id,
                 modified_by_id=current_user.id,
@@ -193,14 +302,12 @@ class AutomapperGenerator(object):
           self.queue.add(entry)
 
   def _step_implicit(self, src, dst, implicit):
+    if not implicit:
+      return
     if not hasattr(models.all_models, src.type):
       logger.warning('Automapping by attr: cannot find model %s', src.type)
       return
-    instance = self.instance_cache.get(src)
-    if instance is None:
-      model = getattr(models.all_models, src.type)
-      instance = model.query.filter(model.id == src.id).first()
-      self.instance_cache[src] = instance
+    instance = self._get_instance(src)
     if instance is None:
       logger.warning("Automapping by attr: cannot load model %s: %s",
                      src.type, src.id)
@@ -224,17 +331,15 @@ class AutomapperGenerator(object):
         )
 
   def _ensure_relationship(self, src, dst):
-    if dst in self.cache.get(src, []):
+    if dst in self.cache.get(src, []) or dst in self.pending.get(src, []):
       return False
     if src in self.cache.get(dst, []):
       return False
 
     self.auto_mappings.add((src, dst))
 
-    if src in self.cache:
-      self.cache[src].add(dst)
-    if dst in self.cache:
-      self.cache[dst].add(src)
+    self.pending[src].add(dst)
+    self.pending[dst].add(src)
 
     return True
 
@@ -278,6 +383,14 @@ def register_automapping_listeners():
   """Register event listeners for auto mapper."""
   # pylint: disable=unused-variable,unused-argument
 
+  event.listen(Relationship, "after_insert", _add_relationship_to_adjacency)
+  event.listen(Relationship, "after_delete",
+               _remove_relationship_from_adjacency)
+  event.listen(Relationship, "after_update", drop_relationship_adjacency)
+  # unlike the other rollback listeners, this one also runs for savepoints,
+  # since the index can hold relationships inserted in a rolled back one
+  event.listen(Session, "after_rollback", drop_relationship_adjacency)
+
   @Resource.collection_posted.connect_via(Relationship)
   def handle_relationship_collection_post(sender, objects=None, **kwargs):
     """Handle bulk creation of relationships.
@@ -6,6 +6,7 @@
 # pylint: disable=no-name-in-module
 # false positive for RelationshipProperty
 
+from collections import Mapping
 from datetime import datetime
 
 from flask import g
@@ -461,9 +462,9 @@ class LazyStubRepresentation(object):
 
 
 def walk_representation(obj):  # noqa
-  if isinstance(obj, dict):
+  if isinstance(obj, Mapping):
     for key, value in obj.items():
-      if isinstance(value, dict):
+      if isinstance(value, Mapping):
         for attr in walk_representation(value):
           yield attr
       elif isinstance(value, (list, tuple)):
@@ -473,7 +474,7 @@ def walk_representation(obj):  # noqa
         yield value, key, obj
   elif isinstance(obj, (list, tuple)):
     for index, value in enumerate(obj):
-      if isinstance(value, dict):
+      if isinstance(value, Mapping):
         for attr in walk_representation(value):
           yield attr
       elif isinstance(value, (list, tuple)):
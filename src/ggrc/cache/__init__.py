@@ -4,4 +4,5 @@
 
 from .localcache import LocalCache
 from .memcache import MemCache
+from .backends import get_memcache_client
 from .cachemanager import CacheManager
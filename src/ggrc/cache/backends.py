@@ -0,0 +1,544 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Memcache client backends.
+
+All code that talks to memcache directly uses the client stored in
+MemCache.memcache_client. Clients in this module implement the subset of the
+App Engine memcache.Client API that is used in gGRC, so deployments outside
+App Engine get the same object and permission caching:
+
+  get, gets, get_multi, set, set_multi, add, add_multi, cas, cas_multi,
+  delete, delete_multi, incr and flush_all.
+
+The backend is selected with the MEMCACHE_BACKEND setting:
+
+  appengine -- App Engine memcache service (default)
+  memcached -- memcached servers listed in MEMCACHE_SERVERS
+  local -- bounded in-process LRU cache with MEMCACHE_LOCAL_SIZE entries
+"""
+
+import binascii
+import cPickle
+import hashlib
+import socket
+import threading
+import time
+from collections import OrderedDict
+from logging import getLogger
+
+from ggrc import settings
+
+
+# pylint: disable=invalid-name
+logger = getLogger(__name__)
+
+# Return values of delete, same as in App Engine memcache
+DELETE_NETWORK_FAILURE = 0
+DELETE_ITEM_MISSING = 1
+DELETE_SUCCESSFUL = 2
+
+# Expiration times larger than this are absolute unix timestamps
+MAX_RELATIVE_EXPIRATION = 60 * 60 * 24 * 30
+
+MAX_KEY_LENGTH = 250
+
+
+def _get_expires_at(expiration_time):
+  """Get absolute expiration timestamp or None if the value never expires."""
+  if not expiration_time:
+    return None
+  if expiration_time > MAX_RELATIVE_EXPIRATION:
+    return expiration_time
+  return time.time() + expiration_time
+
+
+def _incremented(value, delta):
+  """Add delta to a counter value, decrements stop at zero."""
+  return max(long(value) + delta, 0)
+
+
+class LRUStore(object):
+  """Thread safe bounded store that evicts least recently used entries.
+
+  Values are stored pickled so that cached objects can not be modified
+  through references held by callers, same as with a remote cache.
+  """
+
+  def __init__(self, max_size):
+    self.max_size = max_size
+    self.lock = threading.RLock()
+    self._entries = OrderedDict()
+    self._next_cas_id = 0
+
+  def get(self, key):
+    """Get a (pickled value, cas id) pair or None for missing keys."""
+    entry = self._entries.pop(key, None)
+    if entry is None:
+      return None
+    data, expires_at, cas_id = entry
+    if expires_at is not None and expires_at <= time.time():
+      return None
+    self._entries[key] = entry
+    return data, cas_id
+
+  def put(self, key, value, expiration_time=0):
+    """Store a value and evict the oldest entries above max_size."""
+    self._next_cas_id += 1
+    self._entries.pop(key, None)
+    self._entries[key] = (
+        cPickle.dumps(value, cPickle.HIGHEST_PROTOCOL),
+        _get_expires_at(expiration_time),
+        self._next_cas_id,
+    )
+    while len(self._entries) > self.max_size:
+      self._entries.popitem(last=False)
+
+  def delete(self, key):
+    """Remove a key and return True if it was stored."""
+    return self.get(key) is not None and \
+        self._entries.pop(key, None) is not None
+
+  def clear(self):
+    self._entries.clear()
+
+
+class LRUCacheClient(object):
+  """Memcache client that keeps values in a process local LRUStore.
+
+  Entries are not shared between processes, so this backend is only
+  suitable for single process deployments or for data where short lived
+  staleness between processes is acceptable.
+  """
+
+  def __init__(self, store):
+    self.store = store
+    self._cas_ids = {}
+
+  def _get(self, key, for_cas=False):
+    with self.store.lock:
+      entry = self.store.get(key)
+    if entry is None:
+      return None
+    data, cas_id = entry
+    if for_cas:
+      self._cas_ids[key] = cas_id
+    return cPickle.loads(data)
+
+  def get(self, key):
+    return self._get(key)
+
+  def gets(self, key):
+    return self._get(key, for_cas=True)
+
+  def get_multi(self, keys, key_prefix='', namespace=None, for_cas=False):
+    """Get a dict with values of all keys that are found in the cache."""
+    # pylint: disable=unused-argument
+    result = {}
+    for key in keys:
+      value = self._get(key_prefix + key, for_cas)
+      if value is not None:
+        result[key] = value
+    return result
+
+  def set(self, key, value, time=0):
+    # pylint: disable=redefined-outer-name
+    with self.store.lock:
+      self.store.put(key, value, time)
+    return True
+
+  def set_multi(self, mapping, time=0, key_prefix=''):
+    # pylint: disable=redefined-outer-name
+    for key, value in mapping.iteritems():
+      self.set(key_prefix + key, value, time)
+    return []
+
+  def add(self, key, value, time=0):
+    # pylint: disable=redefined-outer-name
+    with self.store.lock:
+      if self.store.get(key) is not None:
+        return False
+      self.store.put(key, value, time)
+    return True
+
+  def add_multi(self, mapping, time=0, key_prefix=''):
+    """Add values of missing keys and return keys that were not added."""
+    # pylint: disable=redefined-outer-name
+    return [key for key, value in mapping.iteritems()
+            if not self.add(key_prefix + key, value, time)]
+
+  def cas(self, key, value, time=0):
+    """Set a value if it did not change since it was fetched with gets."""
+    # pylint: disable=redefined-outer-name
+    cas_id = self._cas_ids.pop(key, None)
+    if cas_id is None:
+      return False
+    with self.store.lock:
+      entry = self.store.get(key)
+      if entry is None or entry[1] != cas_id:
+        return False
+      self.store.put(key, value, time)
+    return True
+
+  def cas_multi(self, mapping, time=0):
+    """Compare and set all values and return keys that were not set."""
+    # pylint: disable=redefined-outer-name
+    return [key for key, value in mapping.iteritems()
+            if not self.cas(key, value, time)]
+
+  def delete(self, key, seconds=0):
+    # pylint: disable=unused-argument
+    with self.store.lock:
+      deleted = self.store.delete(key)
+    return DELETE_SUCCESSFUL if deleted else DELETE_ITEM_MISSING
+
+  def delete_multi(self, keys, seconds=0, key_prefix=''):
+    for key in keys:
+      self.delete(key_prefix + key, seconds)
+    return True
+
+  def incr(self, key, delta=1, namespace=None, initial_value=None):
+    """Increment a counter and return its new value.
+
+    Returns None if the key is missing and there is no initial_value.
+    """
+    # pylint: disable=unused-argument
+    with self.store.lock:
+      entry = self.store.get(key)
+      if entry is not None:
+        value = cPickle.loads(entry[0])
+      elif initial_value is not None:
+        value = initial_value
+      else:
+        return None
+      value = _incremented(value, delta)
+      self.store.put(key, value)
+    return value
+
+  def flush_all(self):
+    with self.store.lock:
+      self.store.clear()
+    return True
+
+
+class MemcachedConnection(object):
+  """Buffered socket connection to a single memcached server."""
+
+  def __init__(self, address, timeout):
+    self.address = address
+    self.timeout = timeout
+    self.socket = None
+    self.buffer = ""
+
+  def _connect(self):
+    if self.socket is None:
+      self.socket = socket.create_connection(self.address, self.timeout)
+      self.buffer = ""
+
+  def close(self):
+    if self.socket is not None:
+      try:
+        self.socket.close()
+      except socket.error:
+        pass
+    self.socket = None
+    self.buffer = ""
+
+  def send(self, data):
+    self._connect()
+    self.socket.sendall(data)
+
+  def _fill(self):
+    data = self.socket.recv(65536)
+    if not data:
+      raise socket.error("Connection closed by {}:{}".format(*self.address))
+    self.buffer += data
+
+  def readline(self):
+    """Read a single response line without the trailing CRLF."""
+    while "\r\n" not in self.buffer:
+      self._fill()
+    line, self.buffer = self.buffer.split("\r\n", 1)
+    return line
+
+  def read(self, length):
+    """Read a data block of the given length and its trailing CRLF."""
+    while len(self.buffer) < length + 2:
+      self._fill()
+    data = self.buffer[:length]
+    self.buffer = self.buffer[length + 2:]
+    return data
+
+
+class MemcachedClient(object):
+  """Memcache client for servers that speak the memcached text protocol.
+
+  Keys are distributed between servers by their crc32 checksum. Commands for
+  multiple keys are pipelined, so every multi operation needs a single round
+  trip per server. Connections are kept open and are not shared between
+  threads.
+  """
+
+  FLAG_PICKLE = 1
+  FLAG_INTEGER = 2
+
+  # Number of keys in a single get command
+  GET_CHUNK_SIZE = 100
+
+  _local = threading.local()
+
+  def __init__(self, servers, timeout=3):
+    self.servers = [self._parse_address(server) for server in servers]
+    self.timeout = timeout
+    self._cas_ids = {}
+
+  @staticmethod
+  def _parse_address(server):
+    host, _, port = server.partition(":")
+    return host, int(port or 11211)
+
+  def _get_connection(self, address):
+    connections = getattr(self._local, "connections", None)
+    if connections is None:
+      connections = self._local.connections = {}
+    if address not in connections:
+      connections[address] = MemcachedConnection(address, self.timeout)
+    return connections[address]
+
+  @staticmethod
+  def _server_key(key):
+    """Get a key that is valid in the memcached protocol."""
+    if isinstance(key, unicode):
+      key = key.encode("utf-8")
+    if len(key) > MAX_KEY_LENGTH or any(c in key for c in " \r\n\0\t"):
+      key = "sha1:" + hashlib.sha1(key).hexdigest()
+    return key
+
+  def _group_by_server(self, keys):
+    """Group keys by server address.
+
+    Returns:
+      dict of server address to a dict of server keys to original keys.
+    """
+    groups = {}
+    for key in keys:
+      server_key = self._server_key(key)
+      address = self.servers[
+          (binascii.crc32(server_key) & 0xffffffff) % len(self.servers)]
+      groups.setdefault(address, OrderedDict())[server_key] = key
+    return groups
+
+  def _encode(self, value):
+    if isinstance(value, str):
+      return value, 0
+    if isinstance(value, (int, long)) and not isinstance(value, bool):
+      return str(value), self.FLAG_INTEGER
+    return cPickle.dumps(value, cPickle.HIGHEST_PROTOCOL), self.FLAG_PICKLE
+
+  def _decode(self, data, flags):
+    if flags & self.FLAG_PICKLE:
+      return cPickle.loads(data)
+    if flags & self.FLAG_INTEGER:
+      return long(data)
+    return data
+
+  def _run(self, address, commands, parse):
+    """Send pipelined commands to a server and parse their responses.
+
+    Args:
+      address: server address.
+      commands: list of command strings.
+      parse: function that reads the response of a single command from the
+        connection.
+
+    Returns:
+      list of parsed responses or None on connection errors.
+    """
+    connection = self._get_connection(address)
+    try:
+      connection.send("".join(commands))
+      return [parse(connection) for _ in commands]
+    except socket.error as error:
+      logger.error("Memcached error on %s:%s: %s",
+                   address[0], address[1], error)
+      connection.close()
+      return None
+
+  @staticmethod
+  def _read_line(connection):
+    return connection.readline()
+
+  def _read_values(self, connection):
+    """Read values of a get or gets command.
+
+    Returns:
+      dict of server key to a (value, cas id) pair.
+    """
+    values = {}
+    line = connection.readline()
+    while line != "END":
+      parts = line.split()
+      if parts[0] != "VALUE":
+        raise socket.error("Unexpected response: {}".format(line))
+      data = connection.read(int(parts[3]))
+      cas_id = parts[4] if len(parts) > 4 else None
+      values[parts[1]] = (self._decode(data, int(parts[2])), cas_id)
+      line = connection.readline()
+    return values
+
+  def get_multi(self, keys, key_prefix='', namespace=None, for_cas=False):
+    """Get a dict with values of all keys that are found in the cache."""
+    # pylint: disable=unused-argument
+    command = "gets" if for_cas else "get"
+    result = {}
+    prefixed = {key_prefix + key: key for key in keys}
+    for address, key_map in self._group_by_server(prefixed).iteritems():
+      server_keys = key_map.keys()
+      commands = [
+          "{} {}\r\n".format(
+              command, " ".join(server_keys[i:i + self.GET_CHUNK_SIZE]))
+          for i in range(0, len(server_keys), self.GET_CHUNK_SIZE)
+      ]
+      for values in self._run(address, commands, self._read_values) or []:
+        for server_key, (value, cas_id) in values.iteritems():
+          key = key_map[server_key]
+          if for_cas:
+            self._cas_ids[key] = cas_id
+          result[prefixed[key]] = value
+    return result
+
+  def get(self, key):
+    return self.get_multi([key]).get(key)
+
+  def gets(self, key):
+    return self.get_multi([key], for_cas=True).get(key)
+
+  def _store_multi(self, command, mapping, time=0, key_prefix=''):
+    """Run a storage command for all values.
+
+    Returns:
+      list of keys that were not stored.
+    """
+    # pylint: disable=redefined-outer-name
+    prefixed = {key_prefix + key: key for key in mapping}
+    not_stored = []
+    for address, key_map in self._group_by_server(prefixed).iteritems():
+      commands = []
+      keys = []
+      for server_key, key in key_map.iteritems():
+        cas_suffix = ""
+        if command == "cas":
+          cas_id = self._cas_ids.pop(key, None)
+          if cas_id is None:
+            not_stored.append(prefixed[key])
+            continue
+          cas_suffix = " " + cas_id
+        data, flags = self._encode(mapping[prefixed[key]])
+        commands.append("{} {} {} {} {}{}\r\n{}\r\n".format(
+            command, server_key, flags, int(time), len(data), cas_suffix,
+            data))
+        keys.append(prefixed[key])
+      if not commands:
+        continue
+      responses = self._run(address, commands, self._read_line)
+      if responses is None:
+        not_stored.extend(keys)
+        continue
+      not_stored.extend(key for key, response in zip(keys, responses)
+                        if response != "STORED")
+    return not_stored
+
+  def set(self, key, value, time=0):
+    # pylint: disable=redefined-outer-name
+    return not self._store_multi("set", {key: value}, time)
+
+  def set_multi(self, mapping, time=0, key_prefix=''):
+    # pylint: disable=redefined-outer-name
+    return self._store_multi("set", mapping, time, key_prefix)
+
+  def add(self, key, value, time=0):
+    # pylint: disable=redefined-outer-name
+    return not self._store_multi("add", {key: value}, time)
+
+  def add_multi(self, mapping, time=0, key_prefix=''):
+    # pylint: disable=redefined-outer-name
+    return self._store_multi("add", mapping, time, key_prefix)
+
+  def cas(self, key, value, time=0):
+    # pylint: disable=redefined-outer-name
+    return not self._store_multi("cas", {key: value}, time)
+
+  def cas_multi(self, mapping, time=0):
+    # pylint: disable=redefined-outer-name
+    return self._store_multi("cas", mapping, time)
+
+  def _delete_multi(self, keys):
+    """Delete keys and get their delete statuses."""
+    statuses = {}
+    for address, key_map in self._group_by_server(keys).iteritems():
+      commands = ["delete {}\r\n".format(server_key) for server_key in key_map]
+      responses = self._run(address, commands, self._read_line)
+      for key, response in zip(key_map.values(), responses or []):
+        statuses[key] = (DELETE_SUCCESSFUL if response == "DELETED"
+                         else DELETE_ITEM_MISSING)
+      if responses is None:
+        statuses.update(dict.fromkeys(key_map.values(),
+                                      DELETE_NETWORK_FAILURE))
+    return statuses
+
+  def delete(self, key, seconds=0):
+    # pylint: disable=unused-argument
+    return self._delete_multi([key])[key]
+
+  def delete_multi(self, keys, seconds=0, key_prefix=''):
+    # pylint: disable=unused-argument
+    statuses = self._delete_multi([key_prefix + key for key in keys])
+    return DELETE_NETWORK_FAILURE not in statuses.values()
+
+  def incr(self, key, delta=1, namespace=None, initial_value=None):
+    """Increment a counter and return its new value.
+
+    Returns None if the key is missing and there is no initial_value.
+    """
+    # pylint: disable=unused-argument
+    command = "incr" if delta >= 0 else "decr"
+    (address, key_map), = self._group_by_server([key]).items()
+    server_key = key_map.keys()[0]
+    for _ in range(2):
+      responses = self._run(
+          address, ["{} {} {}\r\n".format(command, server_key, abs(delta))],
+          self._read_line)
+      if responses is None:
+        return None
+      if responses[0] != "NOT_FOUND":
+        return long(responses[0])
+      if initial_value is None:
+        return None
+      value = _incremented(initial_value, delta)
+      if self.add(key, value):
+        return value
+      # Another client created the counter in the meantime
+    return None
+
+  def flush_all(self):
+    results = [self._run(address, ["flush_all\r\n"], self._read_line)
+               for address in self.servers]
+    return all(result == ["OK"] for result in results)
+
+
+_local_store = None
+
+
+def get_memcache_client():
+  """Get a memcache client for the configured MEMCACHE_BACKEND."""
+  # pylint: disable=global-statement
+  global _local_store
+  backend = getattr(settings, "MEMCACHE_BACKEND", "appengine")
+  if backend == "memcached":
+    return MemcachedClient(settings.MEMCACHE_SERVERS)
+  if backend == "local":
+    if _local_store is None:
+      _local_store = LRUStore(settings.MEMCACHE_LOCAL_SIZE)
+    return LRUCacheClient(_local_store)
+  from google.appengine.api import memcache
+  return memcache.Client()
@@ -2,7 +2,7 @@
 # Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
 
 
-from google.appengine.api import memcache
+from backends import get_memcache_client
 from cache import Cache
 from cache import all_cache_entries
 from collections import OrderedDict
@@ -16,11 +16,11 @@ class MemCache(Cache):
   def __init__(self):
     self.name = 'memcache'
     self.client = None
+    self.memcache_client = get_memcache_client()
 
     for cache_entry in all_cache_entries():
       if cache_entry.cache_type is self.name:
         self.supported_resources[cache_entry.model_plural]=cache_entry.class_name
-        self.memcache_client = memcache.Client()
 
   def get_name(self):
     return self.name
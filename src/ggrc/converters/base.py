@@ -3,6 +3,7 @@
 
 """Base objects for csv file converters."""
 
+import itertools
 from collections import defaultdict
 
 from ggrc import settings
@@ -10,6 +11,8 @@ from ggrc.utils import structures
 from ggrc.cache.memcache import MemCache
 from ggrc.converters import get_exportables
 from ggrc.converters.base_block import BlockConverter
+from ggrc.converters.base_block import EXPORT_CHUNK_SIZE
+from ggrc.converters.base_block import IMPORT_FLUSH_SIZE
 from ggrc.converters.import_helper import extract_relevant_data
 from ggrc.converters.import_helper import split_array
 from ggrc.fulltext import get_indexer
@@ -54,6 +57,9 @@ class Converter(object):
     self.dry_run = kwargs.get("dry_run", True)
     self.csv_data = kwargs.get("csv_data", [])
     self.ids_by_type = kwargs.get("ids_by_type", [])
+    self.chunk_size = kwargs.get("chunk_size")
+    self.flush_size = kwargs.get("flush_size", IMPORT_FLUSH_SIZE)
+    self.progress_callback = kwargs.get("progress_callback")
     self.block_converters = []
     self.new_objects = defaultdict(structures.CaseInsensitiveDict)
     self.shared_state = {}
@@ -66,6 +72,41 @@ class Converter(object):
     self.handle_row_data()
     return self.to_block_array()
 
+  def iter_csv_rows(self, chunk_size=EXPORT_CHUNK_SIZE):
+    """Generate exported csv rows one block chunk at a time.
+
+    This gives the same rows as to_array, but objects are loaded in chunks
+    while the rows are being consumed instead of all at once.
+
+    Args:
+      chunk_size (int): number of objects loaded with a single query.
+
+    Yields:
+      list of strings for each line in the csv file.
+    """
+    if not self.block_converters:
+      self.block_converters_from_ids(load_rows=False)
+    for block_converter in self.block_converters:
+      block_lines = itertools.chain(
+          block_converter.generate_csv_header(),
+          block_converter.iter_csv_body(chunk_size),
+          [[], []],  # multi block csv must have first column empty
+      )
+      for index, line in enumerate(block_lines):
+        line.insert(0, "")
+        if index == 0:
+          line[0] = "Object type"
+        elif index == 1:
+          line[0] = block_converter.name
+        yield line
+
+  def get_csv_width(self):
+    """Get the number of columns in the exported csv file."""
+    if not self.block_converters:
+      return 0
+    return 1 + max(len(converter.fields)
+                   for converter in self.block_converters)
+
   def to_block_array(self):
     """ exporting each in it's own block separated by empty lines
 
@@ -105,10 +146,14 @@ class Converter(object):
     for converter in self.block_converters:
       converter.row_converters_from_csv()
 
-  def block_converters_from_ids(self):
+  def block_converters_from_ids(self, load_rows=True):
     """ fill the block_converters class variable
 
     Generate block converters from a list of tuples with an object name and ids
+
+    Args:
+      load_rows (bool): flag for creating row converters for all objects.
+        Streaming exports load their rows lazily and skip this step.
     """
     object_map = {o.__name__: o for o in self.exportable.values()}
     for object_data in self.ids_by_type:
@@ -120,7 +165,8 @@ class Converter(object):
                                        fields=fields, object_ids=object_ids,
                                        class_name=class_name)
       block_converter.check_block_restrictions()
-      block_converter.row_converters_from_ids()
+      if load_rows:
+        block_converter.row_converters_from_ids()
       self.block_converters.append(block_converter)
 
   def block_converters_from_csv(self):
@@ -150,6 +196,31 @@ class Converter(object):
       converter.handle_row_data()
       converter.import_objects()
 
+  def clear_object_lookups(self):
+    """Forget objects loaded by all blocks after changes are committed."""
+    for converter in self.block_converters:
+      converter.object_lookup.clear()
+
+  def report_progress(self, block_converter, processed_rows):
+    """Send import progress to the progress callback.
+
+    Progress is only reported for imports that commit their changes, since
+    the callback is allowed to commit the session.
+
+    Args:
+      block_converter (BlockConverter): block that is being imported.
+      processed_rows (int): number of committed rows in the block.
+    """
+    if self.dry_run or self.progress_callback is None:
+      return
+    self.progress_callback({
+        "blocks": len(self.block_converters),
+        "block": self.block_converters.index(block_converter) + 1,
+        "name": block_converter.name,
+        "rows": len(block_converter.rows),
+        "processed_rows": processed_rows,
+    })
+
   def import_secondary_objects(self):
     for converter in self.block_converters:
       converter.import_secondary_objects(self.new_objects)
@@ -26,8 +26,10 @@ from ggrc.converters import errors
 from ggrc.converters import get_shared_unique_rules
 from ggrc.converters import pre_commit_checks
 from ggrc.converters.base_row import RowConverter
+from ggrc.converters.lookup import ObjectLookup
 from ggrc.converters.import_helper import get_column_order
 from ggrc.converters.import_helper import get_object_column_definitions
+from ggrc.services.common import get_cache
 from ggrc.services.common import get_modified_objects
 from ggrc.services.common import update_index
 from ggrc.services.common import update_memcache_after_commit
@@ -43,6 +45,12 @@ logger = getLogger(__name__)
 
 CACHE_EXPIRY_IMPORT = 600
 
+# Number of objects loaded at once when streaming an export.
+EXPORT_CHUNK_SIZE = 100
+
+# Number of imported rows flushed to the database at once.
+IMPORT_FLUSH_SIZE = 100
+
 
 class BlockConverter(object):
   # pylint: disable=too-many-public-methods
@@ -97,6 +105,9 @@ class BlockConverter(object):
     # The protected access is a false warning for inflector access.
     self._mapping_cache = None
     self._ca_definitions_cache = None
+    self._option_cache = {}
+    self._category_cache = {}
+    self.object_lookup = ObjectLookup()
     self.converter = converter
     self.offset = options.get("offset", 0)
     self.object_class = options.get("object_class")
@@ -167,6 +178,45 @@ class BlockConverter(object):
       self._ca_definitions_cache = self._create_ca_definitions_cache()
     return self._ca_definitions_cache
 
+  @staticmethod
+  def _create_option_cache(roles):
+    """Create dict cache for options with any of the given roles.
+
+    Returns:
+        dict containing the first option for each lowercase title.
+    """
+    options = models.Option.query.filter(models.Option.role.in_(roles))
+    cache = {}
+    for option in options:
+      cache.setdefault(option.title.lower(), option)
+    return cache
+
+  def get_option_cache(self, roles):
+    roles = tuple(roles)
+    if roles not in self._option_cache:
+      self._option_cache[roles] = self._create_option_cache(roles)
+    return self._option_cache[roles]
+
+  @staticmethod
+  def _create_category_cache(category_base_type):
+    """Create dict cache for categories of the given type.
+
+    Returns:
+        dict containing lists of categories for each lowercase name.
+    """
+    categories = models.CategoryBase.query.filter(
+        models.CategoryBase.type == category_base_type)
+    cache = defaultdict(list)
+    for category in categories:
+      cache[category.name.strip().lower()].append(category)
+    return cache
+
+  def get_category_cache(self, category_base_type):
+    if category_base_type not in self._category_cache:
+      self._category_cache[category_base_type] = \
+          self._create_category_cache(category_base_type)
+    return self._category_cache[category_base_type]
+
   def _create_mapping_cache(self):
     """Create mapping cache for object in the current block."""
     def identifier(obj):
@@ -307,6 +357,23 @@ class BlockConverter(object):
       row = RowConverter(self, self.object_class, row=row,
                          headers=self.headers, index=i)
       self.row_converters.append(row)
+    self.collect_lookup_keys()
+
+  def collect_lookup_keys(self):
+    """Register keys of all objects referenced in the block.
+
+    Each column handler gets the raw values of its column and reports the
+    keys of objects it will look up, so that the objects of each type can be
+    loaded with a single query instead of one query per cell.
+    """
+    with benchmark("Collect lookup keys: {}".format(self.name)):
+      for index, (attr_name, header_dict) in enumerate(self.headers.items()):
+        handler = header_dict["handler"]
+        for row in self.rows:
+          raw_value = row[index].strip() if index < len(row) else ""
+          for model, key, value in handler.get_lookup_keys(
+              self, attr_name, raw_value, **header_dict):
+            self.object_lookup.add(model, key, value)
 
   def row_converters_from_ids(self):
     """ Generate a row converter object for every csv row """
@@ -320,6 +387,40 @@ class BlockConverter(object):
                          headers=self.headers, index=i)
       self.row_converters.append(row)
 
+  def _iter_object_chunks(self, chunk_size):
+    """Load exported objects in id ordered chunks."""
+    object_ids = sorted(set(self.object_ids))
+    for start in range(0, len(object_ids), chunk_size):
+      yield self.object_class.eager_query().filter(
+          self.object_class.id.in_(object_ids[start:start + chunk_size])
+      ).order_by(
+          self.object_class.id
+      ).all()
+
+  def iter_csv_body(self, chunk_size=EXPORT_CHUNK_SIZE):
+    """Generate exported csv rows without loading all objects at once.
+
+    Objects and their custom attribute values are eagerly loaded one chunk at
+    a time and no row converters are kept after their row has been
+    generated, so memory usage is bounded by the chunk size.
+
+    Args:
+      chunk_size (int): number of objects loaded with a single query.
+
+    Yields:
+      list of strings for each exported object.
+    """
+    if self.ignore or not self.object_ids:
+      return
+    index = 0
+    for objects in self._iter_object_chunks(chunk_size):
+      for obj in objects:
+        row = RowConverter(self, self.object_class, obj=obj,
+                           headers=self.headers, index=index)
+        row.handle_row_data()
+        yield row.to_array(self.fields)
+        index += 1
+
   def handle_row_data(self, field_list=None):
     """Call handle row data on all row converters.
 
@@ -387,54 +488,133 @@ class BlockConverter(object):
           row_converter.add_error(errors.UNKNOWN_ERROR)
       self.save_import()
 
-  def _import_objects_prepare(self):
+  def _import_objects_prepare(self, row_converters):
     """Setup all objects and do pre-commit checks for them."""
-    for row_converter in self.row_converters:
+    for row_converter in row_converters:
       row_converter.setup_object()
 
-    for row_converter in self.row_converters:
+    for row_converter in row_converters:
       self._check_object(row_converter)
 
-    self.clean_session_from_ignored_objs()
+    self.clean_session_from_ignored_objs(row_converters)
 
-  def import_objects(self):
-    """Add all objects to the database.
+  def _iter_row_chunks(self):
+    """Split row converters into chunks that are committed separately.
 
-    This function flushes all objects to the database if the dry_run flag is
-    not set and all signals for the imported objects get sent.
+    A block without rows still gets a single empty chunk, so that it is
+    saved the same way as any other block.
     """
-    if self.ignore:
-      return
+    rows = self.row_converters
+    chunk_size = self.converter.chunk_size or len(rows) or 1
+    for start in range(0, len(rows) or 1, chunk_size):
+      yield rows[start:start + chunk_size]
 
-    self._import_objects_prepare()
+  def _import_row_chunk(self, row_converters):
+    """Add objects from the given rows to the database and commit them."""
+    self._import_objects_prepare(row_converters)
 
     if not self.converter.dry_run:
-      new_objects = []
-      for row_converter in self.row_converters:
+      for row_converter in row_converters:
         row_converter.send_pre_commit_signals()
-      for row_converter in self.row_converters:
-        try:
-          row_converter.insert_object()
-          db.session.flush()
-        except exc.SQLAlchemyError as err:
-          db.session.rollback()
-          logger.exception("Import failed with: %s", err.message)
-          row_converter.add_error(errors.UNKNOWN_ERROR)
-        else:
-          if row_converter.is_new and not row_converter.ignore:
-            new_objects.append(row_converter.obj)
+      new_objects = self._insert_objects(row_converters)
       self.send_collection_post_signals(new_objects)
       import_event = self.save_import()
-      for row_converter in self.row_converters:
+      for row_converter in row_converters:
         row_converter.send_post_commit_signals(event=import_event)
 
-  def clean_session_from_ignored_objs(self):
+  def _insert_objects(self, row_converters):
+    """Add objects from the given rows to the session in flushed batches.
+
+    Rows that are already ignored are skipped. Each batch of rows is flushed
+    in its own savepoint. If the flush of a batch fails, only that batch is
+    rolled back and its rows are flushed again one at a time, so that the
+    error is reported on the row that caused it.
+
+    Returns:
+      list of new objects that were flushed.
+    """
+    rows = [row_converter for row_converter in row_converters
+            if not row_converter.ignore]
+    try:
+      # changes made while setting up the rows must not be rolled back with
+      # a failed batch
+      db.session.flush()
+    except exc.SQLAlchemyError as err:
+      db.session.rollback()
+      logger.exception("Import failed with: %s", err.message)
+      for row_converter in rows:
+        row_converter.add_error(errors.UNKNOWN_ERROR)
+      return []
+
+    flush_size = self.converter.flush_size or len(rows) or 1
+    for start in range(0, len(rows), flush_size):
+      batch = rows[start:start + flush_size]
+      if len(batch) > 1 and self._flush_rows(batch) is None:
+        continue
+      for row_converter in batch:
+        err = self._flush_rows([row_converter])
+        if err is not None:
+          logger.error("Import failed with: %s", err.message)
+          row_converter.add_error(errors.UNKNOWN_ERROR)
+    return [row_converter.obj for row_converter in rows
+            if row_converter.is_new and not row_converter.ignore]
+
+  @staticmethod
+  def _flush_rows(row_converters):
+    """Add objects from the given rows to the session and flush them.
+
+    The objects are flushed in a savepoint. If the flush fails, the savepoint
+    is rolled back together with the changes recorded for the revision log.
+
+    Returns:
+      None on success or the error that made the flush fail.
+    """
+    savepoint = db.session.begin_nested()
+    cache = get_cache(create=True)
+    snapshot = cache.copy() if cache else None
+    try:
+      for row_converter in row_converters:
+        row_converter.insert_object()
+      savepoint.commit()
+    except exc.SQLAlchemyError as err:
+      savepoint.rollback()
+      if snapshot is not None:
+        cache.restore(snapshot)
+      return err
+    return None
+
+  def import_objects(self):
+    """Add all objects to the database.
+
+    This function flushes all objects to the database if the dry_run flag is
+    not set and all signals for the imported objects get sent. If the
+    converter has a chunk size set, the rows are set up and committed in
+    chunks of that size and the progress is reported after each chunk.
+    """
+    if self.ignore:
+      return
+
+    processed = 0
+    for row_converters in self._iter_row_chunks():
+      if self.ignore:
+        break
+      self._import_row_chunk(row_converters)
+      processed += len(row_converters)
+      self.converter.report_progress(self, processed)
+
+  def clean_session_from_ignored_objs(self, row_converters=None):
     """Clean DB session from ignored objects.
 
     This function expunges objects from 'db.session' which are in rows that
     marked as 'ignored' before commit.
+
+    Args:
+      row_converters (list of RowConverter): rows that should be checked.
+        Defaults to all rows in the block.
     """
-    for row_converter in self.row_converters:
+    if row_converters is None:
+      row_converters = self.row_converters
+    for row_converter in row_converters:
       obj = row_converter.obj
       try:
         if row_converter.ignore and obj in db.session:
@@ -465,6 +645,7 @@ class BlockConverter(object):
       update_memcache_before_commit(
           self, modified_objects, CACHE_EXPIRY_IMPORT)
       db.session.commit()
+      self.converter.clear_object_lookups()
       update_memcache_after_commit(self)
       update_index(db.session, modified_objects)
       return import_event
@@ -0,0 +1,102 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Cached titles and types of custom attribute definitions.
+
+Filters on custom attributes are compiled differently for date and non-date
+attributes, so compiling a filter needs the types of the definitions with a
+given title. The titles and types of all definitions of a definition type are
+loaded with a single query and kept in a process wide cache. Cached metadata
+are stamped with the memcache generation of the definitions table, which is
+bumped after every commit that modifies definitions, and are reloaded once
+the generation changes. Without memcache there is no way to tell that another
+process modified definitions, so metadata are only kept by a single
+CadMetadata instance.
+"""
+
+import collections
+
+from ggrc import db
+from ggrc import settings
+from ggrc.converters.lookup import normalize_key
+from ggrc.models.custom_attribute_definition import CustomAttributeDefinition
+from ggrc.services import common
+from ggrc.utils import benchmark
+
+
+# Metadata shared by all requests of the process, by normalized definition
+# type: (generation, {normalized title: frozenset of attribute types})
+_shared_metadata = {}  # pylint: disable=invalid-name
+
+
+def get_generation():
+  """Get the generation of the definitions table or None without memcache."""
+  if not getattr(settings, "MEMCACHE_MECHANISM", False):
+    return None
+  # pylint: disable=protected-access
+  memcache_client = common._get_cache_manager().cache_object.memcache_client
+  return memcache_client.get(common.get_query_result_generation_key(
+      CustomAttributeDefinition.__tablename__)) or 0
+
+
+def _load(definition_type):
+  """Load types of all definitions of a definition type by title."""
+  attribute_types = collections.defaultdict(set)
+  with benchmark("Load CAD metadata: {}".format(definition_type)):
+    query = db.session.query(
+        CustomAttributeDefinition.title,
+        CustomAttributeDefinition.attribute_type,
+    ).filter(
+        CustomAttributeDefinition.definition_type == definition_type,
+    )
+    for title, attribute_type in query:
+      attribute_types[normalize_key(title)].add(attribute_type)
+  return {title: frozenset(types)
+          for title, types in attribute_types.iteritems()}
+
+
+class CadMetadata(object):
+  """Titles and types of custom attribute definitions used by one request.
+
+  The generation of the definitions table is read once, the first time it is
+  needed, so all filters of a request are compiled with the same metadata.
+  """
+
+  _UNKNOWN = object()
+
+  def __init__(self):
+    self._generation = self._UNKNOWN
+    self._metadata = {}
+
+  @property
+  def generation(self):
+    """Generation of the definitions table or None without memcache."""
+    if self._generation is self._UNKNOWN:
+      self._generation = get_generation()
+    return self._generation
+
+  def get_attribute_types(self, definition_type, title):
+    """Get the set of types of definitions with the given title."""
+    metadata = self._get_metadata(definition_type)
+    return metadata.get(normalize_key(title), frozenset())
+
+  def _get_metadata(self, definition_type):
+    """Get types of all definitions of a definition type by title.
+
+    Definition types and titles are compared the way MySQL compares them,
+    ignoring case and trailing spaces.
+    """
+    key = normalize_key(definition_type)
+    if key in self._metadata:
+      return self._metadata[key]
+    generation = self.generation
+    shared = _shared_metadata.get(key)
+    if generation is not None and shared is not None and \
+       shared[0] == generation:
+      metadata = shared[1]
+    else:
+      metadata = _load(definition_type)
+      if generation is not None:
+        _shared_metadata[key] = (generation, metadata)
+    self._metadata[key] = metadata
+    return metadata
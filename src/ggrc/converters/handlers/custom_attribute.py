@@ -176,7 +176,7 @@ class CustomAttributeColumHandler(handlers.TextColumnHandler):
     if self.mandatory and not self.raw_value:
       self.add_error(errors.MISSING_VALUE_ERROR, column_name=self.display_name)
       return
-    value = models.Person.query.filter_by(email=self.raw_value).first()
+    value = self.object_lookup.get(models.Person, "email", self.raw_value)
     if self.mandatory and not value:
       self.add_error(errors.WRONG_VALUE, column_name=self.display_name)
     return value
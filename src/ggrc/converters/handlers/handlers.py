@@ -7,20 +7,15 @@ from logging import getLogger
 from datetime import date
 from dateutil.parser import parse
 
-from sqlalchemy import and_
-from sqlalchemy import or_
-
 from ggrc import db
 from ggrc.automapper import AutomapperGenerator
 from ggrc.converters import errors
 from ggrc.converters import get_exportables
 from ggrc.login import get_current_user
 from ggrc.models import Audit
-from ggrc.models import CategoryBase
 from ggrc.models import Contract
 from ggrc.models import Assessment
 from ggrc.models import ObjectPerson
-from ggrc.models import Option
 from ggrc.models import Person
 from ggrc.models import Policy
 from ggrc.models import Program
@@ -64,6 +59,27 @@ class ColumnHandler(object):
     if options.get("parse"):
       self.set_value()
 
+  @classmethod
+  def get_lookup_keys(cls, block_converter, key, raw_value, **options):
+    """Get keys of objects that the handler looks up for a raw value.
+
+    Args:
+      block_converter: block containing the column.
+      key: attribute name of the column.
+      raw_value: stripped value of a cell in the column.
+      options: column definition.
+
+    Returns:
+      list of (model, attribute name, value) tuples.
+    """
+    if raw_value and (options.get("unique") or key in ("slug", "email")):
+      return [(block_converter.object_class, key, raw_value)]
+    return []
+
+  @property
+  def object_lookup(self):
+    return self.row_converter.block_converter.object_lookup
+
   def check_unique_consistency(self):
     """Returns true if no object exists with the same unique field."""
     if not self.unique:
@@ -72,10 +88,11 @@ class ColumnHandler(object):
       return
     if not self.row_converter.obj:
       return
-    nr_duplicates = self.row_converter.object_class.query.filter(and_(
-        getattr(self.row_converter.object_class, self.key) == self.value,
-        self.row_converter.object_class.id != self.row_converter.obj.id
-    )).count()
+    nr_duplicates = len([
+        obj for obj in self.object_lookup.get_all(
+            self.row_converter.object_class, self.key, self.value)
+        if obj.id != self.row_converter.obj.id
+    ])
     if nr_duplicates > 0:
       self.add_error(errors.DUPLICATE_VALUE,
                      column_name=self.key,
@@ -166,8 +183,9 @@ class DeleteColumnHandler(ColumnHandler):
       else:
         indexer = self.row_converter.block_converter.converter.indexer
         if indexer is not None:
-          for o in tr.session.deleted:
-            indexer.delete_record(o.id, o.__class__.__name__, commit=False)
+          indexer.delete_records(
+              ((o.id, o.__class__.__name__) for o in tr.session.deleted),
+              commit=False)
         tr.commit()
 
 
@@ -201,6 +219,14 @@ class StatusColumnHandler(ColumnHandler):
 class UserColumnHandler(ColumnHandler):
   """ Handler for primary and secondary contacts """
 
+  @classmethod
+  def get_lookup_keys(cls, block_converter, key, raw_value, **options):
+    keys = super(UserColumnHandler, cls).get_lookup_keys(
+        block_converter, key, raw_value, **options)
+    keys.extend((Person, "email", line.strip().lower())
+                for line in raw_value.splitlines() if line.strip())
+    return keys
+
   def get_users_list(self):
     users = set()
     email_lines = self.raw_value.splitlines()
@@ -217,7 +243,8 @@ class UserColumnHandler(ColumnHandler):
   def get_person(self, email):
     new_objects = self.row_converter.block_converter.converter.new_objects
     if email not in new_objects[Person]:
-      new_objects[Person][email] = Person.query.filter_by(email=email).first()
+      new_objects[Person][email] = self.object_lookup.get(
+          Person, "email", email)
     return new_objects[Person].get(email)
 
   def parse_item(self):
@@ -386,6 +413,14 @@ class MappingColumnHandler(ColumnHandler):
     self.unmap = self.key.startswith(AttributeInfo.UNMAPPING_PREFIX)
     super(MappingColumnHandler, self).__init__(row_converter, key, **options)
 
+  @classmethod
+  def get_lookup_keys(cls, block_converter, key, raw_value, **options):
+    mapping_object = get_exportables().get(options.get("attr_name", ""))
+    if mapping_object is None:
+      return []
+    return [(mapping_object, "slug", slug.lower())
+            for slug in raw_value.splitlines() if slug.strip()]
+
   def parse_item(self):
     """Parse a list of slugs to be mapped.
 
@@ -401,7 +436,7 @@ class MappingColumnHandler(ColumnHandler):
     slugs = set([slug.lower() for slug in lines if slug.strip()])
     objects = []
     for slug in slugs:
-      obj = class_.query.filter_by(slug=slug).first()
+      obj = self.object_lookup.get(class_, "slug", slug)
       if obj:
         if permissions.is_allowed_update_for(obj):
           objects.append(obj)
@@ -487,11 +522,9 @@ class OptionColumnHandler(ColumnHandler):
       return None
     prefixed_key = "{}_{}".format(
         self.row_converter.object_class._inflector.table_singular, self.key)
-    item = Option.query.filter(
-        and_(Option.title == self.raw_value.strip(),
-             or_(Option.role == self.key,
-                 Option.role == prefixed_key))).first()
-    return item
+    options = self.row_converter.block_converter.get_option_cache(
+        [self.key, prefixed_key])
+    return options.get(self.raw_value.strip().lower())
 
   def get_value(self):
     option = getattr(self.row_converter.obj, self.key, None)
@@ -511,6 +544,12 @@ class ParentColumnHandler(ColumnHandler):
   def __init__(self, row_converter, key, **options):
     super(ParentColumnHandler, self).__init__(row_converter, key, **options)
 
+  @classmethod
+  def get_lookup_keys(cls, block_converter, key, raw_value, **options):
+    if cls.parent is None or not raw_value:
+      return []
+    return [(cls.parent, "slug", raw_value)]
+
   def parse_item(self):
     """ get parent object """
     # pylint: disable=protected-access
@@ -520,7 +559,7 @@ class ParentColumnHandler(ColumnHandler):
     slug = self.raw_value
     obj = self.new_objects.get(self.parent, {}).get(slug)
     if obj is None:
-      obj = self.parent.query.filter(self.parent.slug == slug).first()
+      obj = self.object_lookup.get(self.parent, "slug", slug)
     if obj is None:
       self.add_error(errors.UNKNOWN_OBJECT,
                      object_type=self.parent._inflector.human_singular.title(),
@@ -559,25 +598,31 @@ class ParentColumnHandler(ColumnHandler):
 
 class ProgramColumnHandler(ParentColumnHandler):
 
-  def __init__(self, row_converter, key, **options):
-    self.parent = Program
-    super(ProgramColumnHandler, self).__init__(row_converter, key, **options)
+  parent = Program
 
 
 class SectionDirectiveColumnHandler(MappingColumnHandler):
 
+  ALLOWED_DIRECTIVES = [Policy, Regulation, Standard, Contract]
+
+  @classmethod
+  def get_lookup_keys(cls, block_converter, key, raw_value, **options):
+    if not raw_value:
+      return []
+    return [(directive_class, "slug", raw_value)
+            for directive_class in cls.ALLOWED_DIRECTIVES]
+
   def get_directive_from_slug(self, directive_class, slug):
     if slug in self.new_objects[directive_class]:
       return self.new_objects[directive_class][slug]
-    return directive_class.query.filter_by(slug=slug).first()
+    return self.object_lookup.get(directive_class, "slug", slug)
 
   def parse_item(self):
     """ get a directive from slug """
-    allowed_directives = [Policy, Regulation, Standard, Contract]
     if self.raw_value == "":
       return None
     slug = self.raw_value
-    for directive_class in allowed_directives:
+    for directive_class in self.ALLOWED_DIRECTIVES:
       directive = self.get_directive_from_slug(directive_class, slug)
       if directive is not None:
         return [directive]
@@ -609,8 +654,9 @@ class AuditColumnHandler(MappingColumnHandler):
 
 class RequestAuditColumnHandler(ParentColumnHandler):
 
+  parent = Audit
+
   def __init__(self, row_converter, key, **options):
-    self.parent = Audit
     super(RequestAuditColumnHandler, self) \
         .__init__(row_converter, "audit", **options)
 
@@ -708,10 +754,11 @@ class CategoryColumnHandler(ColumnHandler):
     names = [name for name in names if name != ""]
     if not names:
       return None
-    categories = CategoryBase.query.filter(and_(
-        CategoryBase.name.in_(names),
-        CategoryBase.type == self.category_base_type
-    )).all()
+    cache = self.row_converter.block_converter.get_category_cache(
+        self.category_base_type)
+    categories = []
+    for name in set(name.lower() for name in names):
+      categories.extend(cache.get(name, []))
     category_names = set([c.name.strip() for c in categories])
     for name in names:
       if name not in category_names:
@@ -749,9 +796,7 @@ class ControlAssertionColumnHandler(CategoryColumnHandler):
 
 class RequestColumnHandler(ParentColumnHandler):
 
-  def __init__(self, row_converter, key, **options):
-    self.parent = Request
-    super(RequestColumnHandler, self).__init__(row_converter, key, **options)
+  parent = Request
 
 
 class DocumentsColumnHandler(ColumnHandler):
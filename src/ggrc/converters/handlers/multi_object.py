@@ -16,6 +16,17 @@ class ObjectsColumnHandler(handlers.ColumnHandler):
     self.new_slugs = row_converter.block_converter.converter.new_objects
     super(ObjectsColumnHandler, self).__init__(row_converter, key, **options)
 
+  @classmethod
+  def get_lookup_keys(cls, block_converter, key, raw_value, **options):
+    mappable = get_importables()
+    keys = []
+    for line in raw_value.splitlines():
+      object_class, _, slug = line.partition(":")
+      class_ = mappable.get(object_class.strip().lower())
+      if class_ is not None and slug.strip():
+        keys.append((class_, "slug", slug.strip()))
+    return keys
+
   def parse_item(self):
     lines = [line.split(":", 1) for line in self.raw_value.splitlines()]
     objects = []
@@ -30,7 +41,7 @@ class ObjectsColumnHandler(handlers.ColumnHandler):
         self.add_warning(errors.WRONG_VALUE, column_name=self.display_name)
         continue
       new_object_slugs = self.new_slugs[class_]
-      obj = class_.query.filter(class_.slug == slug).first()
+      obj = self.object_lookup.get(class_, "slug", slug)
       if obj:
         objects.append(obj)
       elif not (slug in new_object_slugs and self.dry_run):
@@ -68,6 +68,30 @@ def generate_csv_string(csv_data):
   return body
 
 
+def generate_csv_lines(csv_rows, width=0):
+  """Turn an iterable of string arrays into csv encoded lines.
+
+  This is the streaming counterpart of generate_csv_string. Rows are encoded
+  one at a time, so the whole csv file never has to be held in memory.
+
+  Args:
+    csv_rows: Iterable of lists of unicode values.
+    width: Length to which all shorter rows are padded with empty values.
+
+  Yields:
+    utf-8 encoded csv lines.
+  """
+  output_buffer = StringIO()
+  writer = csv.writer(output_buffer)
+  for row in csv_rows:
+    row = row + [""] * (width - len(row))
+    writer.writerow([val.encode("utf-8") for val in row])
+    yield output_buffer.getvalue()
+    output_buffer.seek(0)
+    output_buffer.truncate()
+  output_buffer.close()
+
+
 def extract_relevant_data(csv_data):
   """ Split csv data into data and metadata """
   striped_data = [map(unicode.strip, line) for line in csv_data]  # noqa
@@ -0,0 +1,102 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Lookup tables for objects referenced in import blocks.
+
+Column handlers look up objects by slug, email or other unique keys for every
+cell they parse. Instead of querying each of those objects separately, the
+keys referenced by all rows of a block are collected before the rows are
+handled, and the objects of each type are loaded with a single IN query the
+first time any of them is needed.
+"""
+
+from collections import defaultdict
+
+from ggrc.utils import benchmark
+
+
+# Maximum number of values in a single IN clause.
+LOOKUP_CHUNK_SIZE = 1000
+
+
+def normalize_key(value):
+  """Normalize a key value the way MySQL compares it.
+
+  String comparisons in the default collation ignore case and trailing
+  spaces.
+  """
+  if isinstance(value, basestring):
+    return value.rstrip(" ").lower()
+  return value
+
+
+class ObjectLookup(object):
+  """Objects looked up by values of their unique keys.
+
+  Values must be registered with add before the objects of their type are
+  first loaded. Objects found by the IN query are stored for each normalized
+  key value, so that registered values without objects are known to be
+  missing without querying them again. Values that were not registered are
+  queried one at a time and their results are stored as well.
+
+  Loaded objects are not updated when the database changes, so the lookup
+  has to be cleared after every commit.
+  """
+
+  def __init__(self):
+    self._values = defaultdict(set)
+    self._tables = {}
+    self._complete = {}
+
+  def add(self, model, attr, value):
+    """Register a key value to be loaded with other values of its type."""
+    self._values[(model, attr)].add(normalize_key(value))
+
+  def clear(self):
+    """Forget all loaded objects, but keep registered values."""
+    self._tables = {}
+    self._complete = {}
+
+  def get(self, model, attr, value):
+    """Get an object with the given key value or None if there is none."""
+    objects = self.get_all(model, attr, value)
+    return objects[0] if objects else None
+
+  def get_all(self, model, attr, value):
+    """Get all objects with the given key value."""
+    key = (model, attr)
+    table = self._get_table(model, attr)
+    normalized = normalize_key(value)
+    if normalized in table:
+      return table[normalized]
+    if normalized in self._values[key] and self._complete[key]:
+      return []
+    table[normalized] = model.query.filter(
+        getattr(model, attr) == value).all()
+    return table[normalized]
+
+  def _get_table(self, model, attr):
+    """Get objects with registered values of a key, loading them if needed.
+
+    If the database matched an object that does not match any registered
+    value after normalization, the lookup is marked as incomplete and
+    registered values without objects are queried again one at a time.
+    """
+    key = (model, attr)
+    if key in self._tables:
+      return self._tables[key]
+    values = sorted(self._values[key])
+    table = {}
+    complete = True
+    column = getattr(model, attr)
+    with benchmark("Load lookup: {}.{}".format(model.__name__, attr)):
+      for start in range(0, len(values), LOOKUP_CHUNK_SIZE):
+        chunk = values[start:start + LOOKUP_CHUNK_SIZE]
+        for obj in model.query.filter(column.in_(chunk)):
+          normalized = normalize_key(getattr(obj, attr))
+          if normalized not in self._values[key]:
+            complete = False
+          table.setdefault(normalized, []).append(obj)
+    self._tables[key] = table
+    self._complete[key] = complete
+    return table
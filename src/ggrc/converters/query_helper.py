@@ -9,13 +9,16 @@ import collections
 import datetime
 import functools
 import operator
+import threading
 
 import flask
 import sqlalchemy as sa
+from sqlalchemy.sql.util import find_tables
 
 from ggrc import db
 from ggrc import models
 from ggrc.login import is_creator
+from ggrc.fulltext import get_indexer
 from ggrc.fulltext.mysql import MysqlRecordProperty as Record
 from ggrc.models import inflector
 from ggrc.models.reflection import AttributeInfo
@@ -23,8 +26,10 @@ from ggrc.models.relationship_helper import RelationshipHelper
 from ggrc.models.custom_attribute_definition import CustomAttributeDefinition
 from ggrc.models.custom_attribute_value import CustomAttributeValue
 from ggrc.converters import get_exportables
+from ggrc.converters.cad_metadata import CadMetadata
 from ggrc.rbac import context_query_filter
-from ggrc.utils import query_helpers, benchmark, convert_date_format
+from ggrc.utils import as_json, query_helpers, benchmark, convert_date_format
+from ggrc.utils import keyset
 from ggrc_basic_permissions import UserRole
 
 
@@ -32,6 +37,48 @@ class BadQueryException(Exception):
   pass
 
 
+# Maximum number of compiled filter expressions kept by the process.
+EXPRESSION_CACHE_SIZE = 1000
+
+# Operators whose filters depend only on the expression and on custom
+# attribute definitions. Other operators depend on the current user or on
+# results of other queries, or they query the database while compiling.
+CACHEABLE_OPERATORS = frozenset([
+    "AND", "OR", "=", "!=", "~", "!~", "<", ">", "text_search",
+])
+
+# Compiled filter expressions shared by all requests of the process, see
+# QueryHelper._build_expression.
+_expression_cache = collections.OrderedDict()  # pylint: disable=invalid-name
+_expression_cache_lock = threading.Lock()  # pylint: disable=invalid-name
+
+
+def _is_cacheable(exp):
+  """Check if all operators of an expression tree are cacheable."""
+  if not isinstance(exp, dict) or "op" not in exp:
+    return True
+  if exp["op"].get("name") not in CACHEABLE_OPERATORS:
+    return False
+  if exp["op"]["name"] in ("AND", "OR"):
+    return _is_cacheable(exp["left"]) and _is_cacheable(exp["right"])
+  return True
+
+
+def _get_cached_expression(key):
+  with _expression_cache_lock:
+    cached = _expression_cache.pop(key, None)
+    if cached is not None:
+      _expression_cache[key] = cached
+    return cached
+
+
+def _set_cached_expression(key, cached):
+  with _expression_cache_lock:
+    _expression_cache[key] = cached
+    while len(_expression_cache) > EXPRESSION_CACHE_SIZE:
+      _expression_cache.popitem(last=False)
+
+
 # pylint: disable=too-few-public-methods
 
 class QueryHelper(object):
@@ -96,6 +143,8 @@ class QueryHelper(object):
     self.ca_disabled = ca_disabled
     self._set_attr_name_map()
     self._count = 0
+    self._query_tables = set()
+    self.cad_metadata = CadMetadata()
 
   def _set_attr_name_map(self):
     """ build a map for attributes names and display names
@@ -270,63 +319,101 @@ class QueryHelper(object):
 
     return objects
 
-  def _get_ids(self, object_query):
-    """Get a set of ids of objects described in the filters."""
+  def _add_query_tables(self, query):
+    """Remember the names of tables read by a query or a statement.
 
-    object_name = object_query["object_name"]
-    expression = object_query.get("filters", {}).get("expression")
+    Fulltext records of custom attributes are rewritten only when the
+    objects they belong to change, so custom attribute values are counted
+    as read together with the fulltext table.
+    """
+    statement = getattr(query, "statement", query)
+    for table in find_tables(statement):
+      self._query_tables.add(table.name)
+      if table.name == Record.__tablename__:
+        self._query_tables.add(CustomAttributeValue.__tablename__)
+
+  def _get_filtered_query(self, object_query):
+    """Get a query for ids of objects described in the filters.
 
+    The query is restricted to the objects the current user has the requested
+    permissions for, and is not sorted.
+
+    Returns:
+      query for ids or None if the object query has no filters.
+    """
+    expression = object_query.get("filters", {}).get("expression")
     if expression is None:
-      return set()
-    object_class = self.object_map[object_name]
+      return None
+    object_class = self.object_map[object_query["object_name"]]
     query = db.session.query(object_class.id)
 
     requested_permissions = object_query.get("permissions", "read")
-    with benchmark("Get permissions: _get_ids > _get_type_query"):
+    with benchmark("Get permissions: _get_filtered_query > _get_type_query"):
       type_query = self._get_type_query(object_class, requested_permissions)
       if type_query is not None:
         query = query.filter(type_query)
-    with benchmark("Parse filter query: _get_ids > _build_expression"):
+    with benchmark("Parse filter query: "
+                   "_get_filtered_query > _build_expression"):
       filter_expression = self._build_expression(
           expression,
           object_class,
       )
       if filter_expression is not None:
         query = query.filter(filter_expression)
+    return query
+
+  def _get_ids(self, object_query):
+    """Get a set of ids of objects described in the filters."""
+    query = self._get_filtered_query(object_query)
+    if query is None:
+      return set()
+    object_class = self.object_map[object_query["object_name"]]
+    order_keys = []
     if object_query.get("order_by"):
       with benchmark("Sorting: _get_ids > order_by"):
-        query = self._apply_order_by(
+        query, order_keys = self._join_order_keys(
             object_class,
             query,
             object_query["order_by"],
         )
-    with benchmark("Apply limit"):
-      limit = object_query.get("limit")
-      if limit:
-        ids, total = self._apply_limit(query, limit)
-      else:
-        ids = [obj.id for obj in query]
-        total = len(ids)
-      object_query["total"] = total
+    self._add_query_tables(query)
+    if "after" in object_query:
+      with benchmark("Apply keyset: _get_ids > _apply_keyset"):
+        ids = self._apply_keyset(query, object_class, order_keys,
+                                 object_query)
+    else:
+      query = query.order_by(*keyset.get_order_clauses(order_keys))
+      with benchmark("Apply limit"):
+        limit = object_query.get("limit")
+        if limit:
+          ids, total = self._apply_limit(
+              query, limit, object_query.get("approximate_total", False))
+        else:
+          ids = [obj.id for obj in query]
+          total = len(ids)
+        object_query["total"] = total
 
+    self._clear_similar_objects_query()
+    return ids
+
+  @staticmethod
+  def _clear_similar_objects_query():
+    """Forget the similarity filter of the last evaluated object query."""
     if hasattr(flask.g, "similar_objects_query"):
       # delete similar_objects_query for the case when several queries are
       # POSTed in one request, the first one filters by similarity and the
       # second one doesn't but tries to sort by __similarity__
       delattr(flask.g, "similar_objects_query")
-    return ids
 
   @staticmethod
-  def _apply_limit(query, limit):
-    """Apply limits for pagination.
+  def _parse_limit(limit):
+    """Validate limits for pagination.
 
     Args:
-      query: filter query;
-      limit: a tuple of indexes in format (from, to); objects is sliced to
-            objects[from, to].
+      limit: a tuple of indexes in format (from, to).
 
     Returns:
-      matched objects ids and total count.
+      a tuple of integer indexes (from, to).
     """
     try:
       first, last = limit
@@ -338,26 +425,95 @@ class QueryHelper(object):
       raise BadQueryException("Limit cannot contain negative numbers.")
     elif first >= last:
       raise BadQueryException("Limit start should be smaller than end.")
-    else:
-      page_size = last - first
-      with benchmark("Apply limit: _apply_limit > query_limit"):
-        # Note: limit request syntax is limit:[0,10]. We are counting
-        # offset from 0 as the offset of the initial row for sql is 0 (not 1).
-        ids = [obj.id for obj in query.limit(page_size).offset(first)]
-      with benchmark("Apply limit: _apply_limit > query_count"):
-        if len(ids) < page_size:
-          total = len(ids) + first
-        else:
-          # Note: using func.count() as query.count() is generating additional
-          # subquery
-          count_q = query.statement.with_only_columns([sa.func.count()])
-          total = db.session.execute(count_q).scalar()
+    return first, last
+
+  @classmethod
+  def _apply_limit(cls, query, limit, approximate_total=False):
+    """Apply limits for pagination.
+
+    Args:
+      query: filter query;
+      limit: a tuple of indexes in format (from, to); objects is sliced to
+            objects[from, to].
+      approximate_total: count at most keyset.APPROXIMATE_TOTAL_LIMIT
+            objects.
+
+    Returns:
+      matched objects ids and total count.
+    """
+    first, last = cls._parse_limit(limit)
+    page_size = last - first
+    with benchmark("Apply limit: _apply_limit > query_limit"):
+      # Note: limit request syntax is limit:[0,10]. We are counting
+      # offset from 0 as the offset of the initial row for sql is 0 (not 1).
+      ids = [obj.id for obj in query.limit(page_size).offset(first)]
+    with benchmark("Apply limit: _apply_limit > query_count"):
+      if len(ids) < page_size:
+        total = len(ids) + first
+      elif approximate_total:
+        total, _ = keyset.count(query, approximate=True)
+      else:
+        # Note: using func.count() as query.count() is generating additional
+        # subquery
+        count_q = query.statement.with_only_columns([sa.func.count()])
+        total = db.session.execute(count_q).scalar()
 
     return ids, total
 
+  def _apply_keyset(self, query, model, order_keys, object_query):
+    """Get a page of ids that follows the cursor in object_query["after"].
+
+    The page size is the length of object_query["limit"], and all objects
+    after the cursor are returned if there is no limit. Sets "total" and
+    "next", the cursor of the following page or None if this is the last
+    page, in object_query.
+
+    Returns:
+      list of ids of objects on the page.
+    """
+    order_keys = order_keys + [(model.id, False)]
+    page_size = None
+    if object_query.get("limit"):
+      first, last = self._parse_limit(object_query["limit"])
+      page_size = last - first
+    with benchmark("Apply keyset: _apply_keyset > query_count"):
+      object_query["total"], approximate = keyset.count(
+          query, object_query.get("approximate_total", False))
+      if approximate:
+        object_query["total_approximate"] = True
+    if object_query["after"]:
+      try:
+        values = keyset.decode_token(object_query["after"], order_keys)
+      except ValueError as error:
+        raise BadQueryException(error.message)
+      query = query.filter(keyset.get_seek_filter(order_keys, values))
+    query = query.add_columns(*[expr for expr, _ in order_keys])
+    query = query.order_by(*keyset.get_order_clauses(order_keys))
+    with benchmark("Apply keyset: _apply_keyset > query_page"):
+      if page_size is None:
+        rows = query.all()
+      else:
+        rows = query.limit(page_size + 1).all()
+    object_query["next"] = None
+    if page_size is not None and len(rows) > page_size:
+      rows = rows[:page_size]
+      object_query["next"] = keyset.encode_token(rows[-1][1:])
+    return [row[0] for row in rows]
+
   def _apply_order_by(self, model, query, order_by):
     """Add ordering parameters to a query for objects.
 
+    See _join_order_keys for the supported ordering parameters.
+
+    Returns:
+      the query with sorting parameters.
+    """
+    query, order_keys = self._join_order_keys(model, query, order_by)
+    return query.order_by(*keyset.get_order_clauses(order_keys))
+
+  def _join_order_keys(self, model, query, order_by):
+    """Join tables needed for ordering a query for objects.
+
     This works only on direct model properties and related objects defined with
     foreign keys and fails if any CAs are specified in order_by.
 
@@ -379,7 +535,8 @@ class QueryHelper(object):
     3. Otherwise, raise a NotImplementedError.
 
     Returns:
-      the query with sorting parameters.
+      the query with joined tables and a list of (expression, desc) tuples
+      to order it by.
     """
     def sorting_field_for_person(person):
       """Get right field to sort people by: name if defined or email."""
@@ -396,17 +553,20 @@ class QueryHelper(object):
                  "desc": reverse sort on this field if True}
 
       Returns:
-        ([joins], order) - a tuple of joins required for this ordering to work
-                           and ordering clause itself; join is None if no join
-                           required or [(aliased entity, relationship field)]
-                           if joins required.
+        ([joins], order, desc) - a tuple of joins required for this ordering
+                                 to work, ordering expression itself and the
+                                 sorting direction; join is None if no join
+                                 required or
+                                 [(aliased entity, relationship field)]
+                                 if joins required.
       """
       def by_similarity():
         """Join similar_objects subquery, order by weight from it."""
         join_target = flask.g.similar_objects_query.subquery()
         join_condition = model.id == join_target.c.id
         joins = [(join_target, join_condition)]
-        order = join_target.c.weight
+        # MySQL sums integers as decimals, which can't be stored in cursors
+        order = sa.cast(join_target.c.weight, sa.Integer)
         return joins, order
 
       def by_ca():
@@ -500,23 +660,58 @@ class QueryHelper(object):
           # a simple attribute
           joins, order = None, attr
 
-      if clause.get("desc", False):
-        order = order.desc()
+      return joins, order, bool(clause.get("desc", False))
+
+    order_keys = []
+    for clause in order_by:
+      joins, order, desc = joins_and_order(clause)
+      for join in joins or ():
+        query = query.outerjoin(*join)
+      order_keys.append((order, desc))
 
-      return joins, order
+    return query, order_keys
 
-    join_lists, orders = zip(*[joins_and_order(clause) for clause in order_by])
-    for join_list in join_lists:
-      if join_list is not None:
-        for join in join_list:
-          query = query.outerjoin(*join)
+  def _get_expression_key(self, exp, object_class):
+    """Get the key of a compiled expression in the process wide cache.
 
-    return query.order_by(*orders)
+    Returns:
+      key tuple or None if the compiled expression can not be cached.
+    """
+    if not _is_cacheable(exp):
+      return None
+    generation = self.cad_metadata.generation
+    if generation is None:
+      return None
+    return (object_class.__name__, generation, as_json(exp, sort_keys=True))
 
   def _build_expression(self, exp, object_class):
-    """Make an SQLAlchemy filtering expression from exp expression tree."""
+    """Make an SQLAlchemy filtering expression from exp expression tree.
+
+    Expressions that can be cached are compiled only once per process and
+    version of custom attribute definitions. The tables their compilation
+    has read are added to the tables read by this helper on every use.
+    """
     if "op" not in exp:
       return None
+    key = self._get_expression_key(exp, object_class)
+    if key is None:
+      return self._compile_expression(exp, object_class)
+    cached = _get_cached_expression(key)
+    if cached is None:
+      query_tables = self._query_tables
+      self._query_tables = set()
+      try:
+        expression = self._compile_expression(exp, object_class)
+      finally:
+        compiled_tables, self._query_tables = self._query_tables, query_tables
+      cached = (expression, frozenset(compiled_tables))
+      _set_cached_expression(key, cached)
+    expression, compiled_tables = cached
+    self._query_tables.update(compiled_tables)
+    return expression
+
+  def _compile_expression(self, exp, object_class):
+    """Compile an SQLAlchemy filtering expression from exp expression tree."""
 
     def autocast(o_key, operator_name, value):
       """Try to guess the type of `value` and parse it from the string.
@@ -537,18 +732,12 @@ class QueryHelper(object):
         Returns:
           (bool, bool) - flags indicating the presence of date and non-date CA.
         """
-        cad_query = db.session.query(CustomAttributeDefinition).filter(
-          CustomAttributeDefinition.title == title,
-          CustomAttributeDefinition.definition_type == definition_type,
-        )
-        date_cad = bool(cad_query.filter(
-          CustomAttributeDefinition.
-              attribute_type == CustomAttributeDefinition.ValidTypes.DATE,
-        ).count())
-        non_date_cad = bool(cad_query.filter(
-          CustomAttributeDefinition.
-              attribute_type != CustomAttributeDefinition.ValidTypes.DATE,
-        ).count())
+        self._query_tables.add(CustomAttributeDefinition.__tablename__)
+        attribute_types = self.cad_metadata.get_attribute_types(
+            definition_type, title)
+        date_type = CustomAttributeDefinition.ValidTypes.DATE
+        date_cad = date_type in attribute_types
+        non_date_cad = bool(attribute_types - {date_type})
         return date_cad, non_date_cad
 
       if not isinstance(o_key, basestring):
@@ -680,6 +869,7 @@ class QueryHelper(object):
           types=[object_class.__name__],
       )
       flask.g.similar_objects_query = similar_objects_query
+      self._add_query_tables(similar_objects_query)
       similar_objects_ids = [obj.id for obj in similar_objects_query]
       if similar_objects_ids:
         return object_class.id.in_(similar_objects_ids)
@@ -755,7 +945,7 @@ class QueryHelper(object):
       return object_class.id.in_(
           db.session.query(Record.key).filter(
               Record.type == object_class.__name__,
-              Record.content.ilike(u"%{}%".format(text)),
+              get_indexer().get_text_filter(text),
           ),
       )
 
@@ -782,6 +972,7 @@ class QueryHelper(object):
             is_creator=is_creator(),
         ).alias().c.id
       )
+      self._add_query_tables(res)
       res = res.all()
       if res:
         return object_class.id.in_([obj.id for obj in res])
@@ -809,14 +1000,19 @@ class QueryHelper(object):
         return sa.sql.false()
       model = inflector.get_model(related_type)
       res = []
-      res.extend(RelationshipHelper.person_object(
+
+      def add_people(query):
+        self._add_query_tables(query)
+        res.extend(query)
+
+      add_people(RelationshipHelper.person_object(
           object_class.__name__,
           related_type,
           related_ids,
       ))
 
       if related_type in ('Program', 'Audit'):
-        res.extend(
+        add_people(
             db.session.query(UserRole.person_id).join(model, sa.and_(
                 UserRole.context_id == model.context_id,
                 model.id.in_(related_ids),
@@ -824,7 +1020,7 @@ class QueryHelper(object):
         )
 
         if related_type == "Audit":
-          res.extend(
+          add_people(
               db.session.query(UserRole.person_id).join(
                   models.Program,
                   UserRole.context_id == models.Program.context_id,
@@ -841,7 +1037,7 @@ class QueryHelper(object):
           # ggrc_workflows module is not enabled
           return sa.sql.false()
         else:
-          res.extend(wf_relationship_handler.workflow_person(
+          add_people(wf_relationship_handler.workflow_person(
               object_class.__name__,
               related_type,
               related_ids,
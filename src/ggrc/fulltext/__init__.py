@@ -18,6 +18,18 @@ class Indexer(object):
   def delete_record(self, key):
     raise NotImplementedError()
 
+  def create_records(self, records):
+    for record in records:
+      self.create_record(record)
+
+  def update_records(self, records):
+    for record in records:
+      self.update_record(record)
+
+  def delete_records(self, keys):
+    for key in keys:
+      self.delete_record(key)
+
   def search(self, terms):
     raise NotImplementedError()
 
@@ -35,7 +47,11 @@ class Record(object):
 def resolve_default_text_indexer():
   from ggrc import settings
   db_scheme = settings.SQLALCHEMY_DATABASE_URI.split(':')[0].split('+')[0]
-  return 'ggrc.fulltext.{db_scheme}.Indexer'.format(db_scheme=db_scheme)
+  indexer_name = 'Indexer'
+  if getattr(settings, 'FULLTEXT_INVERTED_INDEX', False):
+    indexer_name = 'InvertedIndexer'
+  return 'ggrc.fulltext.{db_scheme}.{indexer_name}'.format(
+      db_scheme=db_scheme, indexer_name=indexer_name)
 
 
 def get_indexer(indexer=[]):
@@ -14,11 +14,13 @@ from sqlalchemy.schema import DDL
 from sqlalchemy.ext.declarative import declared_attr
 from sqlalchemy.orm import aliased
 from sqlalchemy.sql.expression import select
+from sqlalchemy.sql.expression import tuple_
 from ggrc import db
 from ggrc.login import is_creator
 from ggrc.models import all_models
 from ggrc.utils import query_helpers
 from ggrc.rbac import context_query_filter
+from ggrc.fulltext import ngrams
 from ggrc.fulltext.sql import SqlIndexer
 
 
@@ -57,9 +59,38 @@ event.listen(
 )
 
 
+class MysqlRecordTerm(db.Model):
+  """An n-gram contained in the content of a full text record property."""
+  __tablename__ = 'fulltext_record_terms'
+
+  id = db.Column(db.Integer, primary_key=True)
+  term = db.Column(db.String(ngrams.NGRAM_SIZE), nullable=False)
+  key = db.Column(db.Integer, nullable=False)
+  type = db.Column(db.String(64), nullable=False)
+  property = db.Column(db.String(250), nullable=False)
+
+  @declared_attr
+  def __table_args__(self):
+    return (
+        # Covers candidate lookups by term
+        db.Index('ix_{}_term'.format(self.__tablename__),
+                 'term', 'key', 'type', 'property'),
+        db.Index('ix_{}_key_type'.format(self.__tablename__), 'key', 'type'),
+        {'mysql_engine': 'myisam'},
+    )
+
+
 class MysqlIndexer(SqlIndexer):
   record_type = MysqlRecordProperty
 
+  # Search results are ordered by the rank of their best matching property,
+  # properties that are not listed rank last.
+  PROPERTY_RANKS = {"title": 0}
+
+  def get_text_filter(self, terms):
+    """Get a filter for records with content that contains terms."""
+    return self.record_type.content.contains(terms)
+
   def _get_filter_query(self, terms):
     """Get the whitelist of fields to filter in full text table."""
     whitelist = MysqlRecordProperty.property.in_(
@@ -68,7 +99,14 @@ class MysqlIndexer(SqlIndexer):
     if not terms:
       return whitelist
     elif terms:
-      return and_(whitelist, MysqlRecordProperty.content.contains(terms))
+      return and_(whitelist, self.get_text_filter(terms))
+
+  def _get_sort_key(self):
+    """Get the rank of the property of a record."""
+    return case(
+        [(self.record_type.property == prop, literal(rank))
+         for prop, rank in sorted(self.PROPERTY_RANKS.items())],
+        else_=literal(len(self.PROPERTY_RANKS)))
 
   def get_permissions_query(self, model_names, permission_type='read',
                             permission_model=None):
@@ -159,9 +197,7 @@ class MysqlIndexer(SqlIndexer):
         self.record_type.type.label('type'),
         self.record_type.property.label('property'),
         self.record_type.content.label('content'),
-        case(
-            [(self.record_type.property == 'title', literal(0))],
-            else_=literal(1)).label('sort_key'))
+        self._get_sort_key().label('sort_key'))
 
     query = db.session.query(*columns)
     query = query.filter(self.get_permissions_query(
@@ -185,11 +221,13 @@ class MysqlIndexer(SqlIndexer):
       q = self.search_get_owner_query(q, [k], contact_id)
       q = self._add_extra_params_query(q, k, v)
       unions.append(q)
-    all_queries = union(*unions)
-    all_queries = aliased(all_queries.order_by(
-        all_queries.c.sort_key, all_queries.c.content))
+    all_queries = aliased(union(*unions))
     return db.session.execute(
-        select([all_queries.c.key, all_queries.c.type]).distinct())
+        select([all_queries.c.key, all_queries.c.type]).group_by(
+            all_queries.c.key, all_queries.c.type,
+        ).order_by(
+            func.min(all_queries.c.sort_key), func.min(all_queries.c.content),
+        ))
 
   def counts(self, terms, types=None, contact_id=None,
              extra_params={}, extra_columns={}):
@@ -222,4 +260,79 @@ class MysqlIndexer(SqlIndexer):
       query = query.union(q)
     return query.all()
 
+
+class MysqlInvertedIndexer(MysqlIndexer):
+  """Fulltext indexer that narrows down searches with an n-gram index.
+
+  Besides the records, all n-grams of the words in their content are stored
+  in fulltext_record_terms. Search terms are matched with LIKE only against
+  the record properties that contain all n-grams of the terms, which are
+  found with the index on that table. Terms without words long enough to
+  have n-grams are matched with LIKE alone.
+
+  Records indexed before this indexer was enabled have no n-grams, so the
+  full text index has to be rebuilt after enabling it.
+  """
+  term_type = MysqlRecordTerm
+
+  PROPERTY_RANKS = {"title": 0, "slug": 1, "description": 2}
+
+  # Maximum number of n-gram rows inserted with a single INSERT.
+  INSERT_CHUNK_SIZE = 10000
+
+  def _get_index_types(self):
+    return [self.record_type, self.term_type]
+
+  @staticmethod
+  def _iter_term_rows(rows):
+    """Generate n-gram rows for the given record rows."""
+    for row in rows:
+      for term in ngrams.get_ngrams(row["content"]):
+        yield {
+            "term": term,
+            "key": row["key"],
+            "type": row["type"],
+            "property": row["property"],
+        }
+
+  def _insert_rows(self, rows):
+    rows = list(rows)
+    super(MysqlInvertedIndexer, self)._insert_rows(rows)
+    table = self.term_type.__table__
+    term_rows = []
+    for term_row in self._iter_term_rows(rows):
+      term_rows.append(term_row)
+      if len(term_rows) == self.INSERT_CHUNK_SIZE:
+        db.session.execute(table.insert(), term_rows)
+        term_rows = []
+    if term_rows:
+      db.session.execute(table.insert(), term_rows)
+
+  def get_text_filter(self, terms):
+    """Get a filter for records with content that contains terms.
+
+    Candidate record properties are those that have all n-grams of terms.
+    """
+    text_filter = super(MysqlInvertedIndexer, self).get_text_filter(terms)
+    query_ngrams = ngrams.get_query_ngrams(terms)
+    if not query_ngrams:
+      return text_filter
+    term = self.term_type
+    candidates = select(
+        [term.key, term.type, term.property]
+    ).where(
+        term.term.in_(query_ngrams)
+    ).group_by(
+        term.key, term.type, term.property
+    ).having(
+        func.count(distinct(term.term)) == len(query_ngrams)
+    )
+    record = self.record_type
+    return and_(
+        tuple_(record.key, record.type, record.property).in_(candidates),
+        text_filter,
+    )
+
+
 Indexer = MysqlIndexer
+InvertedIndexer = MysqlInvertedIndexer
@@ -0,0 +1,66 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tokenization of full text content into n-grams.
+
+Content is split into words and every word is split into overlapping n-grams.
+A text that contains a search term as a substring contains all n-grams of the
+words of that term, so n-grams can be used to select candidate records for
+substring and prefix searches from an inverted index.
+"""
+
+import re
+import unicodedata
+
+
+NGRAM_SIZE = 3
+
+# Search terms with more n-grams are matched only against the first
+# MAX_QUERY_NGRAMS of them, the remaining ones are checked by LIKE anyway.
+MAX_QUERY_NGRAMS = 16
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize(text):
+  """Get a lowercase unicode representation of text without accents.
+
+  This mimics the case and accent insensitive collation used for the
+  fulltext records table.
+  """
+  if text is None:
+    return u""
+  if isinstance(text, str):
+    text = text.decode("utf-8", "replace")
+  elif not isinstance(text, unicode):
+    text = unicode(text)
+  text = unicodedata.normalize("NFKD", text)
+  return u"".join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text):
+  """Split normalized text into words."""
+  return _WORD_RE.findall(normalize(text))
+
+
+def _word_ngrams(word):
+  return (word[i:i + NGRAM_SIZE] for i in range(len(word) - NGRAM_SIZE + 1))
+
+
+def get_ngrams(text):
+  """Get the set of n-grams of all words in text."""
+  ngrams = set()
+  for word in tokenize(text):
+    ngrams.update(_word_ngrams(word))
+  return ngrams
+
+
+def get_query_ngrams(terms):
+  """Get n-grams that every text containing terms must contain.
+
+  Returns:
+    A sorted list of n-grams or None if terms do not contain any word that
+    is long enough to be matched with n-grams.
+  """
+  ngrams = sorted(get_ngrams(terms))
+  return ngrams[:MAX_QUERY_NGRAMS] or None
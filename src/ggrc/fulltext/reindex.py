@@ -0,0 +1,239 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Incremental and resumable rebuild of the full text index.
+
+The index is rebuilt per model in id ordered chunks. Each chunk replaces the
+index rows of its id range, so search keeps working with old data for the
+parts of the table that have not been reached yet. After every chunk the
+position is stored as a checkpoint in the background task that runs the
+reindex. A new reindex task takes over the checkpoint of the latest reindex
+task that did not finish and continues from it instead of starting from
+scratch. Rebuilding a chunk is idempotent, so a chunk that was
+interrupted before its checkpoint got saved is simply rebuilt again.
+"""
+
+import copy
+import time
+from logging import getLogger
+
+from sqlalchemy import orm
+
+from ggrc import db
+from ggrc.fulltext import get_indexer
+from ggrc.fulltext.recordbuilder import fts_record_for
+from ggrc.fulltext.recordbuilder import model_is_indexed
+from ggrc.models import all_models
+
+
+# pylint: disable=invalid-name
+logger = getLogger(__name__)
+
+REINDEX_CHUNK_SIZE = 100
+
+CHECKPOINT_KEY = "reindex"
+
+# Name prefix of background tasks that run the reindex.
+TASK_NAME = "reindex"
+
+# Record types that are not built from an indexed model but must not be
+# treated as stale entries.
+EXTRA_RECORD_TYPES = {"Snapshot"}
+
+
+def get_indexed_models():
+  """Get all models that get their own full text index records.
+
+  Custom attribute values are not in this list since they are indexed
+  together with the objects they belong to.
+
+  Returns:
+    List of model classes sorted by name, so that the order stays the same
+    when an interrupted reindex is resumed.
+  """
+  # Remove model base classes and non searchable objects
+  excluded_models = {
+      all_models.CustomAttributeValue,
+      all_models.Directive,
+      all_models.Option,
+      all_models.SystemOrProcess,
+      all_models.Role,
+  }
+  indexed_models = {model for model in all_models.all_models
+                    if model_is_indexed(model)}
+  indexed_models -= excluded_models
+  return sorted(indexed_models, key=lambda model: model.__name__)
+
+
+def _get_instances(model, last_id, chunk_size):
+  """Get the next chunk of model instances with id greater than last_id."""
+  # pylint: disable=protected-access
+  mapper_class = model._sa_class_manager.mapper.base_mapper.class_
+  return model.query.options(
+      db.undefer_group(mapper_class.__name__ + '_complete'),
+  ).filter(
+      model.id > last_id
+  ).order_by(
+      model.id
+  ).limit(chunk_size).all()
+
+
+def _get_custom_attribute_values(model, ids):
+  """Get custom attribute values for the given objects."""
+  if not ids or not hasattr(model, "custom_attribute_values"):
+    return []
+  cav = all_models.CustomAttributeValue
+  return cav.query.options(
+      orm.joinedload("custom_attribute"),
+  ).filter(
+      cav.attributable_type == model.__name__,
+      cav.attributable_id.in_(ids),
+  ).all()
+
+
+def reindex_chunk(indexer, model, last_id, chunk_size=REINDEX_CHUNK_SIZE):
+  """Rebuild index records for the next chunk of objects of a model.
+
+  All existing records of the model in the id range covered by the chunk are
+  replaced with fresh ones. This also removes records of objects that have
+  been deleted in the meantime. When there are no more objects, all records
+  after last_id are removed.
+
+  Args:
+    indexer: Indexer used for writing records.
+    model: Model class that is being indexed.
+    last_id: Largest id that has already been indexed.
+    chunk_size: Maximal number of objects in the chunk.
+
+  Returns:
+    Tuple of the largest id in the chunk or None if there are no objects
+    left, the number of indexed objects and the number of created records.
+  """
+  instances = _get_instances(model, last_id, chunk_size)
+  ids = [instance.id for instance in instances]
+  max_id = ids[-1] if len(ids) == chunk_size else None
+  objects = instances + _get_custom_attribute_values(model, ids)
+  records = [fts_record_for(obj) for obj in objects]
+  indexer.delete_records_by_key_range(
+      model.__name__, last_id, max_id, commit=False)
+  indexer.create_records(records, commit=False)
+  rows = sum(len(record.properties) for record in records)
+  return max_id, len(instances), rows
+
+
+def _get_checkpoint(task):
+  """Get the stored reindex checkpoint of a background task."""
+  if task is None or not isinstance(task.parameters, dict):
+    return {}
+  return copy.deepcopy(task.parameters.get(CHECKPOINT_KEY, {}))
+
+
+def get_resume_parameters():
+  """Get parameters of a new reindex task that resumes an unfinished one.
+
+  Returns:
+    Parameters with the checkpoint of the latest reindex task if that task
+    did not finish successfully, and empty parameters otherwise.
+  """
+  task = all_models.BackgroundTask.query.filter(
+      all_models.BackgroundTask.name.startswith(TASK_NAME),
+  ).order_by(
+      all_models.BackgroundTask.id.desc(),
+  ).first()
+  if task is None or task.status == "Success":
+    return {}
+  checkpoint = _get_checkpoint(task)
+  if not checkpoint:
+    return {}
+  return {CHECKPOINT_KEY: checkpoint}
+
+
+def _save_checkpoint(task, checkpoint):
+  """Store reindex checkpoint in a background task without committing."""
+  if task is None:
+    return
+  parameters = dict(task.parameters or {})
+  parameters[CHECKPOINT_KEY] = copy.deepcopy(checkpoint)
+  task.parameters = parameters
+  db.session.add(task)
+
+
+def _get_rate(rows, seconds):
+  return round(rows / seconds, 1) if seconds else 0.0
+
+
+def _reindex_model(indexer, model, checkpoint, task, chunk_size):
+  """Reindex all objects of a single model starting at the checkpoint."""
+  name = model.__name__
+  stats = checkpoint["models"].setdefault(
+      name, {"objects": 0, "rows": 0, "seconds": 0.0})
+  last_id = checkpoint.get("last_id", 0) if checkpoint.get("model") == name \
+      else 0
+  while last_id is not None:
+    start = time.time()
+    last_id, objects, rows = reindex_chunk(indexer, model, last_id,
+                                           chunk_size)
+    stats["objects"] += objects
+    stats["rows"] += rows
+    stats["seconds"] += time.time() - start
+    checkpoint["model"] = name
+    checkpoint["last_id"] = last_id
+    _save_checkpoint(task, checkpoint)
+    db.session.commit()
+  stats["rows_per_second"] = _get_rate(stats["rows"], stats["seconds"])
+  logger.info("Reindexed %s: %s objects, %s rows in %.2fs (%s rows/sec)",
+              name, stats["objects"], stats["rows"], stats["seconds"],
+              stats["rows_per_second"])
+
+
+def _delete_stale_types(indexer, models):
+  """Remove records of types that are no longer indexed."""
+  valid_types = {model.__name__ for model in models} | EXTRA_RECORD_TYPES
+  stored_types = db.session.query(indexer.record_type.type).distinct()
+  for (type_,) in stored_types.all():
+    if type_ not in valid_types:
+      indexer.delete_records_by_type(type_, commit=False)
+  db.session.commit()
+
+
+def reindex(task=None, chunk_size=REINDEX_CHUNK_SIZE):
+  """Rebuild full text index records for all indexed models.
+
+  Args:
+    task: Optional BackgroundTask used for storing the checkpoint. If the
+        task already contains a checkpoint, reindexing resumes from it.
+    chunk_size: Number of objects indexed and committed at once.
+
+  Returns:
+    Dict with the number of objects, rows, elapsed seconds and rows per
+    second, in total and for every model.
+  """
+  indexer = get_indexer()
+  models = get_indexed_models()
+  checkpoint = _get_checkpoint(task)
+  checkpoint.setdefault("done", [])
+  checkpoint.setdefault("models", {})
+  for model in models:
+    if model.__name__ in checkpoint["done"]:
+      continue
+    _reindex_model(indexer, model, checkpoint, task, chunk_size)
+    checkpoint["done"].append(model.__name__)
+    checkpoint.pop("model", None)
+    checkpoint.pop("last_id", None)
+    _save_checkpoint(task, checkpoint)
+    db.session.commit()
+  _delete_stale_types(indexer, models)
+
+  model_stats = checkpoint["models"].values()
+  rows = sum(stats["rows"] for stats in model_stats)
+  seconds = sum(stats["seconds"] for stats in model_stats)
+  result = {
+      "objects": sum(stats["objects"] for stats in model_stats),
+      "rows": rows,
+      "seconds": round(seconds, 2),
+      "rows_per_second": _get_rate(rows, seconds),
+      "models": checkpoint["models"],
+  }
+  logger.info("Reindex finished: %s rows in %.2fs (%s rows/sec)",
+              rows, seconds, result["rows_per_second"])
+  return result
@@ -1,49 +1,134 @@
 # Copyright (C) 2017 Google Inc.
 # Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
 
+from sqlalchemy.sql.expression import tuple_
+
 from ggrc import db
 from ggrc.fulltext import Indexer
 
 
 class SqlIndexer(Indexer):
-  def create_record(self, record, commit=True):
-    for k, v in record.properties.items():
-      db.session.add(self.record_type(
-          key=record.key,
-          type=record.type,
-          context_id=record.context_id,
-          tags=record.tags,
-          property=k,
-          content=v,
-      ))
+  """Fulltext indexer that stores records in a plain SQL table.
+
+  All write operations are set based: records are inserted with a single
+  multi-row INSERT and removed with a single tuple-IN DELETE per chunk, so the
+  number of statements does not grow with the number of indexed objects.
+  """
+
+  # Maximum number of tuples used in a single DELETE ... IN statement.
+  DELETE_CHUNK_SIZE = 1000
+
+  def _get_record_rows(self, records):
+    """Get row dicts for all properties of the given records.
+
+    Rows with the same primary key (key, type, property) are deduplicated and
+    the value from the last record wins.
+    """
+    rows = {}
+    for record in records:
+      for prop, content in record.properties.items():
+        rows[(record.key, record.type, prop)] = {
+            "key": record.key,
+            "type": record.type,
+            "context_id": record.context_id,
+            "tags": record.tags,
+            "property": prop,
+            "content": content,
+        }
+    return rows
+
+  def _get_index_types(self):
+    """Get all models that hold index entries for records.
+
+    Every model must have the key, type and property columns of the record
+    type.
+    """
+    return [self.record_type]
+
+  def _delete_chunked(self, columns, values):
+    """Delete index entries matching a tuple of columns in bounded chunks.
+
+    Args:
+      columns: names of the columns to match.
+      values: iterable of tuples with values of the columns.
+    """
+    values = list(values)
+    for index_type in self._get_index_types():
+      index_columns = [getattr(index_type, column) for column in columns]
+      for start in range(0, len(values), self.DELETE_CHUNK_SIZE):
+        db.session.query(index_type).filter(
+            tuple_(*index_columns).in_(
+                values[start:start + self.DELETE_CHUNK_SIZE])
+        ).delete(synchronize_session=False)
+
+  def _insert_rows(self, rows):
+    """Insert index rows and mark index tables as modified.
+
+    Subclasses that insert rows into other index types call this first.
+    """
+    from ggrc.services.common import mark_query_tables_modified
+    if rows:
+      db.session.execute(self.record_type.__table__.insert(), rows)
+      mark_query_tables_modified(
+          [index_type.__tablename__ for index_type in self._get_index_types()])
+
+  def create_records(self, records, commit=True):
+    """Insert index entries for all given records with one INSERT."""
+    rows = self._get_record_rows(records)
+    self._insert_rows(rows.values())
     if commit:
       db.session.commit()
 
-  def update_record(self, record, commit=True):
+  def update_records(self, records, commit=True):
+    """Replace index entries for the properties of all given records."""
+    rows = self._get_record_rows(records)
     # remove the obsolete index entries
-    if record.properties:
-      db.session.query(self.record_type).filter(
-          self.record_type.key == record.key,
-          self.record_type.type == record.type,
-          self.record_type.property.in_(list(record.properties.keys())),
-      ).delete(synchronize_session="fetch")
+    self._delete_chunked(("key", "type", "property"), rows.keys())
     # add new index entries
-    self.create_record(record, commit=commit)
+    self._insert_rows(rows.values())
+    if commit:
+      db.session.commit()
+
+  def delete_records(self, keys, commit=True):
+    """Delete all index entries for the given (key, type) pairs."""
+    self._delete_chunked(("key", "type"), set(keys))
+    if commit:
+      db.session.commit()
+
+  def create_record(self, record, commit=True):
+    self.create_records([record], commit=commit)
+
+  def update_record(self, record, commit=True):
+    self.update_records([record], commit=commit)
 
   def delete_record(self, key, type, commit=True):
-    db.session.query(self.record_type).filter(
-        self.record_type.key == key,
-        self.record_type.type == type).delete()
+    self.delete_records([(key, type)], commit=commit)
+
+  def delete_records_by_key_range(self, type, after, until=None,
+                                  commit=True):
+    """Delete all index entries of a type with after < key <= until.
+
+    If until is None, all entries with key greater than after are deleted.
+    """
+    for index_type in self._get_index_types():
+      query = db.session.query(index_type).filter(
+          index_type.type == type,
+          index_type.key > after,
+      )
+      if until is not None:
+        query = query.filter(index_type.key <= until)
+      query.delete(synchronize_session=False)
     if commit:
       db.session.commit()
 
   def delete_all_records(self, commit=True):
-    db.session.query(self.record_type).delete()
+    for index_type in self._get_index_types():
+      db.session.query(index_type).delete()
     if commit:
       db.session.commit()
 
   def delete_records_by_type(self, type, commit=True):
-    db.session.query(self.record_type).filter(
-        self.record_type.type == type).delete()
+    for index_type in self._get_index_types():
+      db.session.query(index_type).filter(index_type.type == type).delete()
     if commit:
       db.session.commit()
@@ -0,0 +1,40 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Add latest revisions table.
+
+Create Date: 2017-01-16 10:30:15.418262
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1a6e42c9d7'
+down_revision = '421b2179c02e'
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.create_table(
+      "latest_revisions",
+      sa.Column("resource_type", sa.String(length=250), nullable=False),
+      sa.Column("resource_id", sa.Integer(), autoincrement=False,
+                nullable=False),
+      sa.Column("revision_id", sa.Integer(), nullable=False),
+      sa.PrimaryKeyConstraint("resource_type", "resource_id"),
+  )
+  op.execute("""
+      INSERT INTO latest_revisions (resource_type, resource_id, revision_id)
+      SELECT resource_type, resource_id, MAX(id)
+      FROM revisions
+      GROUP BY resource_type, resource_id
+  """)
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.drop_table("latest_revisions")
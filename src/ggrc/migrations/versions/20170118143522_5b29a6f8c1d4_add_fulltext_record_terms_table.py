@@ -0,0 +1,49 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Add fulltext record terms table.
+
+The table is filled only by the inverted full text indexer, so the full text
+index has to be rebuilt after that indexer is enabled.
+
+Create Date: 2017-01-18 14:35:22.128743
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5b29a6f8c1d4'
+down_revision = '3f1a6e42c9d7'
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.create_table(
+      "fulltext_record_terms",
+      sa.Column("id", sa.Integer(), nullable=False),
+      sa.Column("term", sa.String(length=3), nullable=False),
+      sa.Column("key", sa.Integer(), autoincrement=False, nullable=False),
+      sa.Column("type", sa.String(length=64), nullable=False),
+      sa.Column("property", sa.String(length=250), nullable=False),
+      sa.PrimaryKeyConstraint("id"),
+      mysql_engine="myisam",
+  )
+  op.create_index(
+      "ix_fulltext_record_terms_term",
+      "fulltext_record_terms",
+      ["term", "key", "type", "property"],
+  )
+  op.create_index(
+      "ix_fulltext_record_terms_key_type",
+      "fulltext_record_terms",
+      ["key", "type"],
+  )
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.drop_table("fulltext_record_terms")
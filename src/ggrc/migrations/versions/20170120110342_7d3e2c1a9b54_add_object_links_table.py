@@ -0,0 +1,82 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Add object links table.
+
+Links of existing relationships and mapping rows are stored in both
+directions.
+
+Create Date: 2017-01-20 11:03:42.671205
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '7d3e2c1a9b54'
+down_revision = '5b29a6f8c1d4'
+
+
+# kind, table, type_a, id_a, type_b, id_b
+LINKS = [
+    ("relationship", "relationships",
+     "source_type", "source_id", "destination_type", "destination_id"),
+    ("object_person", "object_people",
+     "'Person'", "person_id", "personable_type", "personable_id"),
+    ("object_owner", "object_owners",
+     "'Person'", "person_id", "ownable_type", "ownable_id"),
+    ("program_audit", "audits",
+     "'Program'", "program_id", "'Audit'", "id"),
+    ("audit_request", "requests",
+     "'Audit'", "audit_id", "'Request'", "id"),
+    ("audit_snapshot", "snapshots",
+     "parent_type", "parent_id", "'Snapshot'", "id"),
+    ("custom_attribute", "custom_attribute_values",
+     "attributable_type", "attributable_id",
+     "attribute_value", "attribute_object_id"),
+]
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.create_table(
+      "object_links",
+      sa.Column("id", sa.Integer(), nullable=False),
+      sa.Column("kind", sa.String(length=64), nullable=False),
+      sa.Column("link_id", sa.Integer(), nullable=False),
+      sa.Column("type_a", sa.String(length=250), nullable=False),
+      sa.Column("id_a", sa.Integer(), nullable=False),
+      sa.Column("type_b", sa.String(length=250), nullable=False),
+      sa.Column("id_b", sa.Integer(), nullable=False),
+      sa.PrimaryKeyConstraint("id"),
+  )
+  op.create_index(
+      "ix_object_links_lookup",
+      "object_links",
+      ["type_a", "type_b", "id_a", "id_b"],
+  )
+  op.create_index(
+      "ix_object_links_kind_link",
+      "object_links",
+      ["kind", "link_id"],
+  )
+  for kind, table, type_a, id_a, type_b, id_b in LINKS:
+    for type_1, id_1, type_2, id_2 in [(type_a, id_a, type_b, id_b),
+                                       (type_b, id_b, type_a, id_a)]:
+      op.execute("""
+          INSERT INTO object_links (kind, link_id, type_a, id_a, type_b, id_b)
+          SELECT '{kind}', id, {type_1}, {id_1}, {type_2}, {id_2}
+          FROM {table}
+          WHERE {type_a} IS NOT NULL AND {id_a} IS NOT NULL AND
+                {type_b} IS NOT NULL AND {id_b} IS NOT NULL
+      """.format(kind=kind, table=table, type_1=type_1, id_1=id_1,
+                 type_2=type_2, id_2=id_2, type_a=type_a, id_a=id_a,
+                 type_b=type_b, id_b=id_b))
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.drop_table("object_links")
@@ -122,6 +122,10 @@ def init_session_monitor_cache():
   from sqlalchemy.orm.session import Session
   from sqlalchemy import event
   from ggrc.services.common import get_cache
+  from ggrc.services.common import invalidate_query_results
+  from ggrc.services.common import mark_query_tables_modified
+  from ggrc.services.common import pop_query_tables_modified
+  from ggrc.models.utils import is_savepoint_end
 
   def update_cache_before_flush(session, flush_context, objects):
     cache = get_cache(create=True)
@@ -133,14 +137,35 @@ def init_session_monitor_cache():
     if cache:
       cache.update_after_flush(session, flush_context)
 
+  def mark_bulk_modified_tables(context):
+    mappers = [sa.inspect(desc["type"], raiseerr=False)
+               for desc in context.query.column_descriptions]
+    mark_query_tables_modified(
+        [table.name for mapper in mappers
+         for table in getattr(mapper, "tables", ())],
+        context.session)
+
   def clear_cache(session):
+    if is_savepoint_end(session):
+      return
+    pop_query_tables_modified(session)
+    cache = get_cache()
+    if cache:
+      cache.clear()
+
+  def invalidate_and_clear_cache(session):
+    if is_savepoint_end(session):
+      return
     cache = get_cache()
+    invalidate_query_results(cache, pop_query_tables_modified(session))
     if cache:
       cache.clear()
 
   event.listen(Session, 'before_flush', update_cache_before_flush)
   event.listen(Session, 'after_flush', update_cache_after_flush)
-  event.listen(Session, 'after_commit', clear_cache)
+  event.listen(Session, 'after_bulk_delete', mark_bulk_modified_tables)
+  event.listen(Session, 'after_bulk_update', mark_bulk_modified_tables)
+  event.listen(Session, 'after_commit', invalidate_and_clear_cache)
   event.listen(Session, 'after_rollback', clear_cache)
 
 
@@ -1,12 +1,15 @@
 # Copyright (C) 2017 Google Inc.
 # Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
 
+import json
 from logging import getLogger
 from functools import wraps
 from time import time
 
 from flask import request
 from flask.wrappers import Response
+from sqlalchemy import inspect
+from sqlalchemy import type_coerce
 from werkzeug.datastructures import Headers
 
 from ggrc import db
@@ -33,7 +36,8 @@ class BackgroundTask(Base, Stateful, db.Model):
   ]
   name = deferred(db.Column(db.String), 'BackgroundTask')
   parameters = deferred(db.Column(CompressedType), 'BackgroundTask')
-  result = deferred(db.Column(CompressedType), 'BackgroundTask')
+  result = deferred(db.Column(CompressedType(stream_key='content')),
+                    'BackgroundTask')
 
   _publish_attrs = [
       'name',
@@ -45,6 +49,21 @@ class BackgroundTask(Base, Stateful, db.Model):
     db.session.add(self)
     db.session.commit()
 
+  def report_progress(self, progress):
+    """Store and commit the progress of a running task.
+
+    The progress is served as the task response until the task finishes and
+    its result gets replaced with the final response.
+
+    Args:
+      progress: json serializable progress data.
+    """
+    self.result = {'content': json.dumps(progress),
+                   'status_code': 200,
+                   'headers': [('Content-Type', 'application/json')]}
+    db.session.add(self)
+    db.session.commit()
+
   def finish(self, status, result):
     # Ensure to not commit any not-yet-committed changes
     db.session.rollback()
@@ -62,6 +81,13 @@ class BackgroundTask(Base, Stateful, db.Model):
     db.session.commit()
 
   def make_response(self, default=None):
+    """Make a response from the stored task result.
+
+    If the result is not loaded yet, its content is decompressed while the
+    response is being sent instead of being loaded as a whole.
+    """
+    if 'result' in inspect(self).unloaded:
+      return self._make_streamed_response(default)
     if self.result is None:
       return default
     from ggrc.app import app
@@ -69,6 +95,23 @@ class BackgroundTask(Base, Stateful, db.Model):
                               self.result['status_code'],
                               self.result['headers']))
 
+  def _make_streamed_response(self, default):
+    """Make a response that decompresses the stored result in chunks."""
+    column = self.__table__.c.result
+    value = db.session.query(
+        type_coerce(column, column.type.impl)
+    ).filter(self.__class__.id == self.id).scalar()
+    if value is None:
+      return default
+    result, chunks = column.type.iter_stream(value)
+    if result is None:
+      return default
+    if chunks is None:
+      chunks = [result['content']]
+    from ggrc.app import app
+    return app.response_class(chunks, status=result['status_code'],
+                              headers=result['headers'])
+
 
 def create_task(name, url, queued_callback=None, parameters=None):
 
@@ -99,8 +142,12 @@ def create_task(name, url, queued_callback=None, parameters=None):
 
 
 def make_task_response(id_):
+  """Get the stored response of a task or its status if it has none."""
   task = BackgroundTask.query.get(id_)
-  return task.make_response()
+  from ggrc.app import app
+  return task.make_response(app.make_response((
+      json.dumps({'id': task.id, 'status': task.status}), 200,
+      [('Content-Type', 'application/json')])))
 
 
 def queued_task(func):
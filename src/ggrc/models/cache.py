@@ -1,10 +1,24 @@
 # Copyright (C) 2017 Google Inc.
 # Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
 
+from sqlalchemy import inspect
+
+
 class Cache:
   """
   Tracks modified objects in the session distinguished by
   type of modification: new, dirty and deleted.
+
+  Objects are not serialized during flushes, so that an object that gets
+  flushed several times is serialized only once when its revision is logged:
+
+    new -- objects mapped to None
+    dirty -- objects mapped to the set of names of their changed attributes
+    deleted -- objects mapped to their log JSON from before the delete
+
+  Objects that are deleted by the flush as orphans are only known after the
+  flush, when they can't be serialized anymore, so JSON of dirty objects
+  that are about to become orphans is recorded before the flush.
   """
   def __init__(self):
     self.clear()
@@ -12,18 +26,22 @@ class Cache:
   def update_before_flush(self, session, flush_context):
     """
     Before the flush happens, we can still access to-be-deleted objects, so
-    record JSON for log here
+    record JSON for log of deleted objects here
     """
     for o in session.new:
       if hasattr(o, 'log_json'):
-        self.new[o] = o.log_json()
+        self.new[o] = None
     for o in session.deleted:
-      if hasattr(o, 'log_json'):
+      if hasattr(o, 'log_json') and self.deleted.get(o) is None:
         self.deleted[o] = o.log_json()
     dirty = set(o for o in session.dirty if session.is_modified(o))
     for o in dirty - set(self.new) - set(self.deleted):
       if hasattr(o, 'log_json'):
-        self.dirty[o] = o.log_json()
+        state = inspect(o)
+        self.dirty.setdefault(o, set()).update(state.committed_state)
+        # pylint: disable=protected-access
+        if state.has_identity and state.mapper._is_orphan(state):
+          self.orphans[o] = o.log_json()
 
   def update_after_flush(self, session, flush_context):
     """
@@ -36,17 +54,26 @@ class Cache:
       #   to `cascade="all,delete-orphan"`
       # If an object was actually deleted, move it into `deleted`
       if flush_context.is_deleted(o._sa_instance_state):
-        self.deleted[o] = self.dirty[o]
+        self.deleted[o] = self.orphans.get(o)
         del self.dirty[o]
+    self.orphans = {}
 
   def clear(self):
     self.new = {}
     self.dirty = {}
     self.deleted = {}
+    self.orphans = {}
+
+  def restore(self, snapshot):
+    """Track the same objects as a copy made earlier."""
+    self.new = dict(snapshot.new)
+    self.dirty = {o: set(attrs) for o, attrs in snapshot.dirty.items()}
+    self.deleted = dict(snapshot.deleted)
 
   def copy(self):
     copied_cache = Cache()
     copied_cache.new = dict(self.new)
-    copied_cache.dirty = dict(self.dirty)
+    copied_cache.dirty = {
+        o: set(attrs or ()) for o, attrs in self.dirty.items()}
     copied_cache.deleted = dict(self.deleted)
     return copied_cache
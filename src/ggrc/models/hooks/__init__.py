@@ -5,11 +5,13 @@
 
 from ggrc.models.hooks import assessment
 from ggrc.models.hooks import comment
+from ggrc.models.hooks import object_link
 
 
 ALL_HOOKS = [
     assessment,
     comment,
+    object_link,
 ]
 
 
@@ -0,0 +1,47 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Hooks that keep the object_links table up to date."""
+
+from sqlalchemy import event
+from sqlalchemy.orm.session import Session
+
+from ggrc.models import object_link
+from ggrc.models.utils import is_savepoint_end
+
+
+# Key of the session info item with kinds of links whose rows were bulk
+# deleted since the last commit.
+BULK_DELETED_KINDS = "object_link_bulk_deleted_kinds"
+
+
+def init_hook():
+  """Initialize all hooks"""
+  # pylint: disable=unused-variable
+
+  @event.listens_for(Session, "after_flush")
+  def update_object_links(session, _):
+    """Store links of flushed objects."""
+    object_link.update_links(session)
+
+  @event.listens_for(Session, "after_bulk_delete")
+  def mark_bulk_deleted_links(delete_context):
+    """Remember kinds of links whose rows might have been deleted."""
+    kinds = object_link.get_bulk_deleted_kinds(delete_context.query)
+    if kinds:
+      delete_context.session.info.setdefault(
+          BULK_DELETED_KINDS, set()).update(kinds)
+
+  @event.listens_for(Session, "before_commit")
+  def remove_orphaned_links(session):
+    """Remove links of rows deleted with bulk deletes."""
+    if is_savepoint_end(session):
+      return
+    kinds = session.info.pop(BULK_DELETED_KINDS, None)
+    if kinds:
+      object_link.remove_orphaned_links(session, kinds)
+
+  @event.listens_for(Session, "after_rollback")
+  def forget_bulk_deleted_links(session):
+    if not is_savepoint_end(session):
+      session.info.pop(BULK_DELETED_KINDS, None)
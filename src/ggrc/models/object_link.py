@@ -0,0 +1,302 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Denormalized links between objects.
+
+Objects are linked through relationships and through several mapping models
+and foreign keys, such as object people, object owners or the program of an
+audit. Every row of such a model is stored as a link in the object_links
+table, in both directions, so all objects linked to some objects of a type
+can be found with a single indexed lookup.
+
+Links are kept up to date after every flush. Rows deleted with bulk deletes
+do not go through the session, so links without their rows are removed
+before the next commit. The whole table can be rebuilt with
+rebuild_object_links.
+"""
+
+from collections import defaultdict
+
+import sqlalchemy as sa
+
+from ggrc import db
+from ggrc.extensions import get_extension_modules
+from ggrc.utils import benchmark
+
+
+# Maximum number of link ids in a single DELETE statement.
+DELETE_CHUNK_SIZE = 1000
+
+object_links = db.Table(
+    "object_links",
+    db.Column("id", db.Integer, primary_key=True),
+    db.Column("kind", db.String(64), nullable=False),
+    db.Column("link_id", db.Integer, nullable=False),
+    db.Column("type_a", db.String(250), nullable=False),
+    db.Column("id_a", db.Integer, nullable=False),
+    db.Column("type_b", db.String(250), nullable=False),
+    db.Column("id_b", db.Integer, nullable=False),
+    db.Index("ix_object_links_lookup", "type_a", "type_b", "id_a", "id_b"),
+    db.Index("ix_object_links_kind_link", "kind", "link_id"),
+)
+
+_LINK_COLUMNS = ["kind", "link_id", "type_a", "id_a", "type_b", "id_b"]
+
+
+class Endpoint(object):
+  """Type and id of the object at one end of a link.
+
+  The type is either a constant type name or the value of a type column.
+  """
+
+  def __init__(self, id_attr, type_attr=None, type_name=None):
+    self.id_attr = id_attr
+    self.type_attr = type_attr
+    self.type_name = type_name
+
+  @property
+  def attrs(self):
+    return [attr for attr in (self.type_attr, self.id_attr) if attr]
+
+  def get(self, obj):
+    """Get the (type, id) pair of the endpoint of a model instance."""
+    type_ = self.type_name or getattr(obj, self.type_attr)
+    return type_, getattr(obj, self.id_attr)
+
+  def get_columns(self, model):
+    """Get the type and id columns of the endpoint for rows of a model."""
+    if self.type_name:
+      type_column = sa.literal(self.type_name)
+    else:
+      type_column = getattr(model, self.type_attr)
+    return type_column, getattr(model, self.id_attr)
+
+
+class ObjectLinkKind(object):
+  """Links made from rows of a model.
+
+  Args:
+    name: kind of the links, unique for every model.
+    model: model with one link in every row.
+    end_a: Endpoint of one of the linked objects.
+    end_b: Endpoint of the other linked object.
+  """
+
+  def __init__(self, name, model, end_a, end_b):
+    self.name = name
+    self.model = model
+    self.end_a = end_a
+    self.end_b = end_b
+
+  def get_rows(self, obj):
+    """Get link rows for both directions of the link of a model instance."""
+    type_a, id_a = self.end_a.get(obj)
+    type_b, id_b = self.end_b.get(obj)
+    if None in (type_a, id_a, type_b, id_b):
+      return []
+    return [
+        {"kind": self.name, "link_id": obj.id,
+         "type_a": type_a, "id_a": id_a, "type_b": type_b, "id_b": id_b},
+        {"kind": self.name, "link_id": obj.id,
+         "type_a": type_b, "id_a": id_b, "type_b": type_a, "id_b": id_a},
+    ]
+
+  def has_changes(self, obj):
+    """Check if any column of the link of a flushed instance has changed."""
+    state = sa.inspect(obj)
+    return any(state.attrs[attr].history.has_changes()
+               for attr in self.end_a.attrs + self.end_b.attrs)
+
+  def get_selects(self):
+    """Get selects of link rows for both directions of all model rows."""
+    end_a = self.end_a.get_columns(self.model)
+    end_b = self.end_b.get_columns(self.model)
+    not_null = sa.and_(*[getattr(self.model, attr).isnot(None)
+                         for attr in self.end_a.attrs + self.end_b.attrs])
+    selects = []
+    for end_1, end_2 in [(end_a, end_b), (end_b, end_a)]:
+      # columns are labeled because the same column can be selected twice
+      columns = [sa.literal(self.name), self.model.id] + list(end_1 + end_2)
+      selects.append(sa.select([
+          column.label(name) for column, name in zip(columns, _LINK_COLUMNS)
+      ]).where(not_null))
+    return selects
+
+
+_link_kinds = []  # pylint: disable=invalid-name
+
+
+def _get_core_link_kinds():
+  """Get kinds of links stored by core models."""
+  from ggrc.models import all_models
+  return [
+      ObjectLinkKind(
+          "relationship", all_models.Relationship,
+          Endpoint("source_id", type_attr="source_type"),
+          Endpoint("destination_id", type_attr="destination_type"),
+      ),
+      ObjectLinkKind(
+          "object_person", all_models.ObjectPerson,
+          Endpoint("person_id", type_name="Person"),
+          Endpoint("personable_id", type_attr="personable_type"),
+      ),
+      ObjectLinkKind(
+          "object_owner", all_models.ObjectOwner,
+          Endpoint("person_id", type_name="Person"),
+          Endpoint("ownable_id", type_attr="ownable_type"),
+      ),
+      ObjectLinkKind(
+          "program_audit", all_models.Audit,
+          Endpoint("program_id", type_name="Program"),
+          Endpoint("id", type_name="Audit"),
+      ),
+      ObjectLinkKind(
+          "audit_request", all_models.Request,
+          Endpoint("audit_id", type_name="Audit"),
+          Endpoint("id", type_name="Request"),
+      ),
+      ObjectLinkKind(
+          "audit_snapshot", all_models.Snapshot,
+          Endpoint("parent_id", type_attr="parent_type"),
+          Endpoint("id", type_name="Snapshot"),
+      ),
+      ObjectLinkKind(
+          "custom_attribute", all_models.CustomAttributeValue,
+          Endpoint("attributable_id", type_attr="attributable_type"),
+          Endpoint("attribute_object_id", type_attr="attribute_value"),
+      ),
+  ]
+
+
+def get_link_kinds():
+  """Get kinds of links of core models and of all extensions."""
+  if not _link_kinds:
+    kinds = _get_core_link_kinds()
+    for extension in get_extension_modules():
+      kinds.extend(getattr(extension, "contributed_object_links", []))
+    _link_kinds.extend(kinds)
+  return _link_kinds
+
+
+def _get_kinds(obj):
+  return [kind for kind in get_link_kinds() if isinstance(obj, kind.model)]
+
+
+def _mark_modified(session):
+  """Mark the links table for invalidation of cached query results."""
+  from ggrc.services.common import mark_query_tables_modified
+  mark_query_tables_modified([object_links.name], session)
+
+
+def _delete_links(session, kind_name, link_ids):
+  link_ids = sorted(link_ids)
+  for start in range(0, len(link_ids), DELETE_CHUNK_SIZE):
+    session.execute(object_links.delete().where(sa.and_(
+        object_links.c.kind == kind_name,
+        object_links.c.link_id.in_(link_ids[start:start + DELETE_CHUNK_SIZE]),
+    )))
+
+
+def update_links(session):
+  """Update links of objects that are being flushed by the session.
+
+  This must be called after the flush, while new, dirty and deleted objects
+  of the session and their attribute histories are still available.
+  """
+  deleted = defaultdict(set)
+  rows = []
+  for obj in session.new:
+    for kind in _get_kinds(obj):
+      rows.extend(kind.get_rows(obj))
+  for obj in session.dirty:
+    for kind in _get_kinds(obj):
+      if kind.has_changes(obj):
+        deleted[kind.name].add(obj.id)
+        rows.extend(kind.get_rows(obj))
+  for obj in session.deleted:
+    for kind in _get_kinds(obj):
+      deleted[kind.name].add(obj.id)
+  for kind_name, link_ids in deleted.iteritems():
+    _delete_links(session, kind_name, link_ids)
+  if rows:
+    session.execute(object_links.insert(), rows)
+  if deleted or rows:
+    _mark_modified(session)
+
+
+def remove_orphaned_links(session, kinds):
+  """Remove links of the given kinds whose model rows no longer exist."""
+  for kind in kinds:
+    model_table = kind.model.__table__
+    session.execute(object_links.delete().where(sa.and_(
+        object_links.c.kind == kind.name,
+        ~sa.exists().where(model_table.c.id == object_links.c.link_id),
+    )))
+  _mark_modified(session)
+
+
+def get_bulk_deleted_kinds(query):
+  """Get kinds of links whose rows could be deleted by a bulk query."""
+  models = {desc["type"] for desc in query.column_descriptions}
+  return [kind for kind in get_link_kinds()
+          if any(isinstance(model, type) and issubclass(model, kind.model)
+                 for model in models)]
+
+
+def get_related_ids(object_type, related_type, related_ids):
+  """Get a query for ids of objects linked to any of the related objects.
+
+  Args:
+    object_type: type name of the linked objects.
+    related_type: type name of the related objects.
+    related_ids: ids of the related objects.
+  """
+  return db.session.query(object_links.c.id_b).filter(
+      object_links.c.type_a == related_type,
+      object_links.c.type_b == object_type,
+      object_links.c.id_a.in_(related_ids),
+  )
+
+
+def get_link_kind(name):
+  """Get the kind of links with the given name."""
+  for kind in get_link_kinds():
+    if kind.name == name:
+      return kind
+  raise ValueError("Unknown object link kind: {}".format(name))
+
+
+def insert_missing_links(kind_name, *criteria):
+  """Insert links of rows that match criteria and have no links yet.
+
+  This has to be called after rows of a kind are inserted with bulk
+  statements, which are not seen by the flush hook.
+
+  Args:
+    kind_name: name of the link kind.
+    *criteria: filters on the model of the kind that select the new rows.
+  """
+  kind = get_link_kind(kind_name)
+  has_links = sa.exists().where(sa.and_(
+      object_links.c.kind == kind.name,
+      object_links.c.link_id == kind.model.id,
+  ))
+  # both directions are selected in one statement, so that links inserted
+  # for the first direction are not seen by the anti-join of the second
+  selects = sa.union_all(*[select.where(sa.and_(~has_links, *criteria))
+                           for select in kind.get_selects()])
+  db.session.execute(object_links.insert().from_select(_LINK_COLUMNS,
+                                                       selects))
+  _mark_modified(db.session)
+
+
+def rebuild_object_links():
+  """Replace all links with links built from rows of all link models."""
+  with benchmark("Rebuild object links"):
+    db.session.execute(object_links.delete())
+    for kind in get_link_kinds():
+      for select in kind.get_selects():
+        db.session.execute(
+            object_links.insert().from_select(_LINK_COLUMNS, select))
+    _mark_modified(db.session)
+    db.session.commit()
@@ -3,12 +3,21 @@
 
 """Defines a Revision model for storing snapshots."""
 
+from sqlalchemy import event
+from sqlalchemy import text
+from sqlalchemy.orm.session import Session
+from sqlalchemy.sql.expression import tuple_
+
 from ggrc import db
 from ggrc.models.computed_property import computed_property
 from ggrc.models.mixins import Base
 from ggrc.models.types import LongJsonType
 
 
+# Number of resources refreshed with a single statement.
+REFRESH_CHUNK_SIZE = 500
+
+
 class Revision(Base, db.Model):
   """Revision object holds a JSON snapshot of the object at a time."""
 
@@ -59,17 +68,26 @@ class Revision(Base, db.Model):
     )
 
   def __init__(self, obj, modified_by_id, action, content):
-    self.resource_id = obj.id
-    self.modified_by_id = modified_by_id
-    self.resource_type = str(obj.__class__.__name__)
-    self.action = action
-    self.content = content
+    for attr, value in self.get_values(
+            obj, modified_by_id, action, content).items():
+      setattr(self, attr, value)
 
+  @staticmethod
+  def get_values(obj, modified_by_id, action, content):
+    """Get column values of a revision for the given object."""
+    values = {
+        "resource_id": obj.id,
+        "modified_by_id": modified_by_id,
+        "resource_type": str(obj.__class__.__name__),
+        "action": action,
+        "content": content,
+    }
     for attr in ["source_type",
                  "source_id",
                  "destination_type",
                  "destination_id"]:
-      setattr(self, attr, getattr(obj, attr, None))
+      values[attr] = getattr(obj, attr, None)
+    return values
 
   def _description_mapping(self, link_objects):
     """Compute description for revisions with <-> in display name."""
@@ -117,3 +135,135 @@ class Revision(Base, db.Model):
     if self.event.action == "BULK":
       result += ", via bulk action"
     return result
+
+
+# Lookup table with the id of the newest revision of every resource. It is
+# kept up to date in the same transaction in which revisions are inserted, so
+# the latest revision of an object can be found with a primary key lookup
+# instead of grouping the whole revisions table.
+latest_revisions = db.Table(
+    "latest_revisions",
+    db.Column("resource_type", db.String(250), primary_key=True),
+    db.Column("resource_id", db.Integer, primary_key=True,
+              autoincrement=False),
+    db.Column("revision_id", db.Integer, nullable=False),
+)
+
+_UPSERT_LATEST_REVISION = text("""
+    INSERT INTO latest_revisions (resource_type, resource_id, revision_id)
+    VALUES (:resource_type, :resource_id, :revision_id)
+    ON DUPLICATE KEY UPDATE
+        revision_id = GREATEST(revision_id, VALUES(revision_id))
+""")
+
+_REFRESH_LATEST_REVISIONS = """
+    INSERT INTO latest_revisions (resource_type, resource_id, revision_id)
+    SELECT resource_type, resource_id, MAX(id)
+    FROM revisions
+    WHERE {condition}
+    GROUP BY resource_type, resource_id
+    ON DUPLICATE KEY UPDATE
+        revision_id = GREATEST(revision_id, VALUES(revision_id))
+"""
+
+
+def update_latest_revisions(session, revisions):
+  """Store ids of new revisions as the latest revisions of their resources.
+
+  Args:
+    session: Session or connection used for executing the update.
+    revisions: Iterable of flushed Revision instances.
+  """
+  rows = [{"resource_type": revision.resource_type,
+           "resource_id": revision.resource_id,
+           "revision_id": revision.id}
+          for revision in revisions]
+  if rows:
+    session.execute(_UPSERT_LATEST_REVISION, rows)
+
+
+def refresh_latest_revisions(resource_type=None, stubs=None):
+  """Rebuild latest revision entries from the revisions table.
+
+  This is used after revisions have been inserted with bulk statements that
+  bypass the ORM.
+
+  Args:
+    resource_type: Only refresh entries of resources with this type.
+    stubs: Only refresh entries for these (resource_type, resource_id) pairs.
+  """
+  if stubs is not None:
+    stubs = list(set(stubs))
+    for start in range(0, len(stubs), REFRESH_CHUNK_SIZE):
+      chunk = stubs[start:start + REFRESH_CHUNK_SIZE]
+      params = {}
+      for i, (type_, id_) in enumerate(chunk):
+        params["type_{}".format(i)] = type_
+        params["id_{}".format(i)] = id_
+      condition = "(resource_type, resource_id) IN ({})".format(", ".join(
+          "(:type_{0}, :id_{0})".format(i) for i in range(len(chunk))))
+      db.session.execute(
+          _REFRESH_LATEST_REVISIONS.format(condition=condition), params)
+  elif resource_type is not None:
+    db.session.execute(
+        _REFRESH_LATEST_REVISIONS.format(condition="resource_type = :type"),
+        {"type": resource_type})
+  else:
+    db.session.execute(_REFRESH_LATEST_REVISIONS.format(condition="1 = 1"))
+
+
+def insert_revisions(event_id, rows):
+  """Insert revisions of an event with a single executemany statement.
+
+  Args:
+    event_id: id of the flushed event that the revisions belong to.
+    rows: list of revision column value dicts, see Revision.get_values.
+  """
+  if not rows:
+    return
+  for row in rows:
+    row["event_id"] = event_id
+  db.session.execute(Revision.__table__.insert(), rows)
+  refresh_latest_revisions(
+      stubs=[(row["resource_type"], row["resource_id"]) for row in rows])
+
+
+def get_latest_revision_ids(stubs, filters=None):
+  """Get ids of the latest revisions for the given resources.
+
+  Args:
+    stubs: Iterable of (resource_type, resource_id) pairs.
+    filters: Optional list of filters that the latest revisions must match.
+  Returns:
+    dict with (resource_type, resource_id) keys and latest revision ids as
+    values. Resources whose latest revision does not match the filters are
+    left out.
+  """
+  stubs = set(stubs)
+  if not stubs:
+    return {}
+  query = db.session.query(
+      latest_revisions.c.resource_type,
+      latest_revisions.c.resource_id,
+      latest_revisions.c.revision_id,
+  ).filter(
+      tuple_(latest_revisions.c.resource_type,
+             latest_revisions.c.resource_id).in_(stubs)
+  )
+  if filters:
+    query = query.join(Revision,
+                       Revision.id == latest_revisions.c.revision_id)
+    for _filter in filters:
+      query = query.filter(_filter)
+  return {(type_, id_): revision_id for type_, id_, revision_id in query}
+
+
+def _update_latest_revisions_after_flush(session, _):
+  """Update the latest revisions lookup table with flushed revisions."""
+  update_latest_revisions(
+      session,
+      [obj for obj in session.new if isinstance(obj, Revision)],
+  )
+
+
+event.listen(Session, "after_flush", _update_latest_revisions_after_flush)
@@ -18,6 +18,7 @@ from ggrc import db
 from ggrc.utils import benchmark
 from ggrc.login import get_current_user_id
 from ggrc.models import mixins
+from ggrc.models import object_link
 from ggrc.models import reflection
 from ggrc.models import relationship
 from ggrc.models import revision
@@ -266,6 +267,18 @@ def _insert_program_relationships(program, missing_pairs):
           for dst_type, dst_id in missing_pairs
       ])
   )
+  from ggrc.automapper import drop_relationship_adjacency
+  from ggrc.services.common import mark_query_tables_modified
+  drop_relationship_adjacency()
+  mark_query_tables_modified([relationship.Relationship.__tablename__])
+  rel = relationship.Relationship
+  object_link.insert_missing_links(
+      "relationship",
+      rel.source_type == program[0],
+      rel.source_id == program[1],
+      tuple_(rel.destination_type, rel.destination_id).in_(
+          list(missing_pairs)),
+  )
 
 
 def _set_latest_revisions(objects):
@@ -6,11 +6,14 @@
 Add Json and Compressed type declaration for use in ORM models.
 """
 
-import json
+import itertools
 import pickle
+import struct
+import zlib
+
 import sqlalchemy.types as types
-from ggrc import utils
 from ggrc.models import exceptions
+from ggrc.utils import json_codec
 
 
 class LongJsonType(types.TypeDecorator):
@@ -19,21 +22,24 @@ class LongJsonType(types.TypeDecorator):
 
   Custom type for storing Json objects in our database as serialized text.
   The Limit for the serialized Json is the same as the database text column
-  limit (2^32).
+  limit (2^32). Json objects are parsed lazily on first access, and unchanged
+  objects are stored back without being encoded again.
   """
   MAX_TEXT_LENGTH = 4294967295
   impl = types.Text
 
   def process_result_value(self, value, dialect):
     if value is not None:
-      value = json.loads(value)
+      value = json_codec.loads_lazy(value)
     return value
 
   def process_bind_param(self, value, dialect):
     if value is None or isinstance(value, basestring):
       pass
+    elif isinstance(value, json_codec.LazyJson) and not value.is_parsed:
+      value = value.get_text()
     else:
-      value = utils.as_json(value)
+      value = json_codec.dumps(value)
       if len(value.encode('utf-8')) > self.MAX_TEXT_LENGTH:
         raise exceptions.ValidationError("Log record content too long")
     return value
@@ -52,14 +58,14 @@ class JsonType(types.TypeDecorator):
 
   def process_result_value(self, value, dialect):
     if value is not None:
-      value = json.loads(value)
+      value = json_codec.loads(value)
     return value
 
   def process_bind_param(self, value, dialect):
     if value is None or isinstance(value, basestring):
       pass
     else:
-      value = utils.as_json(value)
+      value = json_codec.dumps(value)
       if len(value.encode('utf-8')) > self.MAX_TEXT_LENGTH:
         raise exceptions.ValidationError("Log record content too long")
     return value
@@ -69,18 +75,99 @@ class CompressedType(types.TypeDecorator):
   # pylint: disable=W0223
   """ Custom Compresed data type
 
-  Custom type for storing any python object in our database as serialized text.
+  Custom type for storing any python object in our database as zlib
+  compressed pickle. Stored values start with a header byte that identifies
+  their format, and values stored as plain pickle before the header was
+  introduced are still decoded.
+
+  If stream_key is set, dict values with a byte string under that key are
+  stored with that string after the rest of the pickled value, so that it can
+  be decompressed in chunks by iter_stream without loading it all at once.
   """
   MAX_BINARY_LENGTH = 16777215
   impl = types.LargeBinary(length=MAX_BINARY_LENGTH)
 
+  FORMAT_ZLIB = "\x01"
+  FORMAT_ZLIB_STREAM = "\x02"
+  COMPRESSION_LEVEL = 6
+  STREAM_CHUNK_SIZE = 65536
+  _HEAD_LENGTH = struct.Struct(">I")
+
+  def __init__(self, stream_key=None, *args, **kwargs):
+    super(CompressedType, self).__init__(*args, **kwargs)
+    self.stream_key = stream_key
+
   def process_result_value(self, value, dialect):
     if value is not None:
-      value = pickle.loads(value)
+      head, chunks = self.iter_stream(value)
+      if chunks is not None:
+        head[self.stream_key] = "".join(chunks)
+      value = head
     return value
 
   def process_bind_param(self, value, dialect):
-    value = pickle.dumps(value)
+    if self._is_streamable(value):
+      head = dict(value)
+      stream = head.pop(self.stream_key)
+      head = pickle.dumps(head, pickle.HIGHEST_PROTOCOL)
+      value = self.FORMAT_ZLIB_STREAM + zlib.compress(
+          self._HEAD_LENGTH.pack(len(head)) + head + stream,
+          self.COMPRESSION_LEVEL,
+      )
+    else:
+      value = self.FORMAT_ZLIB + zlib.compress(
+          pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+          self.COMPRESSION_LEVEL,
+      )
     if len(value) > self.MAX_BINARY_LENGTH:
       raise exceptions.ValidationError("Log record content too long")
     return value
+
+  def _is_streamable(self, value):
+    return (self.stream_key is not None and
+            isinstance(value, dict) and
+            isinstance(value.get(self.stream_key), str))
+
+  def iter_stream(self, value, chunk_size=STREAM_CHUNK_SIZE):
+    """Decode a stored value without joining its streamed part.
+
+    Args:
+      value: stored binary value.
+      chunk_size: maximum size of decompressed chunks.
+
+    Returns:
+      Tuple of the decoded value without the stream_key entry and an
+      iterator over chunks of the stream_key entry. The iterator is None if
+      the value was not stored in the streamed format, and the decoded value
+      is then returned as is.
+    """
+    header, data = value[:1], value[1:]
+    if header == self.FORMAT_ZLIB:
+      return pickle.loads(zlib.decompress(data)), None
+    if header != self.FORMAT_ZLIB_STREAM:
+      return pickle.loads(value), None
+    chunks = _iter_decompressed(data, chunk_size)
+    buf = ""
+    head_end = None
+    for chunk in chunks:
+      buf += chunk
+      if head_end is None and len(buf) >= self._HEAD_LENGTH.size:
+        head_end = (self._HEAD_LENGTH.size +
+                    self._HEAD_LENGTH.unpack_from(buf)[0])
+      if head_end is not None and len(buf) >= head_end:
+        break
+    head = pickle.loads(buf[self._HEAD_LENGTH.size:head_end])
+    return head, itertools.chain([buf[head_end:]], chunks)
+
+
+def _iter_decompressed(data, chunk_size):
+  """Decompress zlib data in chunks of at most chunk_size bytes."""
+  decompressor = zlib.decompressobj()
+  while data:
+    chunk = decompressor.decompress(data, chunk_size)
+    data = decompressor.unconsumed_tail
+    if chunk:
+      yield chunk
+  chunk = decompressor.flush()
+  if chunk:
+    yield chunk
@@ -41,3 +41,18 @@ class PolymorphicRelationship(object):
       setattr(obj, self._id_attr, value.id)
       setattr(obj, self._type_attr, value.__class__.__name__)
       setattr(obj, self._make_backref_attr(obj), value)
+
+
+def is_savepoint_end(session):
+  """Check if a commit or rollback event of a session ends a savepoint.
+
+  Session commit and rollback events are also dispatched when a savepoint
+  made with begin_nested ends. Changes of a savepoint still belong to the
+  enclosing transaction, so listeners that act on the end of the whole
+  transaction must ignore these events.
+  """
+  # pylint: disable=protected-access
+  transaction = session.transaction
+  while transaction is not None and not transaction.nested:
+    transaction = transaction._parent
+  return transaction is not None
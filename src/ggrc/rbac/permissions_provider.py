@@ -1,6 +1,7 @@
 # Copyright (C) 2017 Google Inc.
 # Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
 
+from collections import defaultdict
 from collections import namedtuple
 from flask import g
 from flask.ext.login import current_user
@@ -142,6 +143,36 @@ _CONDITIONS_MAP = {
 }
 
 
+class CompiledPermissions(object):
+  """Frozen set lookup tables built from a permissions dict.
+
+  The permissions dict keeps contexts and resources in lists, which makes
+  every membership check linear in the number of objects the user can access.
+  This structure holds the same data as frozen sets per (action, type) pair.
+  """
+  # pylint: disable=too-few-public-methods
+
+  EMPTY = frozenset()
+
+  def __init__(self, permissions):
+    self.source = permissions
+    self.contexts = {}
+    self.resources = {}
+    for action, resource_permissions in (permissions or {}).items():
+      if not isinstance(resource_permissions, dict):
+        continue
+      for resource_type, permission in resource_permissions.items():
+        key = (action, resource_type)
+        self.contexts[key] = frozenset(permission.get('contexts', ()))
+        self.resources[key] = frozenset(permission.get('resources', ()))
+
+  def contexts_for(self, action, resource_type):
+    return self.contexts.get((action, resource_type), self.EMPTY)
+
+  def resources_for(self, action, resource_type):
+    return self.resources.get((action, resource_type), self.EMPTY)
+
+
 class DefaultUserPermissions(UserPermissions):
   # super user, context_id 0 indicates all contexts
   ADMIN_PERMISSION = Permission(
@@ -161,28 +192,30 @@ class DefaultUserPermissions(UserPermissions):
 
   def _permission_match(self, permission, permissions):
     """Check if the user has the given permission"""
-
-    if None in \
-        permissions\
-            .get(permission.action, {})\
-            .get(permission.resource_type, {})\
-            .get('contexts', []):
+    compiled = self._compiled_permissions(permissions)
+    contexts = compiled.contexts_for(
+        permission.action, permission.resource_type)
+    if None in contexts:
       return True
     return \
-        permission.resource_id in permissions\
-        .get(permission.action, {})\
-        .get(permission.resource_type, {})\
-        .get('resources', [])\
-        or permission.context_id in \
-        permissions\
-        .get(permission.action, {})\
-        .get(permission.resource_type, {})\
-        .get('contexts', [])\
-        or permission.context_id in \
-        permissions\
-        .get(permission.action, {})\
-        .get(self.ADMIN_PERMISSION.resource_type, {})\
-        .get('contexts', [])
+        permission.resource_id in compiled.resources_for(
+            permission.action, permission.resource_type)\
+        or permission.context_id in contexts\
+        or permission.context_id in compiled.contexts_for(
+            permission.action, self.ADMIN_PERMISSION.resource_type)
+
+  @staticmethod
+  def _compiled_permissions(permissions):
+    """Get compiled lookup tables for the given permissions dict.
+
+    The compiled permissions are kept in the request globals for as long as
+    they are built from the same permissions dict.
+    """
+    compiled = getattr(g, '_request_compiled_permissions', None)
+    if compiled is None or compiled.source is not permissions:
+      compiled = CompiledPermissions(permissions)
+      setattr(g, '_request_compiled_permissions', compiled)
+    return compiled
 
   @staticmethod
   def _permissions():
@@ -203,6 +236,54 @@ class DefaultUserPermissions(UserPermissions):
         self._admin_permission_for_context(permission.context_id),
         permissions)
 
+  def filter_allowed(self, action, stubs):
+    """Get all stubs for which the user is allowed to do the given action.
+
+    This gives the same results as calling _is_allowed for every stub, but
+    the permissions for each resource type are resolved only once and the
+    stubs are matched against frozen sets.
+
+    Args:
+      action: Name of the action, such as 'read'.
+      stubs: Iterable of (resource_type, resource_id, context_id) tuples.
+
+    Returns:
+      Set of allowed stubs.
+    """
+    stubs = set(stubs)
+    permissions = self._permissions()
+    if self._permission_match(self.ADMIN_PERMISSION, permissions):
+      return stubs
+    compiled = self._compiled_permissions(permissions)
+    admin_contexts = compiled.contexts_for(
+        self.ADMIN_PERMISSION.action, self.ADMIN_PERMISSION.resource_type)
+    admin_resources = compiled.resources_for(
+        self.ADMIN_PERMISSION.action, self.ADMIN_PERMISSION.resource_type)
+    all_type_contexts = compiled.contexts_for(
+        action, self.ADMIN_PERMISSION.resource_type)
+    stubs_by_type = defaultdict(list)
+    for stub in stubs:
+      stubs_by_type[stub[0]].append(stub)
+
+    allowed = set()
+    for resource_type, type_stubs in stubs_by_type.items():
+      contexts = compiled.contexts_for(action, resource_type)
+      if None in contexts or None in admin_resources:
+        allowed.update(type_stubs)
+        continue
+      resources = compiled.resources_for(action, resource_type)
+      allowed_contexts = contexts | all_type_contexts | admin_contexts
+      # permissions for all contexts also apply to objects in any context
+      global_allowed = (resource_type != '/admin' and
+                        None in all_type_contexts)
+      allowed.update(
+          stub for stub in type_stubs
+          if stub[1] in resources or
+          stub[2] in allowed_contexts or
+          (stub[2] and global_allowed)
+      )
+    return allowed
+
   @staticmethod
   def _check_conditions(instance, action, conditions):
     """Check if any condition is valid for the instance."""
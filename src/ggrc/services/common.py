@@ -9,10 +9,9 @@ resources.
 import datetime
 import hashlib
 import itertools
-import json
 import time
 from logging import getLogger
-from collections import defaultdict
+from collections import Mapping, defaultdict
 from exceptions import TypeError
 from wsgiref.handlers import format_date_time
 from urllib import urlencode
@@ -24,19 +23,22 @@ from flask.ext.sqlalchemy import Pagination
 import sqlalchemy.orm.exc
 from sqlalchemy import and_, or_
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.attributes import InstrumentedAttribute
+from sqlalchemy.orm.interfaces import MANYTOONE
+from sqlalchemy.orm.properties import ColumnProperty, RelationshipProperty
 from sqlalchemy.sql.expression import tuple_
 from werkzeug.exceptions import BadRequest, Forbidden
 
 import ggrc.builder.json
 import ggrc.models
 from ggrc import db, utils
-from ggrc.utils import as_json, benchmark
+from ggrc.utils import as_json, benchmark, json_codec, keyset
 from ggrc.fulltext import get_indexer
 from ggrc.fulltext.recordbuilder import fts_record_for
 from ggrc.login import get_current_user_id, get_current_user
 from ggrc.models.cache import Cache
 from ggrc.models.event import Event
-from ggrc.models.revision import Revision
+from ggrc.models.revision import Revision, insert_revisions
 from ggrc.models.exceptions import ValidationError, translate_message
 from ggrc.rbac import permissions, context_query_filter
 from ggrc.services.attribute_query import AttributeQueryBuilder
@@ -50,6 +52,24 @@ logger = getLogger(__name__)
 
 CACHE_EXPIRY_COLLECTION = 60
 
+# Whole collection GET responses are cached per collection generation. The
+# generation is bumped after every commit that modifies a member of the
+# collection, which makes all responses stored under older keys unreachable.
+COLLECTION_RESPONSE_GENERATION_KEY = 'collection_response:generation'
+CACHE_EXPIRY_COLLECTION_RESPONSE = 60
+# memcache refuses values larger than 1MB
+MAX_COLLECTION_RESPONSE_SIZE = 900000
+
+# Query API results are cached with the generations of all tables their
+# queries read. The generation of a table is bumped after every commit that
+# modifies a row of the table, and the global generation after every commit
+# that modifies anything.
+QUERY_RESULT_GENERATION_KEY = 'query_result:generation'
+CACHE_EXPIRY_QUERY_RESULT = 60
+# Session info key with names of tables modified with bulk statements, which
+# are not tracked by the session cache.
+QUERY_TABLES_MODIFIED_KEY = 'query_tables_modified'
+
 
 def get_oauth_credentials():
   from flask import session
@@ -193,6 +213,7 @@ def update_memcache_before_commit(context, modified_objects, expiry_time):
     return
 
   context.cache_manager = _get_cache_manager()
+  context.modified_objects = modified_objects
 
   if modified_objects is not None:
     if len(modified_objects.new) > 0:
@@ -218,6 +239,79 @@ def update_memcache_before_commit(context, modified_objects, expiry_time):
                    ret)
 
 
+def get_collection_generation_key(model_plural):
+  return '{}:{}'.format(COLLECTION_RESPONSE_GENERATION_KEY, model_plural)
+
+
+def invalidate_collection_responses(cache_manager):
+  """Bump response generations of collections with modified members.
+
+  Args:
+    cache_manager: cache manager whose marked_for_delete list contains
+      the collection keys of all modified objects.
+  """
+  model_plurals = {
+      key.split(':')[1] for key in cache_manager.marked_for_delete
+      if key.startswith('collection:')
+  }
+  memcache_client = cache_manager.cache_object.memcache_client
+  for model_plural in model_plurals:
+    memcache_client.incr(
+        get_collection_generation_key(model_plural), initial_value=0)
+
+
+def get_query_result_generation_key(table_name=None):
+  if table_name is None:
+    return QUERY_RESULT_GENERATION_KEY
+  return '{}:{}'.format(QUERY_RESULT_GENERATION_KEY, table_name)
+
+
+def mark_query_tables_modified(table_names, session=db.session):
+  """Remember tables modified with bulk statements in this transaction.
+
+  Rows written without the ORM are not tracked by the session cache, so
+  their tables have to be marked for invalidate_query_results.
+  """
+  session.info.setdefault(QUERY_TABLES_MODIFIED_KEY, set()).update(
+      table_names)
+
+
+def pop_query_tables_modified(session):
+  """Get and forget tables marked as modified in the session."""
+  return session.info.pop(QUERY_TABLES_MODIFIED_KEY, set())
+
+
+def bump_query_result_generations(table_names):
+  """Bump query result generations of the given tables."""
+  if getattr(settings, 'MEMCACHE_MECHANISM', False) is False:
+    return
+  if not table_names:
+    return
+  memcache_client = _get_cache_manager().cache_object.memcache_client
+  for table_name in table_names:
+    memcache_client.incr(
+        get_query_result_generation_key(table_name), initial_value=0)
+  memcache_client.incr(get_query_result_generation_key(), initial_value=0)
+
+
+def invalidate_query_results(modified_objects, table_names=()):
+  """Bump query result generations of tables with modified rows.
+
+  Args:
+    modified_objects: Cache with objects modified in a committed transaction
+        or None.
+    table_names: names of other tables modified in the transaction.
+  """
+  table_names = set(table_names)
+  if modified_objects is not None:
+    classes = {obj.__class__ for obj in itertools.chain(
+        modified_objects.new, modified_objects.dirty,
+        modified_objects.deleted)}
+    table_names.update(table.name for cls in classes
+                       for table in sqlalchemy.inspect(cls).tables)
+  bump_query_result_generations(table_names)
+
+
 def update_memcache_after_commit(context):
   """
   The memccache entries is updated after DB commit
@@ -265,7 +359,8 @@ def update_memcache_after_commit(context):
     if delete_result is not True:
       logger.error("CACHE: Failed to remove status entries from cache")
 
-  clear_permission_cache()
+  invalidate_collection_responses(cache_manager)
+  clear_permission_cache(getattr(context, "modified_objects", None))
   cache_manager.clear_cache()
 
 
@@ -318,43 +413,76 @@ def update_index(session, cache):
   """Update fulltext index records for cached objects."""
   if cache:
     indexer = get_indexer()
-    for obj in cache.new:
-      indexer.create_record(fts_record_for(obj), commit=False)
-    for obj in cache.dirty:
-      indexer.update_record(fts_record_for(obj), commit=False)
-    for obj in cache.deleted:
-      indexer.delete_record(obj.id, obj.__class__.__name__, commit=False)
+    indexer.create_records(
+        (fts_record_for(obj) for obj in cache.new), commit=False)
+    indexer.update_records(
+        (fts_record_for(obj) for obj in cache.dirty), commit=False)
+    indexer.delete_records(
+        ((obj.id, obj.__class__.__name__) for obj in cache.deleted),
+        commit=False)
     session.commit()
 
 
+def _preload_objects(objects):
+  """Load unloaded attributes of objects with one eager query per type.
+
+  Attributes that are already loaded are not overwritten, so this only saves
+  the lazy loads that serializing the objects one by one would trigger.
+  """
+  ids_by_model = defaultdict(set)
+  for obj in objects:
+    if hasattr(obj.__class__, "eager_query") and obj.id is not None:
+      ids_by_model[obj.__class__].add(obj.id)
+  for model, ids in ids_by_model.iteritems():
+    with benchmark("Preload {} {} objects".format(len(ids), model.__name__)):
+      model.eager_query().filter(model.id.in_(ids)).all()
+
+
 def _get_log_revisions(current_user_id, obj=None, force_obj=False):
-  """Generate and return revisions for all cached objects."""
+  """Generate and return revision rows for all cached objects.
+
+  Every object is serialized only once, even if it has been flushed several
+  times or is logged more than once. Deleted objects use the JSON that was
+  recorded before they were deleted.
+  """
   revisions = []
   cache = get_cache()
-  if cache:
-    cached_objects = {
-        "modified": cache.dirty,
-        "deleted": cache.deleted,
-        "created": cache.new,
-    }
-    for action, objects in cached_objects.iteritems():
-      for obj_ in objects:
-        revision = Revision(obj_, current_user_id, action, obj_.log_json())
-        revisions.append(revision)
-        if obj_.type == "ObjectOwner" and obj_.ownable:
-          # any change (create/delete/modify) of the owners is an edit on the
-          # original object. That is why the action is always set to modified.
-          revision = Revision(obj_.ownable, current_user_id, "modified",
-                              obj_.ownable.log_json())
-          revisions.append(revision)
-
-    if force_obj and obj is not None and obj not in cache.dirty:
-      # If the ``obj`` has been updated, but only its custom attributes have
-      # been changed, then this object will not be added into
-      # ``cache.dirty set``. So that its revision will not be created.
-      # The ``force_obj`` flag solves the issue, but in a bit dirty way.
-      revision = Revision(obj, current_user_id, 'modified', obj.log_json())
-      revisions.append(revision)
+  if not cache:
+    return revisions
+  contents = {o: content for o, content in cache.deleted.iteritems()
+              if content is not None}
+  with benchmark("Preload objects for revisions"):
+    _preload_objects(o for o in itertools.chain(cache.new, cache.dirty)
+                     if o not in contents)
+
+  def get_content(obj_):
+    if obj_ not in contents:
+      contents[obj_] = obj_.log_json()
+    return contents[obj_]
+
+  cached_objects = {
+      "modified": cache.dirty,
+      "deleted": cache.deleted,
+      "created": cache.new,
+  }
+  for action, objects in cached_objects.iteritems():
+    for obj_ in objects:
+      revisions.append(Revision.get_values(
+          obj_, current_user_id, action, get_content(obj_)))
+      if obj_.type == "ObjectOwner" and obj_.ownable:
+        # any change (create/delete/modify) of the owners is an edit on the
+        # original object. That is why the action is always set to modified.
+        revisions.append(Revision.get_values(
+            obj_.ownable, current_user_id, "modified",
+            get_content(obj_.ownable)))
+
+  if force_obj and obj is not None and obj not in cache.dirty:
+    # If the ``obj`` has been updated, but only its custom attributes have
+    # been changed, then this object will not be added into
+    # ``cache.dirty set``. So that its revision will not be created.
+    # The ``force_obj`` flag solves the issue, but in a bit dirty way.
+    revisions.append(Revision.get_values(
+        obj, current_user_id, 'modified', get_content(obj)))
   return revisions
 
 
@@ -362,6 +490,9 @@ def log_event(session, obj=None, current_user_id=None, flush=True,
               force_obj=False):
   """Logs an event on object `obj`.
 
+  Revisions of the event are inserted with a single executemany statement
+  instead of being added to the session.
+
   Args:
     session: Current SQLAlchemy session (db.session)
     obj: object on which some operation took place
@@ -394,20 +525,24 @@ def log_event(session, obj=None, current_user_id=None, flush=True,
         resource_id=resource_id,
         resource_type=resource_type,
         context_id=context_id)
-    event.revisions = revisions
     session.add(event)
+    session.flush()
+    with benchmark("Insert {} revisions".format(len(revisions))):
+      insert_revisions(event.id, revisions)
   return event
 
 
-def clear_permission_cache():
+def clear_permission_cache(modified_objects=None):
+  """Invalidate cached permissions that depend on the modified objects.
+
+  The permissions provider decides which users are affected. If
+  modified_objects is None, cached permissions of all users are invalidated.
+  """
   if not getattr(settings, 'MEMCACHE_MECHANISM', False):
     return
-  cache = _get_cache_manager().cache_object.memcache_client
-  cached_keys_set = cache.get('permissions:list') or set()
-  cached_keys_set.add('permissions:list')
-  # We delete all the cached user permissions as well as
-  # the permissions:list value itself
-  cache.delete_multi(cached_keys_set)
+  provider = permissions.get_permissions_provider()
+  if hasattr(provider, "invalidate_permissions"):
+    provider.invalidate_permissions(modified_objects)
 
 
 class ModelView(View):
@@ -592,10 +727,23 @@ class ModelView(View):
             search_query, models, get_current_user_id())
       search_subquery = search_query.subquery()
       query = query.filter(self.model.id.in_(search_subquery))
-    order_properties = []
+    query = query.order_by(*keyset.get_order_clauses(self.get_order_keys()))
+    # Keyset pages are limited by apply_keyset_paging
+    if '__limit' in request.args and '__after' not in request.args:
+      try:
+        limit = int(request.args['__limit'])
+        query = query.limit(limit)
+      except (TypeError, ValueError):
+        pass
+    query = query.distinct()
+    return query
+
+  def get_order_keys(self):
+    """Get (attribute, desc) tuples to order the collection by."""
+    order_keys = []
     if '__sort' in request.args:
       sort_attrs = request.args['__sort'].split(",")
-      sort_desc = request.args.get('__sort_desc', False)
+      sort_desc = bool(request.args.get('__sort_desc', False))
       for sort_attr in sort_attrs:
         attr_desc = sort_desc
         if sort_attr.startswith('-'):
@@ -603,24 +751,14 @@ class ModelView(View):
           sort_attr = sort_attr[1:]
         order_property = getattr(self.model, sort_attr, None)
         if order_property and hasattr(order_property, 'desc'):
-          if attr_desc:
-            order_property = order_property.desc()
-          order_properties.append(order_property)
+          order_keys.append((order_property, attr_desc))
         else:
           # Possibly throw an exception instead,
           # if sorting by invalid attribute?
           pass
-    order_properties.append(self.modified_attr.desc())
-    order_properties.append(self.model.id.desc())
-    query = query.order_by(*order_properties)
-    if '__limit' in request.args:
-      try:
-        limit = int(request.args['__limit'])
-        query = query.limit(limit)
-      except (TypeError, ValueError):
-        pass
-    query = query.distinct()
-    return query
+    order_keys.append((self.modified_attr, True))
+    order_keys.append((self.model.id, True))
+    return order_keys
 
   def get_object(self, id):
     # This could also use `self.pk`
@@ -882,7 +1020,7 @@ class Resource(ModelView):
         set(self.request.headers.keys()))
     if missing_headers:
       return current_app.make_response((
-          json.dumps({
+          as_json({
               "message": "Missing headers: " + ", ".join(missing_headers),
           }),
           428,
@@ -894,7 +1032,7 @@ class Resource(ModelView):
     if (request.headers["If-Match"] != object_etag or
             request.headers["If-Unmodified-Since"] != object_timestamp):
       return current_app.make_response((
-          json.dumps({
+          as_json({
               "message": "The resource could not be updated due to a conflict "
                          "with the current state on the server. Please "
                          "resolve the conflict by refreshing the resource.",
@@ -1033,6 +1171,84 @@ class Resource(ModelView):
   def has_cache(self):
     return getattr(settings, 'MEMCACHE_MECHANISM', False)
 
+  def get_collection_response_cache_key(self):
+    """Get the memcache key for the response of the current collection GET.
+
+    The key depends on the collection generation, request path and
+    arguments, permissions of the current user and the last modification of
+    the collection.
+
+    Returns:
+      key string or None if the response can not be cached.
+    """
+    # Setting background task status circumvents our memcache invalidation
+    # logic, same as in get_resources_from_cache.
+    if not self.has_cache() or self.model.__name__ == 'BackgroundTask':
+      return None
+    # Included objects of other types are not covered by the generation and
+    # the last modification of this collection.
+    if '__include' in request.args:
+      return None
+    provider = permissions.get_permissions_provider()
+    if not hasattr(provider, "get_permissions_fingerprint"):
+      return None
+    cache_manager = _get_cache_manager()
+    model_plural = cache_manager.supported_classes.get(self.model.__name__)
+    if model_plural is None:
+      return None
+    fingerprint = provider.get_permissions_fingerprint(get_current_user())
+    if fingerprint is None:
+      return None
+    memcache_client = cache_manager.cache_object.memcache_client
+    generation = memcache_client.get(
+        get_collection_generation_key(model_plural)) or 0
+    digest = hashlib.sha1(as_json([
+        request.path,
+        sorted(request.args.items(multi=True)),
+        fingerprint,
+        str(self.collection_last_modified()),
+    ])).hexdigest()
+    return 'collection_response:{}:{}:{}'.format(
+        model_plural, generation, digest)
+
+  def get_cached_collection_response(self, key):
+    """Make a response from a cached collection GET response.
+
+    Returns:
+      Flask response or None on a cache miss.
+    """
+    if key is None:
+      return None
+    memcache_client = _get_cache_manager().cache_object.memcache_client
+    cached = memcache_client.get(key)
+    if cached is None:
+      return None
+    if self.request.headers.get('If-None-Match') == cached['etag']:
+      return current_app.make_response((
+          '', 304, [('Etag', cached['etag'])]))
+    headers = [
+        ('Last-Modified', cached['last_modified']),
+        ('Etag', cached['etag']),
+        ('Content-Type', 'application/json'),
+        ('X-GGRC-Response-Cache', 'Hit'),
+    ]
+    return current_app.make_response((cached['body'], 200, headers))
+
+  def set_cached_collection_response(self, key, response):
+    """Store a collection GET response in memcache."""
+    if key is None or response.status_code != 200:
+      return
+    body = response.get_data()
+    if len(body) > MAX_COLLECTION_RESPONSE_SIZE:
+      return
+    memcache_client = _get_cache_manager().cache_object.memcache_client
+    memcache_client.set(key, {
+        'body': body,
+        'etag': response.headers['Etag'],
+        'last_modified': response.headers['Last-Modified'],
+    }, CACHE_EXPIRY_COLLECTION_RESPONSE)
+    response.headers['X-GGRC-Response-Cache'] = 'Miss'
+
   def apply_paging(self, matches_query):
     page_size = min(
         int(request.args.get('__page_size', self.DEFAULT_PAGE_SIZE)),
@@ -1058,24 +1274,166 @@ class Resource(ModelView):
     }
     return matches, collection_extras
 
+  def apply_keyset_paging(self, matches_query):
+    """Get the page of matches that follows the cursor in __after.
+
+    An empty __after requests the first page. Unlike apply_paging, this does
+    not skip rows of the previous pages with an offset, and the total is
+    counted only up to keyset.APPROXIMATE_TOTAL_LIMIT if
+    __approximate_total is given.
+    """
+    page_size = min(
+        int(request.args.get('__page_size', self.DEFAULT_PAGE_SIZE)),
+        self.MAX_PAGE_SIZE)
+    order_keys = self.get_order_keys()
+    total, approximate = keyset.count(
+        matches_query, '__approximate_total' in request.args)
+    if request.args['__after']:
+      try:
+        values = keyset.decode_token(request.args['__after'], order_keys)
+      except ValueError as error:
+        raise BadRequest(error.message)
+      matches_query = matches_query.filter(
+          keyset.get_seek_filter(order_keys, values))
+    matches = matches_query.limit(page_size + 1).all()
+    paging = {'total': total}
+    if approximate:
+      paging['total_approximate'] = True
+    if len(matches) > page_size:
+      matches = matches[:page_size]
+      last_values = db.session.query(
+          *[expr for expr, _ in order_keys]
+      ).filter(self.model.id == matches[-1][0]).one()
+      args = dict((k, unicode(v)) for k, v in request.args.items())
+      args['__after'] = keyset.encode_token(last_values)
+      paging['next'] = self.url_for() + '?' + urlencode(
+          utils.encoded_dict(args))
+    return matches, {'paging': paging}
+
   def get_matched_resources(self, matches):
+    """Get published resources for matches from memcache and the database.
+
+    Only the matches that are not found in memcache are loaded from the
+    database, and those are then added to memcache.
+
+    Returns:
+      Tuple of dicts with resources found in memcache and resources loaded
+      from the database, both keyed by their matches.
+    """
     cache_objs = {}
+    database_matches = matches
     if self.has_cache():
       self.request.cache_manager = _get_cache_manager()
       with benchmark("Query cache for resources"):
         cache_objs = self.get_resources_from_cache(matches)
       database_matches = [m for m in matches if m not in cache_objs]
-    else:
-      database_matches = matches
 
     database_objs = {}
-    if len(database_matches) > 0:
-      database_objs = self.get_resources_from_database(matches)
+    if database_matches:
+      with benchmark("Query database for {} cache misses of {} matches"
+                     .format(len(database_matches), len(matches))):
+        database_objs = self.get_resources_from_database(database_matches)
       if self.has_cache():
         with benchmark("Add resources to cache"):
           self.add_resources_to_cache(database_objs)
     return cache_objs, database_objs
 
+  @staticmethod
+  def get_cache_op(hits, misses):
+    """Get the value of the X-GGRC-Cache header for hit and miss counts."""
+    if not hits:
+      return 'Miss'
+    return 'Partial' if misses else 'Hit'
+
+  def _get_projection_column(self, field):
+    """Get the column and stub type for a projected field.
+
+    Returns:
+      (column, stub type) pair where stub type is None for plain column
+      fields, or None if the field is not backed by a single column.
+    """
+    class_attr = getattr(self.model, field, None)
+    if not isinstance(class_attr, InstrumentedAttribute):
+      return None
+    prop = class_attr.property
+    if isinstance(prop, ColumnProperty) and len(prop.columns) == 1:
+      return class_attr, None
+    if (isinstance(prop, RelationshipProperty) and
+            prop.direction is MANYTOONE and
+            len(prop.local_columns) == 1 and
+            prop.mapper.polymorphic_on is None):
+      return list(prop.local_columns)[0], prop.mapper.class_.__name__
+    return None
+
+  def get_field_projection(self):
+    """Get columns needed to build `__fields` collection members from rows.
+
+    The projection can only be used if all requested fields are published
+    columns or stubs of many-to-one relationships. Relationships and
+    revisions are excluded since permission checks for Creators need more
+    than the requested fields.
+
+    Returns:
+      dict of field names to (column, stub type) pairs or None if the
+      collection members must be loaded as full objects.
+    """
+    if ('__fields' not in request.args or '__stubs_only' in request.args or
+            '__include' in request.args or
+            self.model.__name__ in ("Relationship", "Revision") or
+            not hasattr(self.model._sa_class_manager.mapper.c, 'context_id')):
+      return None
+    builder = ggrc.builder.json.get_json_builder(self.model)
+    published = {getattr(attr, 'attr_name', attr)
+                 for attr in builder._publish_attrs}
+    include_links = {getattr(attr, 'attr_name', attr)
+                     for attr in builder._include_links}
+    projection = {}
+    for field in request.args['__fields'].split(','):
+      if field in ('id', 'type', 'selfLink'):
+        continue
+      if field not in published or field in include_links:
+        return None
+      column = self._get_projection_column(field)
+      if column is None:
+        return None
+      projection[field] = column
+    return projection
+
+  @staticmethod
+  def _get_projection_label(field):
+    return 'field_{}'.format(field)
+
+  def add_projection_columns(self, query, projection):
+    """Add projected field columns to a collection matches query."""
+    return query.add_columns(*[
+        column.label(self._get_projection_label(field))
+        for field, (column, _) in projection.items()
+    ])
+
+  def build_projected_resources(self, rows, projection):
+    """Build collection members straight from projection query rows.
+
+    Relationship fields are rendered as stubs that are loaded with a single
+    query per stub type.
+    """
+    resources = []
+    for row in rows:
+      resource = {
+          'id': row.id,
+          'type': row.type,
+          'selfLink': utils.url_for(row.type, id=row.id),
+          'context_id': row.context_id,
+      }
+      for field, (_, stub_type) in projection.items():
+        value = getattr(row, self._get_projection_label(field))
+        if stub_type is not None and value is not None:
+          value = ggrc.builder.json.LazyStubRepresentation(stub_type, value)
+        resource[field] = value
+      resources.append(resource)
+    with benchmark("Publish representation"):
+      ggrc.builder.json.publish_representation(resources)
+    return resources
+
   def collection_get(self):
     with benchmark("dispatch_request > collection_get > Check headers"):
       accept_header = self.request.headers.get('Accept', '').strip()
@@ -1087,6 +1445,13 @@ class Resource(ModelView):
         return current_app.make_response((
             'application/json', 406, [('Content-Type', 'text/plain')]))
 
+    with benchmark("dispatch_request > collection_get > Response cache"):
+      response_cache_key = self.get_collection_response_cache_key()
+      cached_response = self.get_cached_collection_response(
+          response_cache_key)
+      if cached_response is not None:
+        return cached_response
+
     with benchmark("dispatch_request > collection_get > Collection matches"):
       # We skip querying by contexts for Creator role and relationship objects,
       # because it will filter out objects that the Creator can access.
@@ -1097,16 +1462,23 @@ class Resource(ModelView):
       )
       matches_query = self.get_collection_matches(
           self.model, filter_by_contexts)
+      projection = self.get_field_projection()
+      if projection is not None:
+        matches_query = self.add_projection_columns(matches_query, projection)
     with benchmark("dispatch_request > collection_get > Query Data"):
       if '__page' in request.args or '__page_only' in request.args:
         with benchmark("Query matches with paging"):
           matches, extras = self.apply_paging(matches_query)
+      elif '__after' in request.args:
+        with benchmark("Query matches with keyset paging"):
+          matches, extras = self.apply_keyset_paging(matches_query)
       else:
         with benchmark("Query matches"):
           matches = matches_query.all()
           extras = {}
     with benchmark("dispatch_request > collection_get > Matched resources"):
       cache_op = None
+      cache_counts = None
       if '__stubs_only' in request.args:
         objs = [{
             'id': m[0],
@@ -1115,6 +1487,11 @@ class Resource(ModelView):
             'context_id': m[2]
         } for m in matches]
 
+      elif projection is not None:
+        with benchmark("Build resources from projection"):
+          objs = self.build_projected_resources(matches, projection)
+        with benchmark("Filter resources based on permissions"):
+          objs = filter_resource(objs)
       else:
         cache_objs, database_objs = self.get_matched_resources(matches)
         objs = {}
@@ -1125,11 +1502,10 @@ class Resource(ModelView):
         with benchmark("Filter resources based on permissions"):
           objs = filter_resource(objs)
 
-        cache_op = 'Hit' if len(cache_objs) > 0 else 'Miss'
+        cache_counts = (len(cache_objs), len(database_objs))
+        cache_op = self.get_cache_op(*cache_counts)
     with benchmark("dispatch_request > collection_get > Create Response"):
       # Return custom fields specified via `__fields=id,title,description` etc.
-      # TODO this can be optimized by filter_resource() not retrieving
-      # the other fields to being with
       if '__fields' in request.args:
         custom_fields = request.args['__fields'].split(',')
         objs = [{f: o[f] for f in custom_fields if f in o} for o in objs]
@@ -1143,8 +1519,12 @@ class Resource(ModelView):
             '', 304, [('Etag', etag(collection))]))
 
       with benchmark("Make response"):
-        return self.json_success_response(
-            collection, self.collection_last_modified(), cache_op=cache_op)
+        response = self.json_success_response(
+            collection, self.collection_last_modified(), cache_op=cache_op,
+            cache_counts=cache_counts)
+    with benchmark("dispatch_request > collection_get > Store response"):
+      self.set_cached_collection_response(response_cache_key, response)
+    return response
 
   def get_resources_from_cache(self, matches):
     """Get resources from cache for specified matches"""
@@ -1428,7 +1808,7 @@ class Resource(ModelView):
         else:
           task_id = int(self.request.headers.get('x-task-id'))
           task = BackgroundTask.query.get(task_id)
-          body = json.loads(task.parameters)
+          body = json_codec.loads(task.parameters)
           running_async = True
         task.start()
         no_result = True
@@ -1556,19 +1936,34 @@ class Resource(ModelView):
     paging_obj['total'] = paging.total
     return paging_obj
 
+  def _get_match_model(self, type_):
+    """Get the model for a polymorphic match type of the collection."""
+    model = ggrc.models.get_model(type_)
+    if model is None or not issubclass(model, self.model):
+      return self.model
+    return model
+
   def get_resources_from_database(self, matches):
-    # FIXME: This is cheating -- `matches` should be allowed to be any model
-    model = self.model
-    ids = {m[0]: m for m in matches}
-    with benchmark("Query database for matches"):
-      query = model.eager_query()
-      # We force the query here so that we can benchmark it
-      objs = query.filter(model.id.in_(ids.keys())).all()
-    with benchmark("Publish objects"):
-      resources = {}
-      includes = self.get_properties_to_include(request.args.get('__include'))
-      for obj in objs:
-        resources[ids[obj.id]] = ggrc.builder.json.publish(obj, includes)
+    """Load and publish objects for matches with one query per match type.
+
+    Loading subclasses of polymorphic collections with their own eager
+    queries makes sure that their relationships get loaded up front as well.
+    """
+    ids_by_type = defaultdict(dict)
+    for match in matches:
+      ids_by_type[match[1]][match[0]] = match
+    resources = {}
+    includes = self.get_properties_to_include(request.args.get('__include'))
+    for type_, ids in ids_by_type.iteritems():
+      model = self._get_match_model(type_)
+      with benchmark("Query database for {} {} matches".format(
+          len(ids), type_)):
+        query = model.eager_query()
+        # We force the query here so that we can benchmark it
+        objs = query.filter(model.id.in_(ids.keys())).all()
+      with benchmark("Publish objects"):
+        for obj in objs:
+          resources[ids[obj.id]] = ggrc.builder.json.publish(obj, includes)
     with benchmark("Publish representation"):
       ggrc.builder.json.publish_representation(resources)
     return resources
@@ -1608,7 +2003,8 @@ class Resource(ModelView):
     return format_date_time(time.mktime(timestamp.utctimetuple()))
 
   def json_success_response(self, response_object, last_modified,
-                            status=200, id=None, cache_op=None):
+                            status=200, id=None, cache_op=None,
+                            cache_counts=None):
     headers = [
         ('Last-Modified', self.http_timestamp(last_modified)),
         ('Etag', etag(response_object)),
@@ -1618,6 +2014,9 @@ class Resource(ModelView):
       headers.append(('Location', self.url_for(id=id)))
     if cache_op:
       headers.append(('X-GGRC-Cache', cache_op))
+    if cache_counts is not None:
+      headers.append(('X-GGRC-Cache-Hits', str(cache_counts[0])))
+      headers.append(('X-GGRC-Cache-Misses', str(cache_counts[1])))
     return current_app.make_response(
         (self.as_json(response_object), status, headers))
 
@@ -1638,71 +2037,146 @@ class ReadOnlyResource(Resource):
       raise NotImplementedError()
 
 
-def filter_resource(resource, depth=0, user_permissions=None):  # noqa
-  """
-  Returns:
-     The subset of resources which are readable based on user_permissions
+def _get_resource_context_id(resource):
+  """Get context id of a typed resource dict."""
+  context_id = False
+  if 'context' in resource:
+    if resource['context'] is None:
+      context_id = None
+    else:
+      context_id = resource['context']['id']
+  elif 'context_id' in resource:
+    context_id = resource['context_id']
+  assert context_id is not False, "No context found for object"
+  return context_id
+
+
+def _iter_typed_resources(resource):
+  """Yield all typed resource dicts in a resource tree."""
+  if isinstance(resource, (list, tuple)):
+    for sub_resource in resource:
+      for typed_resource in _iter_typed_resources(sub_resource):
+        yield typed_resource
+  elif isinstance(resource, Mapping) and 'type' in resource:
+    yield resource
+    for key, value in resource.items():
+      if key != 'context' and isinstance(value, Mapping) and 'type' in value:
+        for typed_resource in _iter_typed_resources(value):
+          yield typed_resource
+
+
+class ReadPermissionResolver(object):
+  """Resolve read permissions for all resources in a tree at once.
+
+  Resources are first collected into (type, id, context_id) stubs and the
+  permission decisions are made for the whole set, so that the cost of
+  filtering does not depend on the number of times a permission check is
+  repeated for the same object. Revisions checked for Creators are loaded
+  with a single query per revisioned resource type.
   """
 
-  if user_permissions is None:
-    user_permissions = permissions.permissions_for(get_current_user())
+  def __init__(self, user_permissions, is_creator):
+    self.user_permissions = user_permissions
+    self.is_creator = is_creator
+    self.allowed_stubs = set()
+    self.readable_revision_targets = set()
+    self._endpoint_permissions = {}
 
+  @staticmethod
+  def _get_stub(resource):
+    return (resource['type'], resource['id'],
+            _get_resource_context_id(resource))
+
+  def resolve(self, resource):
+    """Resolve permissions for all typed resources in the resource tree."""
+    stubs = set()
+    revision_targets = defaultdict(set)
+    for typed_resource in _iter_typed_resources(resource):
+      stub = self._get_stub(typed_resource)
+      if self.is_creator and stub[0] == "Revision":
+        revision_targets[typed_resource['resource_type']].add(
+            typed_resource['resource_id'])
+      elif not (self.is_creator and stub[0] == "Relationship"):
+        stubs.add(stub)
+    self._resolve_stubs(stubs)
+    self._resolve_revision_targets(revision_targets)
+
+  def _resolve_stubs(self, stubs):
+    """Store all stubs that the user is allowed to read."""
+    if hasattr(self.user_permissions, "filter_allowed"):
+      self.allowed_stubs = self.user_permissions.filter_allowed("read", stubs)
+    else:
+      self.allowed_stubs = {stub for stub in stubs
+                            if self.user_permissions.is_allowed_read(*stub)}
+
+  def _resolve_revision_targets(self, revision_targets):
+    """Load revisioned objects by type and check read access on them."""
+    for resource_type, ids in revision_targets.items():
+      res_model = getattr(ggrc.models.all_models, resource_type)
+      instances = res_model.query.filter(res_model.id.in_(ids))
+      self.readable_revision_targets.update(
+          (resource_type, instance.id) for instance in instances
+          if self.user_permissions.is_allowed_read_for(instance)
+      )
+
+  def _get_endpoint_permissions(self, resource_type):
+    """Get cached read contexts and resources for a relationship endpoint."""
+    if resource_type not in self._endpoint_permissions:
+      contexts = permissions.read_contexts_for(resource_type)
+      if contexts is not None:
+        contexts = set(contexts)
+      resources = set(permissions.read_resources_for(resource_type) or [])
+      self._endpoint_permissions[resource_type] = (contexts, resources)
+    return self._endpoint_permissions[resource_type]
+
+  def _can_read_relationship(self, resource):
+    """Check if a Creator can read both relationship endpoints.
+
+    In order to avoid loading full instances and using is_allowed_read_for,
+    we are making a special test for the Creator here. Creator can only see
+    relationship objects where he has read access on both source and
+    destination. This is defined in Creator.py:220 file, but is_allowed_read
+    can not check conditions without the full instance.
+    """
+    for name in ('source', 'destination'):
+      inst = resource[name]
+      if not inst:
+        # If object was deleted but relationship still exists
+        continue
+      contexts, resources = self._get_endpoint_permissions(inst['type'])
+      if contexts is None:
+        # read_contexts_for returns None if the user has access to all the
+        # objects of this type. If the user doesn't have access to any object
+        # an empty list ([]) will be returned
+        continue
+      if inst['context_id'] not in contexts and inst['id'] not in resources:
+        return False
+    return True
+
+  def is_readable(self, resource):
+    """Check if a single typed resource is readable."""
+    stub = self._get_stub(resource)
+    if self.is_creator and stub[0] == "Relationship":
+      return self._can_read_relationship(resource)
+    if self.is_creator and stub[0] == "Revision":
+      return ((resource['resource_type'], resource['resource_id']) in
+              self.readable_revision_targets)
+    return stub in self.allowed_stubs
+
+
+def _prune_resource(resource, resolver):
+  """Remove all resources that are not readable from a resource tree."""
   if isinstance(resource, (list, tuple)):
     filtered = []
     for sub_resource in resource:
-      filtered_sub_resource = filter_resource(
-          sub_resource, depth=depth + 1, user_permissions=user_permissions)
+      filtered_sub_resource = _prune_resource(sub_resource, resolver)
       if filtered_sub_resource is not None:
         filtered.append(filtered_sub_resource)
     return filtered
-  elif isinstance(resource, dict) and 'type' in resource:
+  elif isinstance(resource, Mapping) and 'type' in resource:
     # First check current level
-    context_id = False
-    if 'context' in resource:
-      if resource['context'] is None:
-        context_id = None
-      else:
-        context_id = resource['context']['id']
-    elif 'context_id' in resource:
-      context_id = resource['context_id']
-    assert context_id is not False, "No context found for object"
-
-    # In order to avoid loading full instances and using is_allowed_read_for,
-    # we are making a special test for the Creator here. Creator can only
-    # see relationship objects where he has read access on both source and
-    # destination. This is defined in Creator.py:220 file, but is_allowed_read
-    # can not check conditions without the full instance
-    if resource['type'] == "Relationship" and _is_creator():
-      # Make a check for relationship objects that are a special case
-      can_read = True
-      for name in ('source', 'destination'):
-        inst = resource[name]
-        if not inst:
-          # If object was deleted but relationship still exists
-          continue
-        contexts = permissions.read_contexts_for(inst['type'])
-        if contexts is None:
-          # read_contexts_for returns None if the user has access to all the
-          # objects of this type. If the user doesn't have access to any object
-          # an empty list ([]) will be returned
-          continue
-        resources = permissions.read_resources_for(inst['type']) or []
-        if inst['context_id'] in contexts or inst['id'] in resources:
-          continue
-        can_read = False
-      if not can_read:
-        return None
-    elif resource['type'] == "Revision" and _is_creator():
-      # Make a check for revision objects that are a special case
-      res_model = getattr(ggrc.models.all_models, resource['resource_type'])
-      instance = res_model.query.get(resource['resource_id'])
-      if instance is None or\
-         not user_permissions.is_allowed_read_for(instance):
-        return None
-    else:
-      if not user_permissions.is_allowed_read(resource['type'],
-                                              resource['id'], context_id):
-        return None
+    if not resolver.is_readable(resource):
+      return None
     # Then, filter any typed keys
     for key, value in resource.items():
       if key == 'context':
@@ -1710,15 +2184,39 @@ def filter_resource(resource, depth=0, user_permissions=None):  # noqa
         pass
       else:
         # Apply filtering to sub-resources
-        if isinstance(value, dict) and 'type' in value:
-          resource[key] = filter_resource(
-              value, depth=depth + 1, user_permissions=user_permissions)
-
+        if isinstance(value, Mapping) and 'type' in value:
+          resource[key] = _prune_resource(value, resolver)
     return resource
   else:
     assert False, "Non-object passed to filter_resource"
 
 
+def filter_resource(resource, depth=0, user_permissions=None):
+  """Filter out all resources that the user is not allowed to read.
+
+  Permissions for the whole resource tree are resolved in a single pass
+  before any resource is removed.
+
+  Args:
+    resource: Typed resource dict or a list of them.
+    depth: Unused, kept for backwards compatibility.
+    user_permissions: Permissions used for filtering. Defaults to the
+        permissions of the current user.
+
+  Returns:
+     The subset of resources which are readable based on user_permissions
+  """
+  # pylint: disable=unused-argument
+  if user_permissions is None:
+    user_permissions = permissions.permissions_for(get_current_user())
+
+  with benchmark("filter_resource: resolve permissions"):
+    resolver = ReadPermissionResolver(user_permissions, _is_creator())
+    resolver.resolve(resource)
+  with benchmark("filter_resource: prune resources"):
+    return _prune_resource(resource, resolver)
+
+
 def _is_creator():
   current_user = get_current_user()
   return hasattr(current_user, 'system_wide_role') \
@@ -66,7 +66,8 @@ def get_objects_by_query():
                         if result["last_modified"]]
   last_modified = max(last_modified_list) if last_modified_list else None
   collections = []
-  collection_fields = ["ids", "values", "count", "total"]
+  collection_fields = ["ids", "values", "count", "total", "total_approximate",
+                       "next"]
 
   for result in results:
     if last_modified is None:
@@ -3,9 +3,36 @@
 
 """This module contains special query helper class for query API."""
 
+import copy
+import hashlib
+import Queue
+import sys
+import threading
+
+import flask
+import sqlalchemy as sa
+
+from ggrc import db
+from ggrc import models
+from ggrc import settings
 from ggrc.builder import json
 from ggrc.converters.query_helper import QueryHelper
-from ggrc.utils import benchmark
+from ggrc.login import get_current_user
+from ggrc.rbac import permissions
+from ggrc.services import common
+from ggrc.utils import as_json, benchmark
+
+
+# Results with more ids would not fit into a memcache entry.
+MAX_CACHED_IDS = 100000
+
+# Worker threads for independent object queries are shared by all requests
+# of the process, so that they can not use up the database connection pool.
+_worker_slots = threading.BoundedSemaphore(  # pylint: disable=invalid-name
+    getattr(settings, "QUERY_API_MAX_WORKERS", 0))
+
+# Request globals that are set per object query or are not thread safe.
+_WORKER_LOCAL_GLOBALS = {"cache", "referenced_objects", "similar_objects_query"}
 
 
 # pylint: disable=too-few-public-methods
@@ -16,8 +43,12 @@ class QueryAPIQueryHelper(QueryHelper):
   query object = [
     {
       # the same parameters as in QueryHelper
-      type: "values", "ids" or "count" - the type of results requested
+      type: "values", "ids" or "count" - the type of results requested; counts
+            are selected with SELECT COUNT, without fetching ids
       fields: [ a list of fields to include in JSON if type is "values" ]
+      after: optional; cursor of the requested page for keyset pagination,
+             null for the first page; the page size is the length of "limit"
+      approximate_total: optional; if true, count at most 10000 objects
     }
   ]
 
@@ -31,7 +62,136 @@ class QueryAPIQueryHelper(QueryHelper):
       ids: [ ids of filtered objects ] (present if type is "ids")
       count: the number of objects filtered, after "limit" is applied
       total: the number of objects filtered, before "limit" is applied
+      total_approximate: true if total is only a lower bound
+      next: cursor of the next page if "after" was given, null on last page
   """
+
+  def _get_ids(self, object_query):
+    """Get ids of filtered objects, using cached ids if possible.
+
+    The cache stores all ids matching a query, regardless of its "limit", so
+    that each page of a paginated query is a slice of the same cache entry.
+    Entries are stored with the generations of all tables read by the query
+    and are ignored once any of those tables is modified. Queries with more
+    than MAX_CACHED_IDS results are cached as such, and only the requested
+    page is queried for them.
+    """
+    key = self._get_result_cache_key(object_query)
+    if key is None:
+      return super(QueryAPIQueryHelper, self)._get_ids(object_query)
+    limit = object_query.get("limit")
+    if limit:
+      first, last = self._parse_limit(limit)
+    # pylint: disable=protected-access
+    memcache_client = common._get_cache_manager().cache_object.memcache_client
+    with benchmark("Get cached ids: _get_ids > _get_cached_ids"):
+      ids = self._get_cached_ids(memcache_client, key)
+    if ids is None:
+      ids = self._get_all_ids(memcache_client, key, object_query)
+    if ids is False:
+      return super(QueryAPIQueryHelper, self)._get_ids(object_query)
+    object_query["total"] = len(ids)
+    if limit:
+      ids = ids[first:last]
+    return ids
+
+  def _get_result_cache_key(self, object_query):
+    """Get the memcache key for all ids matching the object query.
+
+    Returns:
+      key string or None if the result can not be cached.
+    """
+    if not getattr(settings, "MEMCACHE_MECHANISM", False):
+      return None
+    if "after" in object_query:
+      # keyset pages are cheap to query and are not sliced from cached ids
+      return None
+    expression = object_query.get("filters", {}).get("expression")
+    if expression is None:
+      return None
+    provider = permissions.get_permissions_provider()
+    if not hasattr(provider, "get_permissions_fingerprint"):
+      return None
+    fingerprint = provider.get_permissions_fingerprint(get_current_user())
+    if fingerprint is None:
+      return None
+    expression = self._resolve_backlinks(expression)
+    if expression is None:
+      return None
+    digest = hashlib.sha1(as_json([
+        object_query["object_name"],
+        object_query.get("permissions", "read"),
+        expression,
+        object_query.get("order_by"),
+        fingerprint,
+    ], sort_keys=True)).hexdigest()
+    return "query_result:{}".format(digest)
+
+  def _resolve_backlinks(self, expression):
+    """Replace references to previous queries with their resulting ids.
+
+    Returns:
+      copy of the expression or None if a previous query has no ids.
+    """
+    expression = copy.deepcopy(expression)
+    stack = [expression]
+    while stack:
+      exp = stack.pop()
+      if not isinstance(exp, dict):
+        continue
+      if exp.get("object_name") == "__previous__":
+        previous_query = self.query[exp["ids"][0]]
+        if "ids" not in previous_query:
+          return None
+        exp["object_name"] = previous_query["object_name"]
+        exp["ids"] = sorted(previous_query["ids"])
+      stack.extend(exp.values())
+    return expression
+
+  @staticmethod
+  def _get_cached_ids(memcache_client, key):
+    """Get cached ids if no table read by their query changed since.
+
+    Returns:
+      list of ids, False if there were too many ids to cache, or None.
+    """
+    cached = memcache_client.get(key)
+    if cached is None:
+      return None
+    generations = memcache_client.get_multi(cached["generations"].keys())
+    for generation_key, generation in cached["generations"].iteritems():
+      if generations.get(generation_key, 0) != generation:
+        return None
+    return cached["ids"]
+
+  def _get_all_ids(self, memcache_client, key, object_query):
+    """Get all ids matching the object query and store them in memcache.
+
+    At most MAX_CACHED_IDS + 1 ids are fetched. If there are more, False is
+    stored and returned instead of the ids. The result is not stored if
+    anything was committed while it was being queried, since the changes
+    could have been missed by the query.
+    """
+    global_key = common.get_query_result_generation_key()
+    global_generation = memcache_client.get(global_key) or 0
+    self._query_tables = set()
+    capped_query = dict(object_query, limit=[0, MAX_CACHED_IDS + 1],
+                        approximate_total=True)
+    ids = super(QueryAPIQueryHelper, self)._get_ids(capped_query)
+    if len(ids) > MAX_CACHED_IDS:
+      ids = False
+    generation_keys = [common.get_query_result_generation_key(table_name)
+                       for table_name in self._query_tables]
+    generations = memcache_client.get_multi(generation_keys + [global_key])
+    if generations.get(global_key, 0) != global_generation:
+      return ids
+    memcache_client.set(key, {
+        "ids": ids,
+        "generations": {generation_key: generations.get(generation_key, 0)
+                        for generation_key in generation_keys},
+    }, common.CACHE_EXPIRY_QUERY_RESULT)
+    return ids
+
   def get_results(self):
     """Filter the objects and get their information.
 
@@ -43,32 +203,149 @@ class QueryAPIQueryHelper(QueryHelper):
                      the filter.
     """
     for object_query in self.query:
-      query_type = object_query.get("type", "values")
-      if query_type not in {"values", "ids", "count"}:
+      if object_query.get("type", "values") not in {"values", "ids", "count"}:
         raise NotImplementedError("Only 'values', 'ids' and 'count' queries "
                                   "are supported now")
-      model = self.object_map[object_query["object_name"]]
-      if query_type == "values":
-        with benchmark("Get result set: get_results > _get_objects"):
-          objects = self._get_objects(object_query)
-        object_query["count"] = len(objects)
-        with benchmark("get_results > _get_last_modified"):
-          object_query["last_modified"] = self._get_last_modified(model,
-                                                                  objects)
-        with benchmark("serialization: get_results > _transform_to_json"):
-          object_query["values"] = self._transform_to_json(
-              objects,
-              object_query.get("fields"),
-          )
+    linked = self._get_linked_query_indexes()
+    independent_queries = Queue.Queue()
+    dependent_queries = []
+    count_queries = []
+    for index, object_query in enumerate(self.query):
+      if index in linked:
+        dependent_queries.append(object_query)
+      elif object_query.get("type") == "count":
+        count_queries.append(object_query)
       else:
-        with benchmark("Get result set: get_results -> _get_ids"):
-          ids = self._get_ids(object_query)
-        object_query["count"] = len(ids)
-        object_query["last_modified"] = None  # synonymous to now()
-        if query_type == "ids":
-          object_query["ids"] = ids
+        independent_queries.put(object_query)
+
+    workers = self._start_workers(independent_queries)
+    try:
+      if count_queries:
+        with benchmark("Get counts: get_results > _get_counts"):
+          self._get_counts(count_queries)
+      for object_query in dependent_queries:
+        self._get_result(object_query)
+      self._get_queued_results(independent_queries)
+    finally:
+      for worker in workers:
+        worker.join()
+    for worker in workers:
+      if worker.exc_info is not None:
+        raise worker.exc_info[0], worker.exc_info[1], worker.exc_info[2]
     return self.query
 
+  def _get_linked_query_indexes(self):
+    """Get indexes of object queries referencing or referenced by others.
+
+    Returns:
+      set of indexes of object queries that must be evaluated in order.
+    """
+    linked = set()
+    for index, object_query in enumerate(self.query):
+      stack = [object_query.get("filters", {}).get("expression")]
+      while stack:
+        exp = stack.pop()
+        if not isinstance(exp, dict):
+          continue
+        if exp.get("object_name") == "__previous__":
+          linked.update([index, exp["ids"][0]])
+        stack.extend(exp.values())
+    return linked
+
+  def _start_workers(self, queries):
+    """Start threads that evaluate queued object queries.
+
+    The current thread evaluates object queries as well, so one thread less
+    than the number of queued queries is started, and no more than there are
+    free worker slots.
+
+    Returns:
+      list of started worker threads.
+    """
+    workers = []
+    for _ in range(queries.qsize() - 1):
+      if not _worker_slots.acquire(False):
+        break
+      worker = _QueryWorker(copy.copy(self), queries)
+      worker.start()
+      workers.append(worker)
+    return workers
+
+  def _get_queued_results(self, queries):
+    """Evaluate object queries from the queue until it is empty."""
+    while True:
+      try:
+        object_query = queries.get_nowait()
+      except Queue.Empty:
+        return
+      self._get_result(object_query)
+
+  def _get_result(self, object_query):
+    """Evaluate an object query and store its results in it."""
+    query_type = object_query.get("type", "values")
+    model = self.object_map[object_query["object_name"]]
+    if query_type == "values":
+      with benchmark("Get result set: get_results > _get_objects"):
+        objects = self._get_objects(object_query)
+      object_query["count"] = len(objects)
+      with benchmark("get_results > _get_last_modified"):
+        object_query["last_modified"] = self._get_last_modified(model,
+                                                                objects)
+      with benchmark("serialization: get_results > _transform_to_json"):
+        object_query["values"] = self._transform_to_json(
+            objects,
+            object_query.get("fields"),
+        )
+    elif query_type == "count":
+      with benchmark("Get count: get_results -> _get_counts"):
+        self._get_counts([object_query])
+    else:
+      with benchmark("Get result set: get_results -> _get_ids"):
+        ids = self._get_ids(object_query)
+      object_query["count"] = len(ids)
+      object_query["last_modified"] = None  # synonymous to now()
+      object_query["ids"] = ids
+
+  def _get_counts(self, object_queries):
+    """Count objects matching object queries and store the counts in them.
+
+    The counts of all object queries are selected by a single statement, a
+    UNION ALL of one SELECT COUNT per object query, so that no ids have to be
+    fetched from the database.
+    """
+    statements = []
+    for index, object_query in enumerate(object_queries):
+      object_query["total"] = 0
+      query = self._get_filtered_query(object_query)
+      self._clear_similar_objects_query()
+      if query is None:
+        continue
+      object_class = self.object_map[object_query["object_name"]]
+      statements.append(query.order_by(None).statement.with_only_columns([
+          sa.literal(index).label("query_index"),
+          sa.func.count(object_class.id).label("total"),
+      ]))
+    if len(statements) == 1:
+      rows = db.session.execute(statements[0])
+    elif statements:
+      rows = db.session.execute(sa.union_all(*statements))
+    else:
+      rows = []
+    for index, total in rows:
+      object_queries[index]["total"] = total
+    for object_query in object_queries:
+      object_query["count"] = self._get_limited_count(
+          object_query["total"], object_query.get("limit"))
+      object_query["last_modified"] = None  # synonymous to now()
+
+  @classmethod
+  def _get_limited_count(cls, total, limit):
+    """Get the number of objects on the page selected by the limit."""
+    if not limit:
+      return total
+    first, last = cls._parse_limit(limit)
+    return max(0, min(total, last) - first)
+
   @staticmethod
   def _transform_to_json(objects, fields=None):
     """Make a JSON representation of objects from the list."""
@@ -86,3 +363,44 @@ class QueryAPIQueryHelper(QueryHelper):
       return None
     else:
       return max(obj.updated_at for obj in objects)
+
+
+class _QueryWorker(threading.Thread):
+  """Thread that evaluates queued object queries.
+
+  The worker runs in a new request context for the environment of the
+  current request, with its own database session, and shares cached request
+  globals, such as permissions, with the current request. The current user
+  is loaded again in the session of the worker, because instances of the
+  session of the current request must not be used from other threads.
+  """
+
+  def __init__(self, query_helper, queries):
+    super(_QueryWorker, self).__init__()
+    self.daemon = True
+    self.query_helper = query_helper
+    self.query_helper._query_tables = set()  # pylint: disable=protected-access
+    self.queries = queries
+    self.exc_info = None
+    self.context = flask.current_app.request_context(
+        dict(flask.request.environ))
+    # pylint: disable=protected-access
+    user = getattr(flask._request_ctx_stack.top, "user", None)
+    self.user_id = getattr(user, "id", None)
+    self.request_globals = {
+        key: value for key, value in vars(flask.g).iteritems()
+        if key not in _WORKER_LOCAL_GLOBALS
+    }
+
+  def run(self):
+    try:
+      with self.context:
+        if self.user_id is not None:
+          self.context.user = models.Person.query.get(self.user_id)
+        vars(flask.g).update(self.request_globals)
+        # pylint: disable=protected-access
+        self.query_helper._get_queued_results(self.queries)
+    except Exception:  # pylint: disable=broad-except
+      self.exc_info = sys.exc_info()
+    finally:
+      _worker_slots.release()
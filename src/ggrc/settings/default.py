@@ -69,6 +69,22 @@ SQLALCHEMY_DATABASE_URI = os.environ.get('GGRC_DATABASE_URI', '')
 SECRET_KEY = os.environ.get('GGRC_SECRET_KEY', 'Replace-with-something-secret')
 
 MEMCACHE_MECHANISM = True
+# Memcache client backend: appengine, memcached or local (see ggrc.cache)
+MEMCACHE_BACKEND = os.environ.get('GGRC_MEMCACHE_BACKEND', 'appengine')
+MEMCACHE_SERVERS = [
+    server.strip() for server in
+    os.environ.get('GGRC_MEMCACHE_SERVERS', '127.0.0.1:11211').split(',')]
+# Maximal number of entries in the local backend
+MEMCACHE_LOCAL_SIZE = int(os.environ.get('GGRC_MEMCACHE_LOCAL_SIZE', '10000'))
+
+# Maximal number of threads per process that evaluate independent object
+# queries of Query API requests concurrently, 0 disables them
+QUERY_API_MAX_WORKERS = int(os.environ.get('GGRC_QUERY_API_MAX_WORKERS', '4'))
+
+# Use the n-gram index for full text searches, the full text index has to be
+# rebuilt after this is changed
+FULLTEXT_INVERTED_INDEX = (
+    os.environ.get('GGRC_FULLTEXT_INVERTED_INDEX', '') == 'true')
 
 # AppEngine Email
 APPENGINE_EMAIL = os.environ.get('APPENGINE_EMAIL', '')
@@ -16,6 +16,8 @@ from sqlalchemy.sql.expression import bindparam
 from ggrc import db
 from ggrc import models
 from ggrc.login import get_current_user_id
+from ggrc.models import object_link
+from ggrc.models.revision import refresh_latest_revisions
 from ggrc.utils import benchmark
 
 from ggrc.snapshotter.datastructures import Attr
@@ -250,7 +252,7 @@ class SnapshotGenerator(object):
           revision_payload += [data]
 
       with benchmark("Insert Snapshot entries into Revision"):
-        self._execute(models.Revision.__table__.insert(), revision_payload)
+        self._insert_revisions(revision_payload)
       return OperationResponse("update", True, for_update, response_data)
 
   def analyze(self):
@@ -325,8 +327,54 @@ class SnapshotGenerator(object):
       True if successful.
     """
     if data and not self.dry_run:
+      from ggrc.services.common import bump_query_result_generations
       engine = db.engine
       engine.execute(operation, data)
+      # engine statements are committed right away
+      bump_query_result_generations([operation.table.name])
+      db.session.commit()
+
+  def _insert_object_links(self, pairs, relationship_payload):
+    """Insert object links of created snapshots and relationships.
+
+    Args:
+      pairs: set of (parent, child) pairs with created snapshots.
+      relationship_payload: list of created relationship column values.
+    """
+    if self.dry_run or not pairs:
+      return
+    snapshot = models.Snapshot
+    object_link.insert_missing_links(
+        "audit_snapshot",
+        tuple_(snapshot.parent_type, snapshot.parent_id,
+               snapshot.child_type, snapshot.child_id).in_(
+                   {(pair.parent.type, pair.parent.id,
+                     pair.child.type, pair.child.id) for pair in pairs}),
+    )
+    if relationship_payload:
+      rel = models.Relationship
+      object_link.insert_missing_links(
+          "relationship",
+          tuple_(rel.source_type, rel.source_id,
+                 rel.destination_type, rel.destination_id).in_(
+                     {(row["source_type"], row["source_id"],
+                       row["destination_type"], row["destination_id"])
+                      for row in relationship_payload}),
+      )
+    db.session.commit()
+
+  def _insert_revisions(self, revision_payload):
+    """Insert revisions and update latest revisions of their resources.
+
+    Args:
+      revision_payload: a list of dictionaries with revision column values.
+    """
+    self._execute(models.Revision.__table__.insert(), revision_payload)
+    if revision_payload and not self.dry_run:
+      refresh_latest_revisions(stubs={
+          (row["resource_type"], row["resource_id"])
+          for row in revision_payload
+      })
       db.session.commit()
 
   def create(self, event, revisions, _filter=None):
@@ -412,6 +460,11 @@ class SnapshotGenerator(object):
       with benchmark("Snapshot._create.write relationships to database"):
         self._execute(models.Relationship.__table__.insert(),
                       relationship_payload)
+        from ggrc.automapper import drop_relationship_adjacency
+        drop_relationship_adjacency()
+
+      with benchmark("Snapshot._create.write object links"):
+        self._insert_object_links(for_create, relationship_payload)
 
       with benchmark("Snapshot._create.get created relationships"):
         created_relationships = {
@@ -438,7 +491,7 @@ class SnapshotGenerator(object):
             revision_payload += [data]
 
       with benchmark("Snapshot._create.write revisions to database"):
-        self._execute(models.Revision.__table__.insert(), revision_payload)
+        self._insert_revisions(revision_payload)
       return OperationResponse("create", True, for_create, response_data)
 
   def _copy_snapshot_relationships(self):
@@ -484,6 +537,19 @@ class SnapshotGenerator(object):
           "user_id": get_current_user_id(),
           "parent_id": parent.id
       })
+      rel = models.Relationship
+      object_link.insert_missing_links(
+          "relationship",
+          rel.source_type == "Snapshot",
+          rel.destination_type == "Snapshot",
+          rel.source_id.in_(db.session.query(models.Snapshot.id).filter(
+              models.Snapshot.parent_type == parent.type,
+              models.Snapshot.parent_id == parent.id)),
+      )
+    from ggrc.automapper import drop_relationship_adjacency
+    from ggrc.services.common import mark_query_tables_modified
+    drop_relationship_adjacency()
+    mark_query_tables_modified([models.Relationship.__tablename__])
 
 
 def create_snapshots(objs, event, revisions=None, _filter=None, dry_run=False):
@@ -3,13 +3,13 @@
 
 """Various simple helper functions for snapshot generator"""
 
-import collections
 from logging import getLogger
 
 from sqlalchemy.sql.expression import tuple_
 
 from ggrc import db
 from ggrc import models
+from ggrc.models.revision import get_latest_revision_ids
 from ggrc.snapshotter.datastructures import Stub
 from ggrc.snapshotter.datastructures import Pair
 from ggrc.utils import benchmark
@@ -17,57 +17,92 @@ from ggrc.utils import benchmark
 logger = getLogger(__name__)  # pylint: disable=invalid-name
 
 
+def _get_requested_revisions(pairs, revisions, filters):
+  """Validate revisions that were explicitly requested for pairs.
+
+  Returns:
+    dict with pairs as keys and requested revision ids that exist in the
+    history of the pair child as values.
+  """
+  requested = {pair: revisions[pair] for pair in pairs if pair in revisions}
+  if not requested:
+    return {}
+  query = db.session.query(
+      models.Revision.id,
+      models.Revision.resource_type,
+      models.Revision.resource_id,
+  ).filter(
+      models.Revision.id.in_(set(requested.values()))
+  )
+  for _filter in filters or []:
+    query = query.filter(_filter)
+  existing = {(revid, Stub(restype, resid))
+              for revid, restype, resid in query}
+
+  revision_id_cache = dict()
+  for pair, revid in requested.items():
+    if (revid, pair.child) in existing:
+      revision_id_cache[pair] = revid
+    else:
+      logger.warning(
+          "Specified revision for object %s but couldn't find the"
+          "revision '%s' in object history", pair, revid)
+  return revision_id_cache
+
+
+def _scan_latest_revisions(child_stubs, filters):
+  """Find latest matching revisions by scanning the revision history."""
+  query = db.session.query(
+      models.Revision.id,
+      models.Revision.resource_type,
+      models.Revision.resource_id).filter(
+      tuple_(
+          models.Revision.resource_type,
+          models.Revision.resource_id).in_(child_stubs)
+  ).order_by(models.Revision.id.desc())
+  for _filter in filters or []:
+    query = query.filter(_filter)
+  latest = dict()
+  for revid, restype, resid in query:
+    latest.setdefault(Stub(restype, resid), revid)
+  return latest
+
+
 def get_revisions(pairs, revisions, filters=None):
   """Retrieve revision ids for pairs
 
   If revisions dictionary is provided it will validate that the selected
   revision exists in the objects revision history.
 
+  Latest revisions are read from the latest revisions lookup table. The
+  revision history is only scanned for objects whose latest revision does not
+  match the filters.
+
   Args:
     pairs: set([(parent_1, child_1), (parent_2, child_2), ...])
     revisions: dict({(parent, child): revision_id, ...})
     filters: predicate
   """
   with benchmark("snapshotter.helpers.get_revisions"):
-    revision_id_cache = dict()
-
-    if pairs:
-      with benchmark("get_revisions.create caches"):
-        child_stubs = {pair.child for pair in pairs}
-
-        with benchmark("get_revisions.create child -> parents cache"):
-          parents_cache = collections.defaultdict(set)
-          for parent, child in pairs:
-            parents_cache[child].add(parent)
-
-      with benchmark("get_revisions.retrieve revisions"):
-        query = db.session.query(
-            models.Revision.id,
-            models.Revision.resource_type,
-            models.Revision.resource_id).filter(
-            tuple_(
-                models.Revision.resource_type,
-                models.Revision.resource_id).in_(child_stubs)
-        ).order_by(models.Revision.id.desc())
-        if filters:
-          for _filter in filters:
-            query = query.filter(_filter)
-
-      with benchmark("get_revisions.create revision_id cache"):
-        for revid, restype, resid in query:
-          child = Stub(restype, resid)
-          for parent in parents_cache[child]:
-            key = Pair(parent, child)
-            if key in revisions:
-              if revid == revisions[key]:
-                revision_id_cache[key] = revid
-              else:
-                logger.warning(
-                    "Specified revision for object %s but couldn't find the"
-                    "revision '%s' in object history", key, revisions[key])
-            else:
-              if key not in revision_id_cache:
-                revision_id_cache[key] = revid
+    if not pairs:
+      return dict()
+
+    with benchmark("get_revisions.validate requested revisions"):
+      revision_id_cache = _get_requested_revisions(pairs, revisions, filters)
+
+    with benchmark("get_revisions.retrieve latest revisions"):
+      child_stubs = {pair.child for pair in pairs if pair not in revisions}
+      latest = {
+          Stub(*stub): revid for stub, revid in
+          get_latest_revision_ids(child_stubs, filters).items()
+      }
+      missing = child_stubs - set(latest)
+      if missing:
+        latest.update(_scan_latest_revisions(missing, filters))
+
+    for pair in pairs:
+      if pair not in revisions and pair.child in latest:
+        revision_id_cache[pair] = latest[pair.child]
     return revision_id_cache
 
 
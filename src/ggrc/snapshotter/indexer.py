@@ -7,13 +7,18 @@ from sqlalchemy.sql.expression import tuple_
 
 from ggrc import db
 from ggrc import models
-from ggrc.fulltext.mysql import MysqlRecordProperty as Record
+from ggrc.fulltext import get_indexer
 from ggrc.models.reflection import AttributeInfo
+from ggrc.utils import benchmark
 
 from ggrc.snapshotter.rules import Types
 from ggrc.snapshotter.datastructures import Pair
 
 
+# Number of snapshots whose records are replaced at once.
+REINDEX_BATCH_SIZE = 500
+
+
 def _get_tag(pair):
   return u"{parent_type}-{parent_id}-{child_type}".format(
       parent_type=pair.parent.type,
@@ -36,24 +41,22 @@ def _get_child_property(pair):
   )
 
 
-def _get_columns():
-  """Get common columns for snapshots and revisions tables."""
-
-  snapshot_columns = db.session.query(
+def _get_snapshot_query():
+  """Get query for snapshot columns joined with their revision content."""
+  return db.session.query(
       models.Snapshot.id,
       models.Snapshot.context_id,
       models.Snapshot.parent_type,
       models.Snapshot.parent_id,
       models.Snapshot.child_type,
       models.Snapshot.child_id,
-      models.Snapshot.revision_id
-  )
-  revision_columns = db.session.query(
-      models.Revision.id,
+      models.Snapshot.revision_id,
       models.Revision.resource_type,
-      models.Revision.content
+      models.Revision.content,
+  ).join(
+      models.Revision,
+      models.Revision.id == models.Snapshot.revision_id,
   )
-  return snapshot_columns, revision_columns
 
 
 def _get_model_properties():
@@ -64,8 +67,8 @@ def _get_model_properties():
   Returns:
     tuple(class_properties dict, custom_attribute_definitions dict) - Tuple of
         dictionaries, first one representing a list of searchable attributes
-        for every model and second one representing dictionary of custom
-        attribute definition attributes.
+        for every model and second one mapping custom attribute definition
+        ids to their titles.
   """
   # pylint: disable=protected-access
   from ggrc.models import all_models
@@ -89,58 +92,57 @@ def _get_model_properties():
         getattr(all_models, klass_name), '_fulltext_attrs')
     class_properties[klass_name] = model_attributes
 
-  return class_properties, cad_query.all()
+  return class_properties, dict(cad_query.all())
 
 
-def get_searchable_attributes(attributes, cad_list, content):
+def get_searchable_attributes(attributes, cad_titles, content):
   """Get all searchable attributes for a given object that should be indexed
 
   Args:
     attributes: Attributes that should be extracted from some model
-    cad_keys: IDs of custom attribute definitions
-    ca_definitions: Dictionary of "CAD ID" -> "CAD title"
+    cad_titles: Dictionary of "CAD ID" -> "CAD title"
     content: dictionary (JSON) representation of an object
   Return:
     Dict of "key": "value" from objects revision
   """
   searchable_values = {attr: content.get(attr) for attr in attributes}
 
-  cad_map = {cad.id: cad for cad in cad_list}
-
   cav_list = content.get("custom_attributes", [])
 
   for cav in cav_list:
-    cad = cad_map.get(cav["custom_attribute_id"])
-    if cad:
-      searchable_values[cad.title] = cav["attribute_value"]
+    title = cad_titles.get(cav["custom_attribute_id"])
+    if title:
+      searchable_values[title] = cav["attribute_value"]
   return searchable_values
 
 
-def reindex(parents=None):
+def reindex(parents=None, batch_size=REINDEX_BATCH_SIZE):
   """Reindex all snapshots or limit to a subset of certain parents.
 
   Args:
     parents: An iterable of parents for which to reindex their scopes.
+    batch_size: Number of snapshots reindexed at once.
   Returns:
     Pair of parent-child that were reindexed.
   """
+  if not parents:
+    return _reindex_batches(_iter_snapshot_id_ranges(batch_size))
+
   columns = db.session.query(
       models.Snapshot.parent_type,
       models.Snapshot.parent_id,
       models.Snapshot.child_type,
       models.Snapshot.child_id,
   )
-  query = columns
-  if parents:
-    _parents = {(obj.type, obj.id) for obj in parents}
-    query = query.filter(
-        tuple_(
-            models.Snapshot.parent_type,
-            models.Snapshot.parent_id,
-        ).in_(_parents))
+  _parents = {(obj.type, obj.id) for obj in parents}
+  query = columns.filter(
+      tuple_(
+          models.Snapshot.parent_type,
+          models.Snapshot.parent_id,
+      ).in_(_parents))
 
   pairs = {Pair.from_4tuple(p) for p in query}
-  reindex_pairs(pairs)
+  reindex_pairs(pairs, batch_size)
   return pairs
 
 
@@ -150,11 +152,7 @@ def delete_records(snapshot_ids):
     snapshot_ids: An iterable with snapshot IDs whose full text records should
         be deleted.
   """
-  to_delete = {("Snapshot", _id) for _id in snapshot_ids}
-  db.session.query(Record).filter(
-      tuple_(Record.type, Record.key).in_(to_delete)
-  ).delete(synchronize_session=False)
-  db.session.commit()
+  get_indexer().delete_records({(_id, "Snapshot") for _id in snapshot_ids})
 
 
 def insert_records(payload):
@@ -163,76 +161,103 @@ def insert_records(payload):
   Args:
     payload: List of dictionaries that represent records entries.
   """
-  engine = db.engine
-  engine.execute(Record.__table__.insert(), payload)
+  if not payload:
+    return
+  get_indexer()._insert_rows(payload)  # pylint: disable=protected-access
   db.session.commit()
 
 
-def reindex_pairs(pairs):
-  """Reindex selected snapshots.
+def _iter_snapshot_id_ranges(batch_size):
+  """Yield snapshot rows of all snapshots in id ordered batches."""
+  query = _get_snapshot_query().order_by(models.Snapshot.id)
+  last_id = 0
+  while True:
+    rows = query.filter(models.Snapshot.id > last_id).limit(batch_size).all()
+    if not rows:
+      return
+    yield rows
+    last_id = rows[-1][0]
 
-  Args:
-    pairs: A list of parent-child pairs that uniquely represent snapshot
-    object whose properties should be reindexed.
-  """
 
-  # pylint: disable=too-many-locals
-  snapshots = dict()
+def _iter_snapshot_pair_batches(pairs, batch_size):
+  """Yield snapshot rows for the given pairs in bounded batches."""
+  pairs_filter = tuple_(
+      models.Snapshot.parent_type,
+      models.Snapshot.parent_id,
+      models.Snapshot.child_type,
+      models.Snapshot.child_id,
+  )
+  tuples = sorted(pair.to_4tuple() for pair in pairs)
+  for start in range(0, len(tuples), batch_size):
+    yield _get_snapshot_query().filter(
+        pairs_filter.in_(tuples[start:start + batch_size])
+    ).all()
+
+
+def _iter_records(rows, object_properties, cad_titles):
+  """Generate full text record entries for snapshot rows.
+
+  Searchable attributes are extracted only once for every revision in the
+  given rows.
+  """
   revisions = dict()
-  snap_to_sid_cache = dict()
-  search_payload = list()
+  for row in rows:
+    _id, ctx_id, ptype, pid, ctype, cid, revid, rev_type, content = row
+    pair = Pair.from_4tuple((ptype, pid, ctype, cid))
+    if revid not in revisions:
+      revisions[revid] = get_searchable_attributes(
+          object_properties[rev_type], cad_titles, content)
+    properties = dict(revisions[revid])
+    properties.update({
+        "parent": _get_parent_property(pair),
+        "child": _get_child_property(pair),
+        "child_type": pair.child.type,
+        "child_id": pair.child.id
+    })
+
+    for prop, val in properties.items():
+      if prop and val:
+        yield {
+            "key": _id,
+            "type": "Snapshot",
+            "context_id": ctx_id,
+            "tags": _get_tag(pair),
+            "property": prop,
+            "content": val,
+        }
+
+
+def _reindex_batches(batches):
+  """Replace full text records for batches of snapshot rows.
+
+  Records of each batch are deleted and inserted before the next batch is
+  loaded, so the memory used and the size of the statements are bounded by
+  the batch size.
+
+  Args:
+    batches: Iterable of lists of snapshot rows.
+  Returns:
+    Set of pairs that were reindexed.
+  """
+  object_properties, cad_titles = _get_model_properties()
+  pairs = set()
+  for number, rows in enumerate(batches):
+    with benchmark("Snapshot reindex batch {} ({} snapshots)".format(
+        number, len(rows))):
+      delete_records({row[0] for row in rows})
+      insert_records(list(_iter_records(rows, object_properties,
+                                        cad_titles)))
+    pairs.update(Pair.from_4tuple(row[2:6]) for row in rows)
+  return pairs
 
-  object_properties, cad_list = _get_model_properties()
 
-  snapshot_columns, revision_columns = _get_columns()
+def reindex_pairs(pairs, batch_size=REINDEX_BATCH_SIZE):
+  """Reindex selected snapshots.
 
-  snapshot_query = snapshot_columns
+  Args:
+    pairs: A list of parent-child pairs that uniquely represent snapshot
+    object whose properties should be reindexed.
+    batch_size: Number of snapshots reindexed at once.
+  """
   if pairs:
-    pairs_filter = tuple_(
-        models.Snapshot.parent_type,
-        models.Snapshot.parent_id,
-        models.Snapshot.child_type,
-        models.Snapshot.child_id,
-    ).in_({pair.to_4tuple() for pair in pairs})
-    snapshot_query = snapshot_columns.filter(pairs_filter)
-
-    for _id, ctx_id, ptype, pid, ctype, cid, revid in snapshot_query:
-      pair = Pair.from_4tuple((ptype, pid, ctype, cid))
-      snapshots[pair] = [_id, ctx_id, revid]
-      snap_to_sid_cache[pair] = _id
-
-    revision_ids = {revid for _, _, revid in snapshots.values()}
-    revision_query = revision_columns.filter(
-        models.Revision.id.in_(revision_ids)
-    )
-    for _id, _type, content in revision_query:
-      revisions[_id] = get_searchable_attributes(
-          object_properties[_type], cad_list, content)
-
-    snapshot_ids = set()
-    for pair in snapshots:
-      snapshot_id, ctx_id, revision_id = snapshots[pair]
-      snapshot_ids.add(snapshot_id)
-
-      properties = revisions[revision_id]
-      properties.update({
-          "parent": _get_parent_property(pair),
-          "child": _get_child_property(pair),
-          "child_type": pair.child.type,
-          "child_id": pair.child.id
-      })
-
-      for prop, val in properties.items():
-        if prop and val:
-          data = {
-              "key": snapshot_id,
-              "type": "Snapshot",
-              "context_id": ctx_id,
-              "tags": _get_tag(pair),
-              "property": prop,
-              "content": val,
-          }
-          search_payload += [data]
-
-    delete_records(snapshot_ids)
-    insert_records(search_payload)
+    _reindex_batches(_iter_snapshot_pair_batches(pairs, batch_size))
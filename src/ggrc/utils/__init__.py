@@ -2,7 +2,6 @@
 # Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
 
 import datetime
-import json
 import re
 import sys
 import sqlalchemy
@@ -10,33 +9,12 @@ import sqlalchemy
 from flask import request
 from ggrc.settings import CUSTOM_URL_ROOT
 from ggrc.utils import benchmarks
-
-
-class GrcEncoder(json.JSONEncoder):
-
-  """Custom JSON Encoder to handle datetime objects and sets
-
-  from:
-     `http://stackoverflow.com/questions/12122007/python-json-encoder-to-support-datetime`_
-  also consider:
-     `http://hg.tryton.org/2.4/trytond/file/ade5432ac476/trytond/protocols/jsonrpc.py#l53`_
-  """
-
-  def default(self, obj):
-    if isinstance(obj, datetime.datetime):
-      return obj.isoformat()
-    elif isinstance(obj, datetime.date):
-      return obj.isoformat()
-    elif isinstance(obj, datetime.timedelta):
-      return (datetime.datetime.min + obj).time().isoformat()
-    elif isinstance(obj, set):
-      return list(obj)
-    else:
-      return super(GrcEncoder, self).default(obj)
+from ggrc.utils import json_codec
+from ggrc.utils.json_codec import GrcEncoder  # noqa
 
 
 def as_json(obj, **kwargs):
-  return json.dumps(obj, cls=GrcEncoder, **kwargs)
+  return json_codec.dumps(obj, **kwargs)
 
 
 def service_for(obj):
@@ -0,0 +1,118 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""JSON encoding and decoding for API responses and JSON columns.
+
+Decoding of large documents that are often loaded but rarely read, such as
+revision content, can be postponed with LazyJson.
+"""
+
+import collections
+import datetime
+import json
+
+
+class LazyJson(collections.MutableMapping):
+  """JSON object that is parsed on the first access to its keys.
+
+  Unchanged documents are written back to the database as the original JSON
+  text, without being parsed and encoded again.
+  """
+
+  def __init__(self, text):
+    self._text = text
+    self._data = None
+
+  @property
+  def data(self):
+    """Get the parsed JSON object."""
+    if self._data is None:
+      self._data = json.loads(self._text)
+      self._text = None
+    return self._data
+
+  @property
+  def is_parsed(self):
+    return self._data is not None
+
+  def get_text(self):
+    """Get the JSON text of the object."""
+    if self._data is None:
+      return self._text
+    return dumps(self._data)
+
+  def __getitem__(self, key):
+    return self.data[key]
+
+  def __setitem__(self, key, value):
+    self.data[key] = value
+
+  def __delitem__(self, key):
+    del self.data[key]
+
+  def __contains__(self, key):
+    return key in self.data
+
+  def __iter__(self):
+    return iter(self.data)
+
+  def __len__(self):
+    return len(self.data)
+
+  def __repr__(self):
+    if self._data is None:
+      return "LazyJson({!r})".format(self._text)
+    return repr(self._data)
+
+  def copy(self):
+    return dict(self.data)
+
+  def __reduce__(self):
+    if self._data is None:
+      return (LazyJson, (self._text,))
+    return (dict, (self._data,))
+
+
+class GrcEncoder(json.JSONEncoder):
+  """Custom JSON Encoder to handle datetime objects and sets
+
+  from:
+     `http://stackoverflow.com/questions/12122007/python-json-encoder-to-support-datetime`_
+  also consider:
+     `http://hg.tryton.org/2.4/trytond/file/ade5432ac476/trytond/protocols/jsonrpc.py#l53`_
+  """
+
+  def default(self, obj):  # pylint: disable=method-hidden
+    if isinstance(obj, datetime.datetime):
+      return obj.isoformat()
+    elif isinstance(obj, datetime.date):
+      return obj.isoformat()
+    elif isinstance(obj, datetime.timedelta):
+      return (datetime.datetime.min + obj).time().isoformat()
+    elif isinstance(obj, (set, frozenset)):
+      return list(obj)
+    elif isinstance(obj, LazyJson):
+      return obj.data
+    else:
+      return super(GrcEncoder, self).default(obj)
+
+
+def dumps(obj, **kwargs):
+  """Serialize obj to a JSON string."""
+  return json.dumps(obj, cls=GrcEncoder, **kwargs)
+
+
+def loads(text):
+  """Parse a JSON string."""
+  return json.loads(text)
+
+
+def loads_lazy(text):
+  """Parse a JSON string, postponing parsing of JSON objects.
+
+  Returns:
+    LazyJson for JSON objects and parsed values for everything else.
+  """
+  if text[:1] == "{":
+    return LazyJson(text)
+  return json.loads(text)
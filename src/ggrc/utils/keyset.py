@@ -0,0 +1,136 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Keyset pagination helpers.
+
+Instead of skipping rows with OFFSET, the next page of a keyset paginated
+query is selected with a WHERE clause that seeks past the sort key of the last
+row of the previous page. The sort key is passed between pages as an opaque
+cursor token.
+
+Order keys are lists of (expression, desc) tuples. The last key must be
+unique, usually the id of the object, so that rows with equal values of the
+other keys are not skipped or repeated.
+"""
+
+import base64
+import binascii
+import datetime
+
+import sqlalchemy as sa
+
+from ggrc.utils import json_codec
+
+
+# Approximate totals count at most this many rows.
+APPROXIMATE_TOTAL_LIMIT = 10000
+
+
+def get_order_clauses(order_keys):
+  """Get ORDER BY clauses for order keys."""
+  return [expr.desc() if desc else expr for expr, desc in order_keys]
+
+
+def _after(expr, value, desc):
+  """Get a clause matching rows sorted after the value of a single key.
+
+  MySQL sorts NULL values before any other value in ascending order.
+  """
+  if value is None:
+    return sa.sql.false() if desc else expr.isnot(None)
+  if desc:
+    return sa.or_(expr < value, expr.is_(None))
+  return expr > value
+
+
+def _equal(expr, value):
+  if value is None:
+    return expr.is_(None)
+  return expr == value
+
+
+def get_seek_filter(order_keys, values):
+  """Get a clause matching rows sorted after the given values of order keys.
+
+  Args:
+    order_keys: list of (expression, desc) tuples.
+    values: values of the order keys in the last row of the previous page.
+
+  Returns:
+    SQL clause matching rows of the following pages.
+  """
+  clauses = []
+  for index, (expr, desc) in enumerate(order_keys):
+    equal = [_equal(prev_expr, value) for (prev_expr, _), value
+             in zip(order_keys[:index], values)]
+    clauses.append(sa.and_(*(equal + [_after(expr, values[index], desc)])))
+  return sa.or_(*clauses)
+
+
+def encode_token(values):
+  """Encode values of order keys to a cursor token."""
+  return base64.urlsafe_b64encode(json_codec.dumps(list(values)))
+
+
+def _parse_datetime(value):
+  if "." in value:
+    return datetime.datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%f")
+  return datetime.datetime.strptime(value, "%Y-%m-%dT%H:%M:%S")
+
+
+def _parse_date(value):
+  return datetime.datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def _get_type(expr):
+  if hasattr(expr, "__clause_element__"):
+    expr = expr.__clause_element__()
+  return expr.type
+
+
+def decode_token(token, order_keys):
+  """Decode a cursor token to values of order keys.
+
+  Args:
+    token: cursor token made by encode_token.
+    order_keys: list of (expression, desc) tuples used to sort the query.
+
+  Raises:
+    ValueError if the token does not match the order keys.
+
+  Returns:
+    list of values of the order keys.
+  """
+  try:
+    values = json_codec.loads(base64.urlsafe_b64decode(str(token)))
+  except (TypeError, binascii.Error, UnicodeEncodeError):
+    raise ValueError("Invalid cursor")
+  if not isinstance(values, list) or len(values) != len(order_keys):
+    raise ValueError("Invalid cursor")
+  result = []
+  for (expr, _), value in zip(order_keys, values):
+    type_ = _get_type(expr)
+    if isinstance(value, basestring):
+      if isinstance(type_, sa.DateTime):
+        value = _parse_datetime(value)
+      elif isinstance(type_, sa.Date):
+        value = _parse_date(value)
+    result.append(value)
+  return result
+
+
+def count(query, approximate=False):
+  """Count rows of a query.
+
+  Args:
+    query: query to count.
+    approximate: count at most APPROXIMATE_TOTAL_LIMIT rows.
+
+  Returns:
+    tuple of the number of rows and a flag that is set if the number is only
+    the lower bound of the number of rows.
+  """
+  if not approximate:
+    return query.order_by(None).count(), False
+  total = query.order_by(None).limit(APPROXIMATE_TOTAL_LIMIT).count()
+  return total, total >= APPROXIMATE_TOTAL_LIMIT
@@ -12,6 +12,8 @@ from sqlalchemy import literal
 from ggrc import db
 from ggrc.login import get_current_user_id
 from ggrc.models import all_models
+from ggrc.models.revision import latest_revisions
+from ggrc.models.revision import refresh_latest_revisions
 from ggrc.snapshotter.rules import Types
 
 logger = getLogger(__name__)  # pylint: disable=invalid-name
@@ -26,21 +28,13 @@ def _get_revisions_by_type(type_):
   Returns:
     dict with object_id as key and revision_id of the latest revision as value.
   """
-
-  revisions = db.session.execute(
-      """
-      SELECT * FROM (
-          SELECT id, resource_id
-          FROM revisions
-          WHERE resource_type = :type
-          ORDER BY resource_id, id DESC
-      ) AS revs
-      GROUP BY resource_id
-      """,
-      [{"type": type_}]
+  revisions = db.session.query(
+      latest_revisions.c.resource_id,
+      latest_revisions.c.revision_id,
+  ).filter(
+      latest_revisions.c.resource_type == type_
   )
-
-  return {row.resource_id: row.id for row in revisions}
+  return {resource_id: revision_id for resource_id, revision_id in revisions}
 
 
 def _fix_type_revisions(event, type_, obj_rev_map):
@@ -83,6 +77,7 @@ def _fix_type_revisions(event, type_, obj_rev_map):
       # Every revision present in obj_rev_map has no object in the DB
       revisions_table, event, list(obj_rev_map.values()))
 
+  refresh_latest_revisions(resource_type=type_)
   db.session.commit()
 
 
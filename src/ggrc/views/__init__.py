@@ -17,20 +17,18 @@ from werkzeug.exceptions import Forbidden
 from ggrc import models
 from ggrc import settings
 from ggrc.app import app
-from ggrc.app import db
 from ggrc.builder.json import publish
 from ggrc.builder.json import publish_representation
 from ggrc.converters import get_importables, get_exportables
 from ggrc.extensions import get_extension_modules
-from ggrc.fulltext import get_indexer
-from ggrc.fulltext.recordbuilder import fts_record_for
-from ggrc.fulltext.recordbuilder import model_is_indexed
+from ggrc.fulltext import reindex as fulltext_reindex
 from ggrc.login import get_current_user
 from ggrc.login import login_required
 from ggrc.models import all_models
 from ggrc.models.background_task import create_task
 from ggrc.models.background_task import make_task_response
 from ggrc.models.background_task import queued_task
+from ggrc.models.object_link import rebuild_object_links
 from ggrc.models.reflection import AttributeInfo
 from ggrc.rbac import permissions
 from ggrc.services.common import as_json
@@ -59,44 +57,37 @@ def refresh_revisions(_):
   return app.make_response(("success", 200, [("Content-Type", "text/html")]))
 
 
-@app.route("/_background_tasks/reindex", methods=["POST"])
+@app.route("/_background_tasks/rebuild_object_links", methods=["POST"])
 @queued_task
-def reindex(_):
-  """Web hook to update the full text search index."""
-  do_reindex()
+def rebuild_links(_):
+  """Web hook to rebuild the object_links table."""
+  rebuild_object_links()
   return app.make_response(("success", 200, [("Content-Type", "text/html")]))
 
 
-def do_reindex():
-  """Update the full text search index."""
-
-  indexer = get_indexer()
-  indexer.delete_all_records(False)
+@app.route("/_background_tasks/reindex", methods=["POST"])
+@queued_task
+def reindex(task):
+  """Web hook to update the full text search index."""
+  result = do_reindex(task)
+  return app.make_response((
+      as_json(result), 200, [("Content-Type", "application/json")]))
 
-  # Remove model base classes and non searchable objects
-  excluded_models = {
-      all_models.Directive,
-      all_models.Option,
-      all_models.SystemOrProcess,
-      all_models.Role,
-  }
-  indexed_models = {model for model in all_models.all_models
-                    if model_is_indexed(model)}
 
-  indexed_models -= excluded_models
+def do_reindex(task=None):
+  """Update the full text search index.
 
-  for model in indexed_models:
-    # pylint: disable=protected-access
-    mapper_class = model._sa_class_manager.mapper.base_mapper.class_
-    query = model.query.options(
-        db.undefer_group(mapper_class.__name__ + '_complete'),
-    )
-    for query_chunk in generate_query_chunks(query):
-      for instance in query_chunk:
-        indexer.create_record(fts_record_for(instance), False)
-      db.session.commit()
+  Args:
+    task: Optional BackgroundTask that holds the reindex checkpoint. If the
+        task starts with a checkpoint of an interrupted reindex, reindexing
+        resumes from the last finished chunk.
 
+  Returns:
+    Dict with reindex statistics, see ggrc.fulltext.reindex.reindex.
+  """
+  result = fulltext_reindex.reindex(task)
   reindex_snapshots()
+  return result
 
 
 def get_permissions_json():
@@ -280,22 +271,19 @@ def object_browser():
   return render_template("dashboard/index.haml")
 
 
-def generate_query_chunks(query):
-  """Generate query chunks used by pagination"""
-  chunk_size = 100
-  count = query.count()
-  for offset in range(0, count, chunk_size):
-    yield query.order_by('id').limit(chunk_size).offset(offset).all()
-
-
 @app.route("/admin/reindex", methods=["POST"])
 @login_required
 def admin_reindex():
   """Calls a webhook that reindexes indexable objects
+
+  If the previous reindex did not finish, the new one continues from its
+  last checkpoint.
   """
   if not permissions.is_allowed_read("/admin", None, 1):
     raise Forbidden()
-  task_queue = create_task("reindex", url_for(reindex.__name__), reindex)
+  task_queue = create_task(
+      fulltext_reindex.TASK_NAME, url_for(reindex.__name__), reindex,
+      parameters=fulltext_reindex.get_resume_parameters())
   return task_queue.make_response(
       app.make_response(("scheduled %s" % task_queue.name, 200,
                          [('Content-Type', 'text/html')])))
@@ -316,6 +304,21 @@ def admin_refresh_revisions():
                          [('Content-Type', 'text/html')])))
 
 
+@app.route("/admin/rebuild_object_links", methods=["POST"])
+@login_required
+def admin_rebuild_object_links():
+  """Calls a webhook that rebuilds links of all mapped objects."""
+  admins = getattr(settings, "BOOTSTRAP_ADMIN_USERS", [])
+  if get_current_user().email not in admins:
+    raise Forbidden()
+
+  task_queue = create_task("rebuild_object_links", url_for(
+      rebuild_links.__name__), rebuild_links)
+  return task_queue.make_response(
+      app.make_response(("scheduled %s" % task_queue.name, 200,
+                         [('Content-Type', 'text/html')])))
+
+
 @app.route("/admin")
 @login_required
 def admin():
@@ -13,21 +13,29 @@ from flask import current_app
 from flask import request
 from flask import json
 from flask import render_template
+from flask import stream_with_context
+from flask import url_for
 from werkzeug.exceptions import BadRequest
 
 from ggrc.app import app
 from ggrc.converters.base import Converter
+from ggrc.converters.import_helper import generate_csv_lines
 from ggrc.converters.import_helper import generate_csv_string
 from ggrc.converters.import_helper import read_csv_file
 from ggrc.converters.query_helper import BadQueryException
 from ggrc.converters.query_helper import QueryHelper
 from ggrc.login import login_required
+from ggrc.models.background_task import create_task
+from ggrc.models.background_task import queued_task
 from ggrc.utils import benchmark
 
 
 # pylint: disable=invalid-name
 logger = getLogger(__name__)
 
+# Number of imported rows committed at once in asynchronous imports.
+IMPORT_CHUNK_SIZE = 100
+
 
 def check_required_headers(required_headers):
   errors = []
@@ -52,13 +60,37 @@ def parse_export_request():
   return request.json
 
 
+def generate_export_lines(converter):
+  """Generate csv lines for a streamed export response."""
+  try:
+    with benchmark("stream export rows"):
+      for line in generate_csv_lines(converter.iter_csv_rows(),
+                                     converter.get_csv_width()):
+        yield line
+  except:  # pylint: disable=bare-except
+    # The response status has already been sent, so the error can only be
+    # logged and the response gets truncated.
+    logger.exception("Export failed")
+
+
 def handle_export_request():
+  """Export the requested objects as a csv file.
+
+  The csv file is streamed to the client while the objects are loaded in
+  chunks, so the memory used does not depend on the size of the export.
+  Requests with the "X-export-stream: false" header get the whole file
+  generated before the response is sent.
+  """
   try:
     data = parse_export_request()
     query_helper = QueryHelper(data)
     converter = Converter(ids_by_type=query_helper.get_ids())
-    csv_data = converter.to_array()
-    csv_string = generate_csv_string(csv_data)
+    stream = request.headers.get("X-export-stream", "true") != "false"
+    if stream:
+      converter.block_converters_from_ids(load_rows=False)
+      csv_data = stream_with_context(generate_export_lines(converter))
+    else:
+      csv_data = generate_csv_string(converter.to_array())
 
     object_names = "_".join(converter.get_object_names())
     filename = "{}.csv".format(object_names)
@@ -67,7 +99,7 @@ def handle_export_request():
         ("Content-Type", "text/csv"),
         ("Content-Disposition", "attachment; filename='{}'".format(filename)),
     ]
-    return current_app.make_response((csv_string, 200, headers))
+    return current_app.response_class(csv_data, 200, headers)
   except BadQueryException as exception:
     raise BadRequest(exception.message)
   except:  # pylint: disable=bare-except
@@ -97,15 +129,53 @@ def parse_import_request():
   return dry_run, csv_data
 
 
+def make_import_response(converter):
+  """Get json response with import results."""
+  response_json = json.dumps(converter.get_info())
+  headers = [("Content-Type", "application/json")]
+  return current_app.make_response((response_json, 200, headers))
+
+
+# Needs to be secured as we are removing @login_required
+
+@app.route("/_background_tasks/import_csv", methods=["POST"])
+@queued_task
+def run_import_csv(task):
+  """Web hook for running a csv import stored in a background task.
+
+  Objects are committed in chunks of IMPORT_CHUNK_SIZE rows and the import
+  progress is written to the task after every chunk.
+  """
+  with benchmark("run import task"):
+    converter = Converter(dry_run=task.parameters["dry_run"],
+                          csv_data=task.parameters["csv_data"],
+                          chunk_size=IMPORT_CHUNK_SIZE,
+                          progress_callback=task.report_progress)
+    converter.import_csv()
+    return make_import_response(converter)
+
+
 def handle_import_request():
+  """Import objects from the uploaded csv file.
+
+  Requests with the "X-import-async: true" header store the csv data in a
+  background task and get the task back at once. The import results can be
+  fetched from the background task when it finishes.
+  """
   try:
     dry_run, csv_data = parse_import_request()
+    if request.headers.get("X-import-async") == "true":
+      task = create_task("import_csv", url_for(run_import_csv.__name__),
+                         run_import_csv,
+                         parameters={"dry_run": dry_run,
+                                     "csv_data": csv_data})
+      return current_app.make_response((
+          json.dumps({"id": task.id, "name": task.name,
+                      "status": task.status}),
+          200, [("Content-Type", "application/json")]))
     converter = Converter(dry_run=dry_run, csv_data=csv_data)
     converter.import_csv()
-    response_data = converter.get_info()
-    response_json = json.dumps(response_data)
-    headers = [("Content-Type", "application/json")]
-    return current_app.make_response((response_json, 200, headers))
+    return make_import_response(converter)
   except:  # pylint: disable=bare-except
     logger.exception("Import failed")
   raise BadRequest("Import failed due to server error.")
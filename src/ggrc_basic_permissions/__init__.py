@@ -12,6 +12,7 @@ from sqlalchemy import case
 from sqlalchemy import literal
 from sqlalchemy import or_
 from sqlalchemy.orm import aliased
+from sqlalchemy.sql.expression import tuple_
 from flask import Blueprint
 from flask import g
 
@@ -21,9 +22,11 @@ from ggrc.app import app
 from ggrc.login import get_current_user
 from ggrc.models import all_models
 from ggrc.models.audit import Audit
+from ggrc.models.mixins.assignable import Assignable
 from ggrc.models.program import Program
 from ggrc.models.object_owner import ObjectOwner
 from ggrc.rbac import permissions as rbac_permissions
+from ggrc.rbac.permissions_provider import CompiledPermissions
 from ggrc.rbac.permissions_provider import DefaultUserPermissions
 from ggrc.services.common import _get_cache_manager
 from ggrc.services.common import Resource
@@ -50,6 +53,19 @@ blueprint = Blueprint(
 
 PERMISSION_CACHE_TIMEOUT = 3600  # 60 minutes
 
+PERMISSION_GENERATION_KEY = 'permissions:generation'
+
+# Changes to these objects can affect permissions of all users.
+GLOBAL_PERMISSION_TYPES = {"Role", "ContextImplication"}
+
+# Creating or deleting these objects changes contexts and context
+# implications, which can affect permissions of all users.
+CONTEXT_OWNER_TYPES = {"Program", "Audit", "Workflow"}
+
+# Mappings to these objects grant access to everyone who can access their
+# context.
+RELATED_CONTEXT_TYPES = {"Program", "Audit"}
+
 
 def get_public_config(_):
   """Expose additional permissions-dependent config to client.
@@ -269,6 +285,22 @@ class CompletePermissionsProvider(object):
   def handle_admin_user(self, user):
     pass
 
+  @staticmethod
+  def invalidate_permissions(modified_objects=None):
+    invalidate_permissions(modified_objects)
+
+  @staticmethod
+  def get_permissions_fingerprint(user):
+    """Get a string that changes whenever permissions of the user change.
+
+    Returns None if permissions are not cached, since there are no generation
+    counters to build the fingerprint from in that case.
+    """
+    if not getattr(settings, 'MEMCACHE_MECHANISM', False):
+      return None
+    cache = _get_cache_manager().cache_object.memcache_client
+    return get_permissions_cache_key(cache, user.id)
+
 
 class BasicUserPermissions(DefaultUserPermissions):
   """User permissions that aren't kept in session."""
@@ -312,7 +344,9 @@ class UserPermissions(DefaultUserPermissions):
       self._request_permissions = {}
     else:
       with benchmark('load_permissions'):
-        self._request_permissions = load_permissions_for(user)
+        compiled_permissions = load_compiled_permissions_for(user)
+        self._request_permissions = compiled_permissions.source
+        setattr(g, '_request_compiled_permissions', compiled_permissions)
 
 
 def collect_permissions(src_permissions, context_id, permissions):
@@ -344,35 +378,52 @@ def collect_permissions(src_permissions, context_id, permissions):
             })
 
 
-def query_memcache(key):
-  """Check if cached permissions are available
+def get_permissions_cache_key(cache, user_id):
+  """Get the memcache key for permissions of a user.
+
+  The key contains the current value of the global and the per-user
+  permission generation counter. Bumping any of the counters makes all
+  permissions stored under older keys unreachable, so they do not have to be
+  deleted explicitly and simply expire.
 
   Args:
+      cache (memcache_client): memcache client
+      user_id (int): id of the user
+  Returns:
       key (string): key of the stored permissions
+  """
+  user_generation_key = get_user_generation_key(user_id)
+  generations = cache.get_multi(
+      [PERMISSION_GENERATION_KEY, user_generation_key]) or {}
+  return 'permissions:{}:{}:{}'.format(
+      user_id,
+      generations.get(PERMISSION_GENERATION_KEY, 0),
+      generations.get(user_generation_key, 0),
+  )
+
+
+def get_user_generation_key(user_id):
+  return '{}:{}'.format(PERMISSION_GENERATION_KEY, user_id)
+
+
+def query_memcache(user_id):
+  """Check if cached permissions are available
+
+  Args:
+      user_id (int): id of the user whose permissions are needed
   Returns:
       cache (memcache_client): memcache client or None if caching
                                is not available
-      permissions_cache (dict): dict with all permissions or None if there
-                                was a cache miss
+      key (string): key under which the permissions are stored
+      permissions_cache (CompiledPermissions): compiled permissions or None
+                                               if there was a cache miss
   """
   if not getattr(settings, 'MEMCACHE_MECHANISM', False):
-    return None, None
+    return None, None, None
 
   cache = _get_cache_manager().cache_object.memcache_client
-  cached_keys_set = cache.get('permissions:list') or set()
-  if key not in cached_keys_set:
-    # We set the permissions:list variable so that we are able to batch
-    # remove all permissions related keys from memcache
-    cached_keys_set.add(key)
-    cache.set('permissions:list', cached_keys_set, PERMISSION_CACHE_TIMEOUT)
-    return cache, None
-
-  permissions_cache = cache.get(key)
-  if permissions_cache:
-    # If the key is both in permissions:list and in memcache itself
-    # it is safe to return the cached permissions
-    return cache, permissions_cache
-  return cache, None
+  key = get_permissions_cache_key(cache, user_id)
+  return cache, key, cache.get(key)
 
 
 def load_default_permissions(permissions):
@@ -717,11 +768,11 @@ def load_backlog_workflows(permissions):
             .append(wf_context_id)
 
 
-def store_results_into_memcache(permissions, cache, key):
-  """Load personal context for user
+def store_results_into_memcache(compiled_permissions, cache, key):
+  """Store compiled permissions in memcache
 
   Args:
-      permissions (dict): dict where the permissions will be stored
+      compiled_permissions (CompiledPermissions): permissions to store
       cache (cache_manager): Cache manager that should be used for storing
                              permissions
       key (string): key of under which permissions should be stored
@@ -730,13 +781,7 @@ def store_results_into_memcache(permissions, cache, key):
   """
   if cache is None:
     return
-
-  cached_keys_set = cache.get('permissions:list') or set()
-  if key in cached_keys_set:
-    # We only add the permissions to the cache if the
-    # key still exists in the permissions:list after
-    # the query has executed.
-    cache.set(key, permissions, PERMISSION_CACHE_TIMEOUT)
+  cache.set(key, compiled_permissions, PERMISSION_CACHE_TIMEOUT)
 
 
 def load_permissions_for(user):
@@ -757,11 +802,24 @@ def load_permissions_for(user):
   'condition' is the string name of a conditional operator, such as 'contains'.
   'terms' are the arguments to the 'condition'.
   """
+  return load_compiled_permissions_for(user).source
+
+
+def load_compiled_permissions_for(user):
+  """Load permissions for user together with their frozen set lookup tables.
+
+  Compiled permissions are cached in memcache under a key that contains the
+  global and the per-user permission generation, see
+  get_permissions_cache_key.
+
+  Returns:
+      CompiledPermissions whose source attribute holds the permissions dict
+      described in load_permissions_for.
+  """
   permissions = {}
-  key = 'permissions:{}'.format(user.id)
 
   with benchmark("load_permissions > query memcache"):
-    cache, result = query_memcache(key)
+    cache, key, result = query_memcache(user.id)
     if result:
       return result
 
@@ -797,10 +855,116 @@ def load_permissions_for(user):
   with benchmark("load_permissions > load backlog workflows"):
     load_backlog_workflows(permissions)
 
+  with benchmark("load_permissions > compile permissions"):
+    compiled_permissions = CompiledPermissions(permissions)
+
   with benchmark("load_permissions > store results into memcache"):
-    store_results_into_memcache(permissions, cache, key)
+    store_results_into_memcache(compiled_permissions, cache, key)
+
+  return compiled_permissions
+
+
+def _get_assignee_ids(objects):
+  """Get ids of people assigned to any of the given objects.
+
+  Args:
+      objects (set): set of (type, id) tuples
+  Returns:
+      set of person ids
+  """
+  if not objects:
+    return set()
+  rel = all_models.Relationship
+  attr = all_models.RelationshipAttr
+  query = db.session.query(
+      case([(rel.source_type == "Person", rel.source_id)],
+           else_=rel.destination_id)
+  ).join(
+      attr, and_(
+          attr.relationship_id == rel.id,
+          attr.attr_name == "AssigneeType",
+      )
+  ).filter(or_(
+      and_(
+          rel.source_type == "Person",
+          tuple_(rel.destination_type, rel.destination_id).in_(objects),
+      ),
+      and_(
+          rel.destination_type == "Person",
+          tuple_(rel.source_type, rel.source_id).in_(objects),
+      ),
+  ))
+  return {person_id for (person_id,) in query}
 
-  return permissions
+
+def get_affected_user_ids(modified_objects):
+  """Get ids of users whose permissions depend on the modified objects.
+
+  Args:
+      modified_objects (Cache): new, dirty and deleted objects of a commit
+  Returns:
+      Set of user ids or None if permissions of all users can be affected.
+  """
+  if modified_objects is None:
+    return None
+  user_ids = set()
+  assignables = set()
+  changes = [
+      (obj, False) for obj in itertools.chain(
+          modified_objects.new, modified_objects.deleted)
+  ] + [(obj, True) for obj in modified_objects.dirty]
+  for obj, is_dirty in changes:
+    type_ = obj.__class__.__name__
+    if type_ in GLOBAL_PERMISSION_TYPES:
+      return None
+    if type_ in CONTEXT_OWNER_TYPES and not is_dirty:
+      return None
+    if type_ in ("UserRole", "ObjectOwner"):
+      user_ids.add(obj.person_id)
+    elif type_ == "Person":
+      user_ids.add(obj.id)
+    elif type_ in ("Relationship", "RelationshipAttr"):
+      if type_ == "RelationshipAttr":
+        # Attributes such as AssigneeType grant permissions to the person at
+        # one end of their relationship.
+        obj = all_models.Relationship.query.get(obj.relationship_id)
+        if obj is None:
+          return None
+      for end_type, end_id in ((obj.source_type, obj.source_id),
+                               (obj.destination_type, obj.destination_id)):
+        if end_type in RELATED_CONTEXT_TYPES:
+          # Objects mapped to programs and audits are readable by all users
+          # with access to the program or audit context.
+          return None
+        if end_type == "Person":
+          user_ids.add(end_id)
+        else:
+          assignables.add((end_type, end_id))
+    elif isinstance(obj, Assignable):
+      assignables.add((type_, obj.id))
+  user_ids.update(_get_assignee_ids(assignables))
+  return user_ids
+
+
+def invalidate_permissions(modified_objects=None):
+  """Invalidate cached permissions of users affected by modified objects.
+
+  Only generation counters are bumped: the global one if permissions of all
+  users can be affected, otherwise the counters of the affected users.
+
+  Args:
+      modified_objects (Cache): new, dirty and deleted objects of a commit.
+          If None, permissions of all users are invalidated.
+  """
+  if not getattr(settings, 'MEMCACHE_MECHANISM', False):
+    return
+  cache = _get_cache_manager().cache_object.memcache_client
+  user_ids = get_affected_user_ids(modified_objects)
+  if user_ids is None:
+    cache.incr(PERMISSION_GENERATION_KEY, initial_value=0)
+    return
+  for user_id in user_ids:
+    cache.incr(get_user_generation_key(user_id), initial_value=0)
 
 
 def backlog_workflows():
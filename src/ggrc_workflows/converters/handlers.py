@@ -49,31 +49,21 @@ class WorkflowColumnHandler(handlers.ParentColumnHandler):
 
   """ handler for workflow column in task groups """
 
-  def __init__(self, row_converter, key, **options):
-    """ init workflow handler """
-    self.parent = wf_models.Workflow
-    super(WorkflowColumnHandler, self).__init__(row_converter, key, **options)
+  parent = wf_models.Workflow
 
 
 class TaskGroupColumnHandler(handlers.ParentColumnHandler):
 
   """ handler for task group column in task group tasks """
 
-  def __init__(self, row_converter, key, **options):
-    """ init task group handler """
-    self.parent = wf_models.TaskGroup
-    super(TaskGroupColumnHandler, self).__init__(row_converter, key, **options)
+  parent = wf_models.TaskGroup
 
 
 class CycleTaskGroupColumnHandler(handlers.ParentColumnHandler):
 
   """ handler for task group column in task group tasks """
 
-  def __init__(self, row_converter, key, **options):
-    """ init task group handler """
-    self.parent = wf_models.CycleTaskGroup
-    super(CycleTaskGroupColumnHandler, self) \
-        .__init__(row_converter, key, **options)
+  parent = wf_models.CycleTaskGroup
 
 
 class TaskDateColumnHandler(handlers.ColumnHandler):
@@ -0,0 +1,37 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Add object links of task group objects.
+
+Create Date: 2017-01-20 11:35:17.294816
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '2a9f0c4d7e61'
+down_revision = '216e496dabe'
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.execute("""
+      INSERT INTO object_links (kind, link_id, type_a, id_a, type_b, id_b)
+      SELECT 'task_group_object', id, 'TaskGroup', task_group_id,
+             object_type, object_id
+      FROM task_group_objects
+  """)
+  op.execute("""
+      INSERT INTO object_links (kind, link_id, type_a, id_a, type_b, id_b)
+      SELECT 'task_group_object', id, object_type, object_id,
+             'TaskGroup', task_group_id
+      FROM task_group_objects
+  """)
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.execute("DELETE FROM object_links WHERE kind = 'task_group_object'")
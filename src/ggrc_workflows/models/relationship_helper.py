@@ -2,6 +2,8 @@
 # Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
 
 from ggrc import db
+from ggrc.models.object_link import Endpoint
+from ggrc.models.object_link import ObjectLinkKind
 from ggrc.models.relationship import Relationship
 from ggrc_workflows.models import Cycle
 from ggrc_workflows.models import CycleTaskGroup
@@ -40,19 +42,6 @@ def task_tgo(object_type, related_type, related_ids):
                 (TaskGroupObject.object_id.in_(related_ids)))
 
 
-def tg_tgo(object_type, related_type, related_ids):
-  """ relationships between TaskGroups and objects via Task Group Object """
-
-  if object_type == "TaskGroup":
-    return db.session.query(TaskGroupObject.task_group_id).filter(
-        (TaskGroupObject.object_type == related_type) &
-        (TaskGroupObject.object_id.in_(related_ids)))
-  else:
-    return db.session.query(TaskGroupObject.object_id).filter(
-        (TaskGroupObject.object_type == object_type) &
-        (TaskGroupObject.task_group_id.in_(related_ids)))
-
-
 def cycle_workflow(object_type, related_type, related_ids):
   """ relationships between Workflows and Cycles """
 
@@ -277,6 +266,16 @@ def workflow_person(object_type, related_type, related_ids):
                      "got ({!r}, {!r}) instead"
                      .format(object_type, related_type))
 
+
+# Mappings between task groups and objects are stored in object_links.
+OBJECT_LINKS = [
+    ObjectLinkKind(
+        "task_group_object", TaskGroupObject,
+        Endpoint("task_group_id", type_name="TaskGroup"),
+        Endpoint("object_id", type_attr="object_type"),
+    ),
+]
+
 _function_map = {
     ("Cycle", "CycleTaskGroup"): cycle_ctg,
     ("Cycle", "CycleTaskGroupObjectTask"): cycle_ctogt,
@@ -295,7 +294,6 @@ for wot in WORKFLOW_OBJECT_TYPES:
           (ctg_ctgo, "CycleTaskGroup"),
           (cycle_ctgo, "Cycle"),
           (wf_ctgo, "Workflow"),
-          (tg_tgo, "TaskGroup"),
           (task_tgo, "TaskGroupTask")]:
     key = tuple(sorted([obj, wot]))
     _function_map[key] = f
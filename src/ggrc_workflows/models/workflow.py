@@ -266,9 +266,10 @@ class Workflow(mixins.CustomAttributable, HasOwnContext, mixins.Timeboxed,
     db.session.flush()
 
     # add fulltext entries
-    get_indexer().create_record(fts_record_for(backlog_workflow))
-    get_indexer().create_record(fts_record_for(backlog_cycle))
-    get_indexer().create_record(fts_record_for(backlog_ctg))
+    get_indexer().create_records(
+        fts_record_for(obj)
+        for obj in (backlog_workflow, backlog_cycle, backlog_ctg)
+    )
     return "Backlog workflow created"
 
 
@@ -0,0 +1,70 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for the automapper relationship adjacency index."""
+
+from ggrc.automapper import AutomapperGenerator
+from ggrc.automapper import RelationshipAdjacency
+from ggrc.automapper import Stub
+from ggrc.automapper import get_relationship_adjacency
+from ggrc.utils import QueryCounter
+from integration.ggrc import TestCase
+from integration.ggrc.models import factories
+
+
+class TestRelationshipAdjacency(TestCase):
+  """Tests for RelationshipAdjacency."""
+
+  def setUp(self):
+    super(TestRelationshipAdjacency, self).setUp()
+    self.program = factories.ProgramFactory()
+    self.controls = [factories.ControlFactory() for _ in range(3)]
+    for control in self.controls:
+      factories.RelationshipFactory(source=self.program, destination=control)
+    self.program_stub = Stub("Program", self.program.id)
+    self.control_stubs = {Stub("Control", control.id)
+                          for control in self.controls}
+
+  def test_load(self):
+    """Neighbourhoods of all stubs are fetched with a single query."""
+    adjacency = RelationshipAdjacency()
+    stubs = self.control_stubs | {self.program_stub}
+    with QueryCounter() as counter:
+      adjacency.load(stubs)
+      adjacency.load(stubs)
+      self.assertEqual(counter.get, 1)
+    self.assertEqual(adjacency.get(self.program_stub), self.control_stubs)
+    for stub in self.control_stubs:
+      self.assertEqual(adjacency.get(stub), {self.program_stub})
+
+  def test_add_remove(self):
+    """Edges are only updated for loaded neighbourhoods."""
+    adjacency = RelationshipAdjacency()
+    adjacency.load([self.program_stub])
+    new_stub = Stub("Control", max(s.id for s in self.control_stubs) + 1)
+    adjacency.add(self.program_stub, new_stub)
+    self.assertIn(new_stub, adjacency.get(self.program_stub))
+    self.assertNotIn(new_stub, adjacency)
+    adjacency.remove(self.program_stub, new_stub)
+    self.assertEqual(adjacency.get(self.program_stub), self.control_stubs)
+
+  def test_related_loads_no_instances(self):
+    """Getting related stubs does not load model instances."""
+    automapper = AutomapperGenerator(use_benchmark=False)
+    self.assertEqual(automapper.related(self.program_stub),
+                     self.control_stubs)
+    self.assertEqual(automapper.instance_cache, {})
+
+  def test_pending_edges_not_shared(self):
+    """Edges that are not inserted yet stay out of the shared index."""
+    # pylint: disable=protected-access
+    automapper = AutomapperGenerator(use_benchmark=False)
+    automapper.related(self.program_stub)
+    new_stub = Stub("Control", max(s.id for s in self.control_stubs) + 1)
+    self.assertTrue(
+        automapper._ensure_relationship(self.program_stub, new_stub))
+    self.assertFalse(
+        automapper._ensure_relationship(self.program_stub, new_stub))
+    self.assertIn(new_stub, automapper.related(self.program_stub))
+    self.assertNotIn(new_stub,
+                     get_relationship_adjacency().get(self.program_stub))
@@ -4,7 +4,9 @@
 from os.path import abspath, dirname, join
 from flask.json import dumps
 
+from ggrc import models
 from ggrc.converters import get_importables
+from ggrc.converters.base import Converter
 from ggrc.models.reflection import AttributeInfo
 from integration.ggrc.converters import TestCase
 
@@ -339,6 +341,34 @@ class TestExportSingleObject(TestCase):
           failed.add((model, attr, field, e))
     self.assertEqual(sorted(failed), [])
 
+  def test_streamed_export(self):
+    """Streamed export contains the same csv lines as a buffered export."""
+    data = [
+        {"object_name": "Program", "fields": "all"},
+        {"object_name": "Policy", "fields": ["title", "slug"]},
+    ]
+    streamed = self.export_csv(data)
+    self.headers["X-export-stream"] = "false"
+    buffered = self.export_csv(data)
+    self.assertEqual(streamed.status_code, 200)
+    self.assertEqual(sorted(streamed.data.splitlines()),
+                     sorted(buffered.data.splitlines()))
+
+  def test_streamed_export_chunks(self):
+    """Rows are generated in id order regardless of the chunk size."""
+    program_ids = [program.id for program in models.Program.query]
+    converter = Converter(ids_by_type=[{
+        "object_name": "Program",
+        "ids": program_ids,
+        "fields": ["slug"],
+    }])
+    converter.block_converters_from_ids(load_rows=False)
+    rows = list(converter.iter_csv_rows(chunk_size=5))
+    slugs = [row[1] for row in rows[2:-2]]
+    expected = [program.slug for program in models.Program.query.filter(
+        models.Program.id.in_(program_ids)).order_by(models.Program.id)]
+    self.assertEqual(slugs, expected)
+
 
 class TestExportMultipleObjects(TestCase):
 
@@ -0,0 +1,67 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for asynchronous csv imports."""
+
+from os.path import join
+
+from flask import json
+from mock import patch
+
+from ggrc import models
+from integration.ggrc.converters import TestCase
+
+
+class TestAsyncImport(TestCase):
+  """Tests for imports running in background tasks."""
+
+  def setUp(self):
+    super(TestAsyncImport, self).setUp()
+    self.client.get("/login")
+
+  def _import_async(self, filename, dry_run=False):
+    data = {"file": (open(join(self.CSV_DIR, filename)), filename)}
+    headers = {
+        "X-test-only": "true" if dry_run else "false",
+        "X-requested-by": "gGRC",
+        "X-import-async": "true",
+    }
+    response = self.client.post("/_service/import_csv", data=data,
+                                headers=headers)
+    self.assert200(response)
+    return json.loads(response.data)
+
+  def test_async_import(self):
+    """Async import returns a task with the import results."""
+    task_json = self._import_async("policy_basic_import.csv")
+
+    task = models.BackgroundTask.query.get(task_json["id"])
+    self.assertEqual(task.status, "Success")
+    self.assertEqual(models.Policy.query.count(), 3)
+
+    response = self.client.get("/background_task/{}".format(task.id))
+    result = json.loads(response.data)
+    self.assertEqual(result[0]["name"], "Policy")
+    self.assertEqual(result[0]["created"], 3)
+    self.assertEqual(result[0]["row_errors"], [])
+
+  def test_async_dry_run(self):
+    """Async dry run import does not create any objects."""
+    task_json = self._import_async("policy_basic_import.csv", dry_run=True)
+
+    response = self.client.get("/background_task/{}".format(task_json["id"]))
+    self.assertEqual(json.loads(response.data)[0]["created"], 3)
+    self.assertEqual(models.Policy.query.count(), 0)
+
+  @patch("ggrc.views.converters.IMPORT_CHUNK_SIZE", 2)
+  @patch("ggrc.models.background_task.BackgroundTask.report_progress")
+  def test_chunked_import_progress(self, report_progress):
+    """Async import commits rows in chunks and reports progress."""
+    self._import_async("policy_basic_import.csv")
+
+    self.assertEqual(models.Policy.query.count(), 3)
+    progress = [call[0][0] for call in report_progress.call_args_list]
+    self.assertEqual(
+        [(item["name"], item["processed_rows"]) for item in progress],
+        [("Policy", 2), ("Policy", 3)],
+    )
@@ -0,0 +1,75 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for batched flushing of imported rows."""
+
+import mock
+from sqlalchemy import exc
+
+from ggrc import db
+from ggrc import models
+from ggrc.converters.base_block import BlockConverter
+from ggrc.converters.base_row import RowConverter
+from ggrc.fulltext.mysql import MysqlRecordProperty as Record
+from integration.ggrc.converters import TestCase
+
+
+class TestImportFlush(TestCase):
+  """Tests for flushing imported rows in batches."""
+
+  def setUp(self):
+    super(TestImportFlush, self).setUp()
+    self.client.get("/login")
+
+  def test_single_batch(self):
+    """All rows of a block are flushed together."""
+    with mock.patch.object(BlockConverter, "_flush_rows",
+                           side_effect=BlockConverter._flush_rows) as flush:
+      response = self._import_file("policy_basic_import.csv")
+    self.assertEqual(response[0]["created"], 2)
+    self.assertEqual(response[1]["created"], 3)
+    # one batch for the Person block and one for the Policy block
+    self.assertEqual(flush.call_count, 2)
+    self.assertEqual(models.Policy.query.count(), 3)
+
+  def test_failing_row(self):
+    """Rows of a failed batch are flushed one by one."""
+    insert_object = RowConverter.insert_object
+
+    def fail_on_title(row_converter):
+      if getattr(row_converter.obj, "title", None) == "another weird policy":
+        raise exc.IntegrityError("INSERT", {}, Exception("duplicate"))
+      insert_object(row_converter)
+
+    with mock.patch.object(RowConverter, "insert_object", autospec=True,
+                           side_effect=fail_on_title):
+      response = self._import_file("policy_basic_import.csv")
+    policy_info = response[1]
+    self.assertEqual(policy_info["name"], "Policy")
+    self.assertEqual(len(policy_info["row_errors"]), 1)
+    self.assertEqual(
+        sorted(policy.title for policy in models.Policy.query),
+        ["Who let the dogs out", "some weird policy"],
+    )
+    self.assertEqual(models.Person.query.filter(
+        models.Person.email.in_(["user1@example.com", "user2@example.com"])
+    ).count(), 2)
+
+  def test_multiple_batches(self):
+    """Rows flushed in several batches get revisions and index records."""
+    with mock.patch("ggrc.converters.base.IMPORT_FLUSH_SIZE", 1):
+      response = self._import_file("policy_basic_import.csv")
+    self.assertEqual(response[1]["created"], 3)
+    policy_ids = [policy.id for policy in models.Policy.query]
+    self.assertEqual(len(policy_ids), 3)
+    revised_ids = {resource_id for resource_id, in db.session.query(
+        models.Revision.resource_id).filter(
+        models.Revision.resource_type == "Policy",
+        models.Revision.action == "created",
+    )}
+    self.assertEqual(revised_ids, set(policy_ids))
+    indexed_ids = {key for key, in db.session.query(Record.key).filter(
+        Record.type == "Policy",
+        Record.property == "title",
+    )}
+    self.assertEqual(indexed_ids, set(policy_ids))
@@ -0,0 +1,119 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for bulk lookups of objects referenced in imported rows."""
+
+import csv
+from contextlib import contextmanager
+from StringIO import StringIO
+
+from flask import json
+import sqlalchemy as sa
+
+from ggrc import db
+from ggrc.converters.lookup import ObjectLookup
+from ggrc.models import all_models
+from integration.ggrc.converters import TestCase
+from integration.ggrc.models import factories
+
+
+@contextmanager
+def statements_on(table_name):
+  """Collect SQL statements that read from the given table."""
+  statements = []
+
+  def before_cursor_execute(conn, cursor, statement, *args):
+    # pylint: disable=unused-argument
+    if "FROM {}".format(table_name) in statement:
+      statements.append(statement)
+
+  sa.event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+  try:
+    yield statements
+  finally:
+    sa.event.remove(db.engine, "before_cursor_execute",
+                    before_cursor_execute)
+
+
+class TestObjectLookup(TestCase):
+  """Tests for ObjectLookup."""
+
+  def setUp(self):
+    super(TestObjectLookup, self).setUp()
+    self.controls = [factories.ControlFactory() for _ in range(3)]
+    self.lookup = ObjectLookup()
+
+  def test_single_query(self):
+    """Registered values are loaded with a single query."""
+    for control in self.controls:
+      self.lookup.add(all_models.Control, "slug", control.slug)
+    self.lookup.add(all_models.Control, "slug", "missing")
+    with statements_on("controls") as statements:
+      for control in self.controls:
+        self.assertEqual(
+            self.lookup.get(all_models.Control, "slug", control.slug.upper()),
+            control)
+      self.assertIsNone(
+          self.lookup.get(all_models.Control, "slug", "missing"))
+    self.assertEqual(len(statements), 1)
+
+  def test_unregistered_value(self):
+    """Values that were not registered are queried on their own."""
+    slug = self.controls[0].slug
+    with statements_on("controls") as statements:
+      self.assertEqual(self.lookup.get(all_models.Control, "slug", slug),
+                       self.controls[0])
+      self.lookup.get(all_models.Control, "slug", slug)
+    self.assertEqual(len(statements), 1)
+
+  def test_clear(self):
+    """Objects are loaded again after the lookup is cleared."""
+    self.lookup.add(all_models.Control, "slug", "new-control")
+    self.assertIsNone(
+        self.lookup.get(all_models.Control, "slug", "new-control"))
+    control = factories.ControlFactory(slug="new-control")
+    self.lookup.clear()
+    self.assertEqual(
+        self.lookup.get(all_models.Control, "slug", "new-control"), control)
+
+
+class TestImportLookup(TestCase):
+  """Tests for the number of lookup queries made by imports."""
+
+  def setUp(self):
+    super(TestImportLookup, self).setUp()
+    self.client.get("/login")
+    self.org_groups = [factories.OrgGroupFactory() for _ in range(6)]
+
+  def _import_policies(self, count):
+    """Dry run an import of policies mapped to org groups."""
+    rows = [
+        ["Object type"],
+        ["Policy", "Code", "Title", "Owner", "map:org group"],
+    ]
+    for index in range(count):
+      rows.append(["", "policy-{}".format(index), "policy {}".format(index),
+                   "user@example.com",
+                   self.org_groups[index % len(self.org_groups)].slug])
+    csv_file = StringIO()
+    csv.writer(csv_file).writerows(rows)
+    csv_file.seek(0)
+    response = self.client.post(
+        "/_service/import_csv",
+        data={"file": (csv_file, "policies.csv")},
+        headers={"X-test-only": "true", "X-requested-by": "gGRC"},
+    )
+    self.assert200(response)
+    return json.loads(response.data)
+
+  def test_constant_queries(self):
+    """Mapped objects are not queried once per row."""
+    with statements_on("org_groups") as few_rows:
+      response = self._import_policies(2)
+    self.assertEqual(response[0]["created"], 2)
+    self.assertEqual(response[0]["row_warnings"], [])
+    with statements_on("org_groups") as many_rows:
+      response = self._import_policies(12)
+    self.assertEqual(response[0]["created"], 12)
+    self.assertEqual(response[0]["row_warnings"], [])
+    self.assertEqual(len(few_rows), len(many_rows))
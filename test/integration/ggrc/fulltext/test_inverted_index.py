@@ -0,0 +1,79 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Integration tests for the n-gram full text indexer."""
+
+from sqlalchemy import func
+
+from ggrc import db
+from ggrc import fulltext
+from ggrc import settings
+from ggrc.fulltext import mysql
+from integration.ggrc import TestCase
+
+
+Record = mysql.MysqlRecordProperty
+Term = mysql.MysqlRecordTerm
+
+
+class TestInvertedIndexer(TestCase):
+  """Tests for MysqlInvertedIndexer."""
+
+  def setUp(self):
+    super(TestInvertedIndexer, self).setUp()
+    self.indexer = mysql.MysqlInvertedIndexer(settings)
+    self.indexer.create_records([
+        fulltext.Record(1, "Control", None, title=u"Data center access",
+                        description=u"Physical access"),
+        fulltext.Record(2, "Control", None, title=u"Backups",
+                        slug=u"CONTROL-2", description=u"Data retention"),
+        fulltext.Record(3, "Control", None, title=u"Centralized logging"),
+    ])
+
+  def _find(self, terms):
+    return {key for key, in db.session.query(Record.key).filter(
+        self.indexer.get_text_filter(terms))}
+
+  def test_substring_search(self):
+    """Records are found by substrings of their words."""
+    self.assertEqual(self._find(u"center"), {1})
+    self.assertEqual(self._find(u"CENTER"), {1})
+    self.assertEqual(self._find(u"ente"), {1})
+    self.assertEqual(self._find(u"cent"), {1, 3})
+    self.assertEqual(self._find(u"data"), {1, 2})
+    self.assertEqual(self._find(u"ta cen"), {1})
+    self.assertEqual(self._find(u"center access"), {1})
+    self.assertEqual(self._find(u"access center"), set())
+
+  def test_short_terms(self):
+    """Terms too short for n-grams are matched with LIKE."""
+    self.assertEqual(self._find(u"ck"), {2})
+    self.assertEqual(self._find(u"a c"), {1})
+
+  def test_update_records(self):
+    """N-grams of replaced properties are removed."""
+    self.indexer.update_records([
+        fulltext.Record(3, "Control", None, title=u"Audit trail"),
+    ])
+    self.assertEqual(self._find(u"logging"), set())
+    self.assertEqual(self._find(u"trail"), {3})
+    self.assertFalse(Term.query.filter(Term.term == u"log").count())
+
+  def test_delete_records(self):
+    """N-grams of deleted records are removed."""
+    self.indexer.delete_records([(1, "Control"), (2, "Control")])
+    self.assertEqual(self._find(u"data"), set())
+    self.assertEqual({term.key for term in Term.query}, {3})
+
+  def test_ranking(self):
+    """Title matches rank above slug and description matches."""
+    # pylint: disable=protected-access
+    self.indexer.create_records([
+        fulltext.Record(4, "Control", None, title=u"Retention policy"),
+    ])
+    query = db.session.query(Record.key).filter(
+        self.indexer.get_text_filter(u"retention"),
+    ).group_by(Record.key).order_by(
+        func.min(self.indexer._get_sort_key()),
+    )
+    self.assertEqual([key for key, in query], [4, 2])
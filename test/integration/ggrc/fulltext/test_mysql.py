@@ -6,8 +6,10 @@
 import sqlalchemy.exc
 
 from ggrc import db
+from ggrc import fulltext
 from ggrc import views
 from ggrc.fulltext import mysql
+from ggrc.utils import QueryCounter
 from integration.ggrc import TestCase
 from integration.ggrc.models import factories
 
@@ -58,3 +60,60 @@ class TestCAD(TestCase):
           property=u"\u5555" * 240 + u"2",
       ))
       db.session.commit()
+
+
+class TestBulkIndexing(TestCase):
+  """Tests for set based record operations of the mysql indexer."""
+
+  def setUp(self):
+    super(TestBulkIndexing, self).setUp()
+    self.indexer = mysql.MysqlIndexer(None)
+
+  @staticmethod
+  def _record_for(key, **properties):
+    return fulltext.Record(key, "my_type", None, **properties)
+
+  def _get_contents(self):
+    return {
+        (rec.key, rec.property): rec.content
+        for rec in mysql.MysqlRecordProperty.query.filter(
+            mysql.MysqlRecordProperty.type == "my_type")
+    }
+
+  def test_create_records(self):
+    """Creating many records results in a single insert statement."""
+    records = [self._record_for(i, title="t{}".format(i), slug="s")
+               for i in range(1, 51)]
+    with QueryCounter() as counter:
+      self.indexer.create_records(records, commit=False)
+      self.assertEqual(counter.get, 1)
+    db.session.commit()
+    self.assertEqual(len(self._get_contents()), 100)
+
+  def test_update_records(self):
+    """Updating replaces only the properties present in the records."""
+    self.indexer.create_records([
+        self._record_for(1, title="a", slug="s1"),
+        self._record_for(2, title="b", slug="s2"),
+    ])
+    self.indexer.update_records([
+        self._record_for(1, title="c"),
+        self._record_for(2, title="d"),
+    ])
+    self.assertEqual(self._get_contents(), {
+        (1, "title"): "c",
+        (1, "slug"): "s1",
+        (2, "title"): "d",
+        (2, "slug"): "s2",
+    })
+
+  def test_delete_records(self):
+    """Deleting removes all properties of the given keys."""
+    self.indexer.create_records([
+        self._record_for(i, title="a", slug="s") for i in range(1, 4)
+    ])
+    self.indexer.delete_records([(1, "my_type"), (3, "my_type")])
+    self.assertEqual(self._get_contents(), {
+        (2, "title"): "a",
+        (2, "slug"): "s",
+    })
@@ -0,0 +1,90 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Integration tests for incremental full text reindex."""
+
+from ggrc import db
+from ggrc import fulltext
+from ggrc import models
+from ggrc.fulltext import get_indexer
+from ggrc.fulltext import mysql
+from ggrc.fulltext import reindex
+from integration.ggrc import TestCase
+from integration.ggrc.models import factories
+
+
+Record = mysql.MysqlRecordProperty
+
+
+class TestReindex(TestCase):
+  """Tests for chunked and resumable reindex."""
+
+  def setUp(self):
+    super(TestReindex, self).setUp()
+    self.controls = [factories.ControlFactory(title="control {}".format(i))
+                     for i in range(5)]
+    self.indexer = get_indexer()
+
+  def _get_titles(self):
+    query = Record.query.filter(
+        Record.type == "Control",
+        Record.property == "title",
+    )
+    return {record.key: record.content for record in query}
+
+  def _get_task(self, parameters=None):
+    task = models.BackgroundTask(name="reindex")
+    task.parameters = parameters or {}
+    db.session.add(task)
+    db.session.commit()
+    return task
+
+  def test_reindex_chunks(self):
+    """Chunked reindex replaces stale records and removes deleted objects."""
+    self.indexer.delete_records_by_type("Control")
+    stale_id = max(control.id for control in self.controls) + 100
+    self.indexer.create_record(fulltext.Record(
+        stale_id, "Control", None, title="stale"))
+
+    result = reindex.reindex(chunk_size=2)
+
+    self.assertEqual(
+        self._get_titles(),
+        {control.id: control.title for control in self.controls},
+    )
+    self.assertEqual(result["models"]["Control"]["objects"], 5)
+    self.assertIn("rows_per_second", result)
+
+  def test_reindex_checkpoint(self):
+    """Reindex stores checkpoint and resumes from it."""
+    ids = sorted(control.id for control in self.controls)
+    self.indexer.delete_records_by_type("Control")
+    checkpoint = {
+        "done": [model.__name__ for model in reindex.get_indexed_models()
+                 if model.__name__ != "Control"],
+        "models": {},
+        "model": "Control",
+        "last_id": ids[2],
+    }
+    task = self._get_task({reindex.CHECKPOINT_KEY: checkpoint})
+
+    reindex.reindex(task, chunk_size=2)
+
+    self.assertEqual(set(self._get_titles()), set(ids[3:]))
+    task = models.BackgroundTask.query.get(task.id)
+    stored = task.parameters[reindex.CHECKPOINT_KEY]
+    self.assertIn("Control", stored["done"])
+    self.assertEqual(stored["models"]["Control"]["objects"], 2)
+
+  def test_resume_parameters(self):
+    """A new reindex task takes over the checkpoint of a failed one."""
+    checkpoint = {"done": ["Audit"], "models": {}}
+    task = self._get_task({reindex.CHECKPOINT_KEY: checkpoint})
+    task.status = "Failure"
+    db.session.commit()
+    self.assertEqual(reindex.get_resume_parameters(),
+                     {reindex.CHECKPOINT_KEY: checkpoint})
+
+    task.status = "Success"
+    db.session.commit()
+    self.assertEqual(reindex.get_resume_parameters(), {})
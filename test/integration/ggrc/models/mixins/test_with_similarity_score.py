@@ -375,6 +375,62 @@ class TestWithSimilarityScore(integration.ggrc.TestCase):
           [obj.weight for obj in sorted_similar],
       )
 
+  def test_page_by_similarity(self):
+    """Pages of objects sorted by __similarity__ follow each other."""
+    program = factories.ProgramFactory()
+    controls = [factories.ControlFactory() for _ in range(2)]
+    self.make_relationships(program, controls)
+    _, audit = self.obj_gen.generate_object(models.Audit, {
+        "title": "Audit",
+        "program": {"id": program.id},
+        "status": "Planned",
+    })
+    controls = [models.Control.query.get(control.id) for control in controls]
+    assessments = self.make_assessments([
+        [audit] + controls,
+        [audit] + controls,
+        [audit, controls[0]],
+        [audit],
+    ])
+    similar_objects = models.Assessment.get_similar_objects_query(
+        id_=assessments[0].id,
+        types=["Assessment"],
+    ).all()
+    expected = [obj.id for obj in sorted(similar_objects,
+                                         key=lambda x: (x.weight, x.id))]
+
+    ids = []
+    after = None
+    while True:
+      query = [{
+          "object_name": "Assessment",
+          "type": "ids",
+          "order_by": [{"name": "__similarity__"}],
+          "limit": [0, 1],
+          "after": after,
+          "filters": {
+              "expression": {
+                  "op": {"name": "similar"},
+                  "object_name": "Assessment",
+                  "ids": [str(assessments[0].id)],
+              },
+          },
+      }]
+      response = self.client.post(
+          "/query",
+          data=json.dumps(query),
+          headers={"Content-Type": "application/json"},
+      )
+      self.assert200(response)
+      page = json.loads(response.data)[0]["Assessment"]
+      ids.extend(page["ids"])
+      after = page["next"]
+      if after is None:
+        break
+
+    self.assertGreater(len(expected), 1)
+    self.assertEqual(ids, expected)
+
   def test_empty_similar_results(self):
     """Check empty similarity result."""
     query = [{
@@ -0,0 +1,141 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for the object_links table."""
+
+from flask import json
+
+from ggrc import db
+from ggrc.models import all_models
+from ggrc.models.object_link import object_links
+from ggrc.models.object_link import rebuild_object_links
+from ggrc.models.relationship_helper import RelationshipHelper
+from integration.ggrc import TestCase
+from integration.ggrc.models import factories
+from integration.ggrc.snapshotter import SnapshotterBaseTestCase
+
+
+def _get_links():
+  return set(db.session.query(
+      object_links.c.kind,
+      object_links.c.type_a, object_links.c.id_a,
+      object_links.c.type_b, object_links.c.id_b,
+  ))
+
+
+def _related(object_type, related_type, related_ids):
+  return {id_ for id_, in RelationshipHelper.get_ids_related_to(
+      object_type, related_type, related_ids)}
+
+
+class TestObjectLinks(TestCase):
+  """Tests for maintaining and querying object links."""
+
+  def setUp(self):
+    super(TestObjectLinks, self).setUp()
+    self.audit = factories.AuditFactory()
+    self.control = factories.ControlFactory()
+    self.person = factories.PersonFactory()
+    self.relationship = factories.RelationshipFactory(
+        source=self.audit, destination=self.control)
+
+  def test_links_created(self):
+    """Links are stored in both directions for new objects."""
+    links = _get_links()
+    audit_id, control_id = self.audit.id, self.control.id
+    program_id = self.audit.program_id
+    self.assertIn(("relationship", "Audit", audit_id, "Control", control_id),
+                  links)
+    self.assertIn(("relationship", "Control", control_id, "Audit", audit_id),
+                  links)
+    self.assertIn(("program_audit", "Program", program_id, "Audit", audit_id),
+                  links)
+    self.assertIn(("program_audit", "Audit", audit_id, "Program", program_id),
+                  links)
+
+  def test_links_updated(self):
+    """Links follow changed endpoints."""
+    other = factories.ControlFactory()
+    self.relationship.destination = other
+    db.session.commit()
+    self.assertEqual(_related("Control", "Audit", [self.audit.id]),
+                     {other.id})
+    self.assertEqual(_related("Audit", "Control", [self.control.id]), set())
+
+  def test_links_deleted(self):
+    """Links of deleted objects are removed."""
+    db.session.delete(self.relationship)
+    db.session.commit()
+    self.assertEqual(_related("Control", "Audit", [self.audit.id]), set())
+
+  def test_bulk_deleted_links(self):
+    """Links of rows deleted with bulk deletes are removed on commit."""
+    object_person = all_models.ObjectPerson(
+        person=self.person, personable=self.control)
+    db.session.add(object_person)
+    db.session.commit()
+    self.assertEqual(_related("Person", "Control", [self.control.id]),
+                     {self.person.id})
+    all_models.ObjectPerson.query.filter_by(
+        personable_id=self.control.id,
+        personable_type="Control",
+    ).delete()
+    db.session.commit()
+    self.assertEqual(_related("Person", "Control", [self.control.id]),
+                     set())
+
+  def test_rebuild(self):
+    """Rebuilding restores links of all existing rows."""
+    links = _get_links()
+    db.session.execute(object_links.delete())
+    db.session.commit()
+    rebuild_object_links()
+    self.assertEqual(_get_links(), links)
+
+
+class TestBulkInsertedLinks(SnapshotterBaseTestCase):
+  """Tests for links of rows inserted without the ORM."""
+
+  def setUp(self):
+    super(TestBulkInsertedLinks, self).setUp()
+    self.client.get("/login")
+
+  def _query_relevant(self, object_name, related_name, related_id):
+    query = [{
+        "object_name": object_name,
+        "type": "ids",
+        "filters": {"expression": {
+            "object_name": related_name,
+            "op": {"name": "relevant"},
+            "ids": [related_id],
+        }},
+    }]
+    response = self.client.post("/query", data=json.dumps(query),
+                                headers={"Content-Type": "application/json"})
+    self.assert200(response)
+    return set(json.loads(response.data)[0][object_name]["ids"])
+
+  def test_audit_snapshot_links(self):
+    """Relevant queries find objects mapped by snapshotting an audit."""
+    program = self.create_object(all_models.Program, {
+        "title": "Linked program",
+    })
+    control = self.create_object(all_models.Control, {
+        "title": "Linked control",
+    })
+    self.create_mapping(program, control)
+    self.create_audit(program)
+    audit = all_models.Audit.query.filter_by(program_id=program.id).one()
+    snapshot = all_models.Snapshot.query.filter_by(
+        parent_type="Audit", parent_id=audit.id,
+        child_type="Control", child_id=control.id,
+    ).one()
+
+    self.assertIn(control.id,
+                  self._query_relevant("Control", "Program", program.id))
+    self.assertIn(control.id,
+                  self._query_relevant("Control", "Audit", audit.id))
+    self.assertIn(audit.id,
+                  self._query_relevant("Audit", "Control", control.id))
+    self.assertIn(snapshot.id,
+                  self._query_relevant("Snapshot", "Audit", audit.id))
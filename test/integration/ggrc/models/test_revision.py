@@ -3,10 +3,19 @@
 
 """ Tests for ggrc.models.Revision """
 
+import mock
+
 import ggrc.models
 import integration.ggrc
 import integration.ggrc.generator
 
+from ggrc import db
+from ggrc.models.revision import get_latest_revision_ids
+from ggrc.models.revision import latest_revisions
+from ggrc.models.revision import refresh_latest_revisions
+from ggrc.services.common import get_cache
+from ggrc.services.common import log_event
+from integration.ggrc import api_helper
 from integration.ggrc.models import factories
 
 
@@ -125,3 +134,103 @@ class TestRevisions(integration.ggrc.TestCase):
     self.assertIsNotNone(revision)
     self.assertEqual(revision.content["title"], process.title)
     self.assertEqual(revision.content["description"], process.description)
+
+  def test_latest_revisions(self):
+    """Latest revisions lookup table follows new revisions."""
+    cls = ggrc.models.DataAsset
+    name = cls._inflector.table_singular  # pylint: disable=protected-access
+    _, obj = self.gen.generate(cls, name, {name: {
+        "title": "latest v1",
+        "context": None,
+    }})
+    _, obj = self.gen.modify(obj, name, {name: {
+        "slug": obj.slug,
+        "title": "latest v2",
+        "context": None,
+    }})
+    newest = max(revision.id for revision in _get_revisions(obj))
+    stub = ("DataAsset", obj.id)
+    self.assertEqual(get_latest_revision_ids([stub]), {stub: newest})
+
+    created_filter = ggrc.models.Revision.action == "created"
+    self.assertEqual(get_latest_revision_ids([stub], [created_filter]), {})
+
+    db.session.execute(latest_revisions.delete())
+    refresh_latest_revisions(stubs=[stub])
+    self.assertEqual(get_latest_revision_ids([stub]), {stub: newest})
+
+
+class TestChangeCapture(integration.ggrc.TestCase):
+  """Tests for capturing changes for revisions."""
+
+  def setUp(self):
+    integration.ggrc.TestCase.setUp(self)
+    self.control = factories.ControlFactory()
+
+  def _modify_in_two_flushes(self):
+    self.control.title = "new title"
+    db.session.flush()
+    self.control.description = "new description"
+    db.session.flush()
+
+  def test_flush_records_changes(self):
+    """Flushes record changed attributes without serializing objects."""
+    with mock.patch.object(ggrc.models.Control, "log_json") as log_json:
+      self._modify_in_two_flushes()
+    self.assertFalse(log_json.called)
+    self.assertLessEqual({"title", "description"},
+                         get_cache().dirty[self.control])
+
+  def test_log_event_serializes_once(self):
+    """Objects flushed several times are serialized once."""
+    self._modify_in_two_flushes()
+    with mock.patch.object(ggrc.models.Control, "log_json",
+                           return_value={"title": "new title"}) as log_json:
+      event = log_event(db.session, self.control, force_obj=True)
+    self.assertEqual(log_json.call_count, 1)
+    db.session.commit()
+
+    revisions = ggrc.models.Revision.query.filter_by(event_id=event.id).all()
+    self.assertEqual(len(revisions), 1)
+    self.assertEqual(revisions[0].action, "modified")
+    self.assertEqual(revisions[0].content, {"title": "new title"})
+    self.assertEqual(
+        get_latest_revision_ids([("Control", self.control.id)]),
+        {("Control", self.control.id): revisions[0].id},
+    )
+
+  def _add_object_person(self):
+    object_person = ggrc.models.ObjectPerson(
+        person=factories.PersonFactory(), personable=self.control)
+    db.session.add(object_person)
+    db.session.commit()
+    return object_person.id
+
+  def _get_deleted_content(self, object_person_id):
+    return ggrc.models.Revision.query.filter_by(
+        resource_type="ObjectPerson",
+        resource_id=object_person_id,
+        action="deleted",
+    ).one().content
+
+  def test_cascade_deleted_revisions(self):
+    """Children deleted with their parent get complete revisions."""
+    object_person_ids = [self._add_object_person() for _ in range(2)]
+    control_id = self.control.id
+    response = api_helper.Api().delete(self.control)
+    self.assert200(response)
+    for object_person_id in object_person_ids:
+      content = self._get_deleted_content(object_person_id)
+      self.assertEqual(content["id"], object_person_id)
+      self.assertEqual(content["personable_type"], "Control")
+      self.assertEqual(content["personable_id"], control_id)
+
+  def test_orphan_revisions(self):
+    """Orphans deleted by a flush are serialized before the flush."""
+    object_person_id = self._add_object_person()
+    object_person = ggrc.models.ObjectPerson.query.get(object_person_id)
+    self.control.object_people.remove(object_person)
+    log_event(db.session, self.control, force_obj=True)
+    db.session.commit()
+    content = self._get_deleted_content(object_person_id)
+    self.assertEqual(content["personable_id"], self.control.id)
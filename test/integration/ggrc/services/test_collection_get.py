@@ -0,0 +1,63 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for loading resources of collection GET requests."""
+
+from ggrc import db
+from ggrc.models import all_models
+from integration.ggrc import TestCase
+from integration.ggrc.api_helper import Api
+from integration.ggrc.models import factories
+
+
+class TestCollectionGet(TestCase):
+  """Tests for loading collection members from the database."""
+
+  def setUp(self):
+    super(TestCollectionGet, self).setUp()
+    self.api = Api()
+
+  def test_polymorphic_collection(self):
+    """Members of all polymorphic types are loaded and counted as misses."""
+    policy = factories.PolicyFactory()
+    regulation = factories.RegulationFactory()
+    response = self.api.get_query(
+        all_models.Directive, "id__in={},{}".format(policy.id, regulation.id))
+
+    self.assert200(response)
+    directives = response.json["directives_collection"]["directives"]
+    self.assertEqual(
+        {(directive["type"], directive["id"]) for directive in directives},
+        {("Policy", policy.id), ("Regulation", regulation.id)},
+    )
+    self.assertEqual(response.headers["X-GGRC-Cache"], "Miss")
+    self.assertEqual(response.headers["X-GGRC-Cache-Hits"], "0")
+    self.assertEqual(response.headers["X-GGRC-Cache-Misses"], "2")
+
+  def test_fields_projection(self):
+    """Requested column and stub fields are built from projection rows."""
+    person = factories.PersonFactory()
+    control = factories.ControlFactory(title="projected")
+    control.modified_by_id = person.id
+    db.session.commit()
+    response = self.api.get_query(
+        all_models.Control,
+        "id={}&__fields=id,title,modified_by".format(control.id))
+
+    self.assert200(response)
+    controls = response.json["controls_collection"]["controls"]
+    self.assertEqual(len(controls), 1)
+    self.assertEqual(set(controls[0]), {"id", "title", "modified_by"})
+    self.assertEqual(controls[0]["title"], "projected")
+    self.assertEqual(controls[0]["modified_by"]["id"], person.id)
+    self.assertEqual(controls[0]["modified_by"]["type"], "Person")
+
+  def test_fields_fallback(self):
+    """Fields that are not plain columns are published from objects."""
+    control = factories.ControlFactory()
+    response = self.api.get_query(
+        all_models.Control, "id={}&__fields=id,viewLink".format(control.id))
+
+    self.assert200(response)
+    controls = response.json["controls_collection"]["controls"]
+    self.assertEqual(set(controls[0]), {"id", "viewLink"})
@@ -0,0 +1,82 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for keyset pagination of /query and collection endpoints."""
+
+import urlparse
+
+from flask import json
+
+from ggrc.models import all_models
+from integration.ggrc import TestCase
+from integration.ggrc.api_helper import Api
+from integration.ggrc.models import factories
+
+
+class TestKeysetPaging(TestCase):
+  """Tests for pages selected by cursors."""
+
+  def setUp(self):
+    super(TestKeysetPaging, self).setUp()
+    self.api = Api()
+    self.client.get("/login")
+    titles = ["b", "a", "c", "a", "b"]
+    self.controls = [factories.ControlFactory(title=title)
+                     for title in titles]
+
+  def _query_page(self, after, **kwargs):
+    query = dict({
+        "object_name": "Control",
+        "type": "ids",
+        "filters": {"expression": {}},
+        "order_by": [{"name": "title", "desc": True}],
+        "limit": [0, 2],
+        "after": after,
+    }, **kwargs)
+    response = self.client.post("/query", data=json.dumps([query]),
+                                headers={"Content-Type": "application/json"})
+    self.assert200(response)
+    return json.loads(response.data)[0]["Control"]
+
+  def test_query_pages(self):
+    """Query API pages follow each other in sorting order."""
+    expected = [control.id for control in sorted(
+        self.controls, key=lambda control: (control.title, -control.id),
+        reverse=True)]
+    ids = []
+    page = self._query_page(None)
+    while True:
+      ids.extend(page["ids"])
+      self.assertEqual(page["total"], 5)
+      if page["next"] is None:
+        break
+      page = self._query_page(page["next"])
+    self.assertEqual(ids, expected)
+
+  def test_query_invalid_cursor(self):
+    """Invalid cursors are rejected."""
+    response = self.client.post(
+        "/query", data=json.dumps([{
+            "object_name": "Control",
+            "filters": {"expression": {}},
+            "after": "invalid",
+        }]), headers={"Content-Type": "application/json"})
+    self.assert400(response)
+
+  def test_collection_pages(self):
+    """Collection pages follow each other in sorting order."""
+    ids = []
+    response = self.api.get_query(
+        all_models.Control, "__sort=title&__page_size=2&__after=")
+    while True:
+      self.assert200(response)
+      collection = response.json["controls_collection"]
+      ids.extend(control["id"] for control in collection["controls"])
+      self.assertEqual(collection["paging"]["total"], 5)
+      if "next" not in collection["paging"]:
+        break
+      next_url = urlparse.urlparse(collection["paging"]["next"])
+      response = self.api.get_query(all_models.Control, next_url.query)
+    expected = [control.id for control in sorted(
+        self.controls, key=lambda control: (control.title, -control.id))]
+    self.assertEqual(ids, expected)
@@ -0,0 +1,96 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for caching of /query results."""
+
+from flask import json
+import mock
+
+from ggrc import db
+from ggrc.cache import backends
+from ggrc.models import all_models
+from ggrc.converters.query_helper import QueryHelper
+from integration.ggrc import TestCase
+from integration.ggrc.models import factories
+
+
+class TestQueryCache(TestCase):
+  """Tests for id lists cached by QueryAPIQueryHelper."""
+
+  def setUp(self):
+    super(TestQueryCache, self).setUp()
+    self.controls = [factories.ControlFactory(title="cached {}".format(i))
+                     for i in range(3)]
+    for patcher in [
+        mock.patch("ggrc.settings.MEMCACHE_MECHANISM", True),
+        mock.patch("ggrc.settings.MEMCACHE_BACKEND", "local"),
+        mock.patch("ggrc.cache.backends._local_store",
+                   backends.LRUStore(1000)),
+    ]:
+      patcher.start()
+      self.addCleanup(patcher.stop)
+    self.client.get("/login")
+
+  def _query_ids(self, limit):
+    query = [{
+        "object_name": "Control",
+        "type": "ids",
+        "filters": {"expression": {
+            "left": "title",
+            "op": {"name": "~"},
+            "right": "cached",
+        }},
+        "order_by": [{"name": "title"}],
+        "limit": limit,
+    }]
+    response = self.client.post("/query", data=json.dumps(query),
+                                headers={"Content-Type": "application/json"})
+    self.assert200(response)
+    return json.loads(response.data)[0]["Control"]
+
+  def test_pages_from_cache(self):
+    """Pages after the first one are sliced from cached ids."""
+    ids = [control.id for control in self.controls]
+    with mock.patch.object(QueryHelper, "_build_expression", autospec=True,
+                           side_effect=QueryHelper._build_expression) as build:
+      first_page = self._query_ids([0, 2])
+      second_page = self._query_ids([2, 4])
+    self.assertEqual(build.call_count, 1)
+    self.assertEqual(first_page["ids"], ids[:2])
+    self.assertEqual(second_page["ids"], ids[2:])
+    self.assertEqual(second_page["total"], 3)
+
+  def test_invalidation(self):
+    """Cached ids are not used after a change of a queried table."""
+    self._query_ids([0, 2])
+    control = factories.ControlFactory(title="cached 3")
+    db.session.commit()
+    with mock.patch.object(QueryHelper, "_build_expression", autospec=True,
+                           side_effect=QueryHelper._build_expression) as build:
+      result = self._query_ids([2, 4])
+    self.assertEqual(build.call_count, 1)
+    self.assertEqual(result["ids"], [self.controls[2].id, control.id])
+    self.assertEqual(result["total"], 4)
+
+  def test_bulk_update_invalidation(self):
+    """Cached ids are not used after a bulk update of a queried table."""
+    self._query_ids([0, 2])
+    all_models.Control.query.filter_by(id=self.controls[0].id).update(
+        {"title": "renamed"}, synchronize_session=False)
+    db.session.commit()
+    result = self._query_ids([0, 2])
+    self.assertEqual(result["ids"], [control.id
+                                     for control in self.controls[1:]])
+    self.assertEqual(result["total"], 2)
+
+  @mock.patch("ggrc.services.query_helper.MAX_CACHED_IDS", 2)
+  def test_too_many_ids(self):
+    """Only the requested page is queried for results too big to cache."""
+    ids = [control.id for control in self.controls]
+    self.assertEqual(self._query_ids([0, 1])["ids"], ids[:1])
+    with mock.patch.object(QueryHelper, "_build_expression", autospec=True,
+                           side_effect=QueryHelper._build_expression) as build:
+      result = self._query_ids([1, 2])
+    self.assertEqual(build.call_count, 1)
+    self.assertEqual(result["ids"], ids[1:2])
+    self.assertEqual(result["total"], 3)
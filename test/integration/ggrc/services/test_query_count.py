@@ -0,0 +1,70 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for /query object queries of type count."""
+
+from flask import json
+import mock
+
+from ggrc.services.query_helper import QueryAPIQueryHelper
+from integration.ggrc import TestCase
+from integration.ggrc.models import factories
+
+
+class TestCountQueries(TestCase):
+  """Tests for counts selected without fetching ids."""
+
+  def setUp(self):
+    super(TestCountQueries, self).setUp()
+    self.client.get("/login")
+    for i in range(3):
+      factories.ControlFactory(title="counted {}".format(i))
+    factories.ControlFactory(title="other")
+    for _ in range(2):
+      factories.ObjectiveFactory()
+
+  def _post(self, query):
+    response = self.client.post("/query", data=json.dumps(query),
+                                headers={"Content-Type": "application/json"})
+    self.assert200(response)
+    return json.loads(response.data)
+
+  @staticmethod
+  def _count_query(object_name, expression=None, **kwargs):
+    return dict({
+        "object_name": object_name,
+        "type": "count",
+        "filters": {"expression": expression or {}},
+    }, **kwargs)
+
+  def test_folded_counts(self):
+    """Count queries of a request are counted together without ids."""
+    query = [
+        self._count_query("Control"),
+        self._count_query("Control", {
+            "left": "title",
+            "op": {"name": "~"},
+            "right": "counted",
+        }),
+        self._count_query("Objective"),
+        self._count_query("Control", limit=[2, 10]),
+    ]
+    with mock.patch.object(QueryAPIQueryHelper, "_get_ids") as get_ids, \
+        mock.patch.object(QueryAPIQueryHelper, "_get_counts", autospec=True,
+                          side_effect=QueryAPIQueryHelper._get_counts) \
+        as get_counts:
+      results = self._post(query)
+    self.assertFalse(get_ids.called)
+    self.assertEqual(get_counts.call_count, 1)
+    names = ["Control", "Control", "Objective", "Control"]
+    self.assertEqual(
+        [(result[name]["count"], result[name]["total"])
+         for name, result in zip(names, results)],
+        [(4, 4), (3, 3), (2, 2), (2, 4)],
+    )
+    self.assertNotIn("ids", results[0]["Control"])
+
+  def test_no_filters(self):
+    """Object queries without filters count no objects."""
+    results = self._post([{"object_name": "Control", "type": "count"}])
+    self.assertEqual(results[0]["Control"]["count"], 0)
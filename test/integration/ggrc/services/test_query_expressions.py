@@ -0,0 +1,124 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for compiling /query filter expressions."""
+
+import collections
+from contextlib import contextmanager
+
+from flask import json
+import mock
+import sqlalchemy as sa
+
+from ggrc import db
+from ggrc.cache import backends
+from ggrc.converters.query_helper import QueryHelper
+from integration.ggrc import TestCase
+from integration.ggrc.models import factories
+
+
+@contextmanager
+def cad_statements():
+  """Collect SQL statements that read custom attribute definitions."""
+  statements = []
+
+  def before_cursor_execute(conn, cursor, statement, *args):
+    # pylint: disable=unused-argument
+    if "FROM custom_attribute_definitions" in statement:
+      statements.append(statement)
+
+  sa.event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+  try:
+    yield statements
+  finally:
+    sa.event.remove(db.engine, "before_cursor_execute",
+                    before_cursor_execute)
+
+
+class TestQueryExpressions(TestCase):
+  """Tests for custom attribute metadata and compiled expressions."""
+
+  EXPRESSION = {
+      "left": {"left": "due date", "op": {"name": "<"}, "right": "01/31/2017"},
+      "op": {"name": "AND"},
+      "right": {
+          "left": {"left": "color", "op": {"name": "~"}, "right": "x"},
+          "op": {"name": "OR"},
+          "right": {"left": "title", "op": {"name": "="}, "right": "y"},
+      },
+  }
+
+  def setUp(self):
+    super(TestQueryExpressions, self).setUp()
+    factories.CustomAttributeDefinitionFactory(
+        title="Due date", definition_type="control", attribute_type="Date")
+    factories.CustomAttributeDefinitionFactory(
+        title="Color", definition_type="control")
+    for patcher in [
+        mock.patch("ggrc.converters.query_helper._expression_cache",
+                   collections.OrderedDict()),
+        mock.patch("ggrc.converters.cad_metadata._shared_metadata", {}),
+    ]:
+      patcher.start()
+      self.addCleanup(patcher.stop)
+    self.client.get("/login")
+
+  @staticmethod
+  def _enable_memcache():
+    return [
+        mock.patch("ggrc.settings.MEMCACHE_MECHANISM", True),
+        mock.patch("ggrc.settings.MEMCACHE_BACKEND", "local"),
+        mock.patch("ggrc.cache.backends._local_store",
+                   backends.LRUStore(1000)),
+    ]
+
+  def _post(self, expression, order_by="title"):
+    query = [{
+        "object_name": "Control",
+        "type": "ids",
+        "filters": {"expression": expression},
+        "order_by": [{"name": order_by}],
+    }]
+    return self.client.post("/query", data=json.dumps(query),
+                            headers={"Content-Type": "application/json"})
+
+  def test_metadata_loaded_once(self):
+    """Definitions are loaded once for all custom attribute filters."""
+    with cad_statements() as statements:
+      response = self._post(self.EXPRESSION)
+    self.assert200(response)
+    self.assertEqual(len(statements), 1)
+
+  def test_date_validation(self):
+    """Date custom attributes still expect dates."""
+    response = self._post({
+        "left": "due date",
+        "op": {"name": "="},
+        "right": "not a date",
+    })
+    self.assert400(response)
+
+  def test_compiled_once(self):
+    """Expressions are compiled once while definitions do not change."""
+    for patcher in self._enable_memcache():
+      patcher.start()
+      self.addCleanup(patcher.stop)
+    with mock.patch.object(QueryHelper, "_compile_expression", autospec=True,
+                           side_effect=QueryHelper._compile_expression) \
+        as compile_expression, cad_statements() as statements:
+      self.assert200(self._post(self.EXPRESSION))
+      first_count = compile_expression.call_count
+      self.assert200(self._post(self.EXPRESSION, order_by="slug"))
+    # one call for every operator in the tree
+    self.assertEqual(first_count, 5)
+    self.assertEqual(compile_expression.call_count, first_count)
+    self.assertEqual(len(statements), 1)
+
+    factories.CustomAttributeDefinitionFactory(
+        title="Owner notes", definition_type="control")
+    db.session.commit()
+    with mock.patch.object(QueryHelper, "_compile_expression", autospec=True,
+                           side_effect=QueryHelper._compile_expression) \
+        as compile_expression:
+      self.assert200(self._post(self.EXPRESSION, order_by="slug"))
+    self.assertEqual(compile_expression.call_count, 5)
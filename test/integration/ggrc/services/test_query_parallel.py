@@ -0,0 +1,91 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for concurrent evaluation of /query object queries."""
+
+from flask import json
+import mock
+from sqlalchemy.orm import object_session
+
+from ggrc.login import get_current_user
+from ggrc.services import query_helper
+from integration.ggrc import TestCase
+from integration.ggrc.models import factories
+
+
+class TestParallelQueries(TestCase):
+  """Tests for object queries evaluated by worker threads."""
+
+  def setUp(self):
+    super(TestParallelQueries, self).setUp()
+    self.client.get("/login")
+    self.program = factories.ProgramFactory()
+    self.controls = [factories.ControlFactory() for _ in range(3)]
+    factories.RelationshipFactory(source=self.program,
+                                  destination=self.controls[0])
+    self.objectives = [factories.ObjectiveFactory() for _ in range(2)]
+
+  def _post(self, query):
+    return self.client.post("/query", data=json.dumps(query),
+                            headers={"Content-Type": "application/json"})
+
+  @staticmethod
+  def _ids_query(object_name, **kwargs):
+    return dict({
+        "object_name": object_name,
+        "type": "ids",
+        "filters": {"expression": {}},
+    }, **kwargs)
+
+  def test_results_order(self):
+    """Results of concurrent and linked queries are in request order."""
+    query = [
+        self._ids_query("Control"),
+        self._ids_query("Program"),
+        self._ids_query("Objective"),
+        self._ids_query("Control", type="count", filters={"expression": {
+            "object_name": "__previous__",
+            "op": {"name": "relevant"},
+            "ids": [1],
+        }}),
+        self._ids_query("Program"),
+    ]
+    with mock.patch.object(query_helper._QueryWorker, "run", autospec=True,
+                           side_effect=query_helper._QueryWorker.run) as run:
+      response = self._post(query)
+    self.assert200(response)
+    self.assertTrue(run.called)
+    results = json.loads(response.data)
+    names = ["Control", "Program", "Objective", "Control", "Program"]
+    self.assertEqual(
+        [result[name]["count"] for name, result in zip(names, results)],
+        [3, 1, 2, 1, 1],
+    )
+
+  def test_worker_error(self):
+    """Errors of queries evaluated by workers are returned."""
+    query = [self._ids_query("Control") for _ in range(3)]
+    query[2]["order_by"] = [{"name": "__similarity__"}]
+    response = self._post(query)
+    self.assert400(response)
+
+  def test_worker_user(self):
+    """Workers use the current user loaded in their own sessions."""
+    sessions = []
+    get_queued_results = query_helper.QueryAPIQueryHelper._get_queued_results
+
+    def record_user_session(helper, queries):
+      user = get_current_user()
+      sessions.append((user.id, object_session(user)))
+      return get_queued_results(helper, queries)
+
+    query = [self._ids_query("Control") for _ in range(3)]
+    with mock.patch.object(query_helper.QueryAPIQueryHelper,
+                           "_get_queued_results", autospec=True,
+                           side_effect=record_user_session):
+      response = self._post(query)
+    self.assert200(response)
+    self.assertGreater(len(sessions), 1)
+    self.assertEqual(len({user_id for user_id, _ in sessions}), 1)
+    self.assertEqual(len({id(session) for _, session in sessions}),
+                     len(sessions))
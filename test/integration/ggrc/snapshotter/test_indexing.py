@@ -9,7 +9,10 @@ from ggrc import db
 from ggrc import models
 from ggrc.views import do_reindex
 from ggrc.fulltext.mysql import MysqlRecordProperty as Record
+from ggrc.snapshotter.datastructures import Pair
 from ggrc.snapshotter.indexer import delete_records
+from ggrc.snapshotter.indexer import reindex
+from ggrc.snapshotter.indexer import reindex_pairs
 
 from integration.ggrc.snapshotter import SnapshotterBaseTestCase
 from integration.ggrc.models import factories
@@ -339,3 +342,33 @@ class TestSnapshotIndexing(SnapshotterBaseTestCase):
     records = get_records(audit, snapshots)
 
     self.assertEqual(records.count(), 57)
+
+  def test_batched_reindex(self):
+    """Test reindex of snapshots in small batches"""
+    self._import_file("snapshotter_create.csv")
+
+    program = db.session.query(models.Program).filter(
+        models.Program.slug == "Prog-13211"
+    ).one()
+
+    self.create_audit(program)
+
+    audit = db.session.query(models.Audit).filter(
+        models.Audit.title.like("%Snapshotable audit%")).first()
+
+    snapshots = db.session.query(models.Snapshot).all()
+    all_records = db.session.query(Record).filter(Record.type == "Snapshot")
+    expected = {(r.key, r.property, r.content) for r in all_records}
+
+    delete_records({s.id for s in snapshots})
+    pairs = reindex(batch_size=5)
+
+    self.assertEqual(len(pairs), len(snapshots))
+    self.assertEqual(get_records(audit, snapshots).count(), 57)
+    all_records = db.session.query(Record).filter(Record.type == "Snapshot")
+    self.assertEqual({(r.key, r.property, r.content) for r in all_records},
+                     expected)
+
+    delete_records({s.id for s in snapshots})
+    reindex_pairs({Pair.from_snapshot(s) for s in snapshots}, batch_size=7)
+    self.assertEqual(get_records(audit, snapshots).count(), 57)
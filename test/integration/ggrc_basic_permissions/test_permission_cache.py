@@ -0,0 +1,71 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for selective invalidation of cached permissions."""
+
+from ggrc.models import all_models
+from ggrc.models.cache import Cache
+from ggrc_basic_permissions import get_affected_user_ids
+from integration.ggrc import TestCase
+from integration.ggrc.models import factories
+
+
+class TestAffectedUsers(TestCase):
+  """Tests for get_affected_user_ids."""
+
+  def setUp(self):
+    super(TestAffectedUsers, self).setUp()
+    self.person = factories.PersonFactory()
+    self.other = factories.PersonFactory()
+    self.assessment = factories.AssessmentFactory()
+    self.control = factories.ControlFactory()
+    self.assignee_rel = factories.RelationshipFactory(
+        source=self.assessment, destination=self.person)
+    factories.RelationshipAttrFactory(
+        relationship_id=self.assignee_rel.id,
+        attr_name="AssigneeType",
+        attr_value="Assessor",
+    )
+
+  @staticmethod
+  def _cache(new=(), dirty=(), deleted=()):
+    cache = Cache()
+    cache.new = {obj: None for obj in new}
+    cache.dirty = {obj: None for obj in dirty}
+    cache.deleted = {obj: None for obj in deleted}
+    return cache
+
+  def test_unrelated_change(self):
+    """Editing an object that grants no permissions affects nobody."""
+    self.assertEqual(
+        get_affected_user_ids(self._cache(dirty=[self.control])), set())
+
+  def test_owner_change(self):
+    """Object owners affect only the owner."""
+    owner = all_models.ObjectOwner(
+        person_id=self.other.id, ownable_id=self.control.id,
+        ownable_type="Control")
+    self.assertEqual(
+        get_affected_user_ids(self._cache(new=[owner])), {self.other.id})
+
+  def test_mapping_to_assigned_object(self):
+    """Mapping an object to an assessment affects its assignees."""
+    rel = all_models.Relationship(
+        source_type="Assessment", source_id=self.assessment.id,
+        destination_type="Control", destination_id=self.control.id)
+    self.assertEqual(
+        get_affected_user_ids(self._cache(new=[rel])), {self.person.id})
+
+  def test_assignee_type_change(self):
+    """Changing relationship attributes affects the related person."""
+    attr = all_models.RelationshipAttr.query.filter_by(
+        relationship_id=self.assignee_rel.id).first()
+    attr.attr_value = "Verifier"
+    self.assertEqual(
+        get_affected_user_ids(self._cache(dirty=[attr])), {self.person.id})
+
+  def test_global_change(self):
+    """Role changes affect all users."""
+    role = all_models.Role.query.first()
+    self.assertIsNone(get_affected_user_ids(self._cache(dirty=[role])))
+    self.assertIsNone(get_affected_user_ids(None))
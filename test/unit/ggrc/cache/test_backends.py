@@ -0,0 +1,154 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for memcache client backends."""
+
+import SocketServer
+import threading
+import unittest
+
+from ggrc.cache import backends
+
+
+class MemcachedStandIn(SocketServer.StreamRequestHandler):
+  """Minimal memcached text protocol server backed by a dict."""
+
+  def handle(self):
+    data = self.server.data
+    while True:
+      line = self.rfile.readline()
+      if not line:
+        return
+      parts = line.split()
+      command, args = parts[0], parts[1:]
+      if command in ("get", "gets"):
+        for key in args:
+          if key in data:
+            value, flags, cas_id = data[key]
+            self.wfile.write("VALUE {} {} {} {}\r\n{}\r\n".format(
+                key, flags, len(value), cas_id, value))
+        self.wfile.write("END\r\n")
+      elif command in ("set", "add", "cas"):
+        value = self.rfile.read(int(args[3]) + 2)[:-2]
+        key = args[0]
+        if command == "add" and key in data:
+          self.wfile.write("NOT_STORED\r\n")
+        elif command == "cas" and data.get(key, (0, 0, 0))[2] != \
+            int(args[4]):
+          self.wfile.write("EXISTS\r\n")
+        else:
+          self.server.cas_id += 1
+          data[key] = (value, int(args[1]), self.server.cas_id)
+          self.wfile.write("STORED\r\n")
+      elif command == "delete":
+        self.wfile.write("DELETED\r\n" if data.pop(args[0], None)
+                         else "NOT_FOUND\r\n")
+      elif command == "incr":
+        if args[0] in data:
+          value, flags, cas_id = data[args[0]]
+          value = str(int(value) + int(args[1]))
+          data[args[0]] = (value, flags, cas_id)
+          self.wfile.write(value + "\r\n")
+        else:
+          self.wfile.write("NOT_FOUND\r\n")
+      elif command == "flush_all":
+        data.clear()
+        self.wfile.write("OK\r\n")
+
+
+class ClientTests(object):
+  """Tests shared by all memcache clients."""
+
+  client = None
+
+  def test_get_multi(self):
+    """Only found keys are returned."""
+    self.assertEqual(self.client.set_multi({"a": 1, "b": {"c": [2]}}), [])
+    self.assertEqual(self.client.get_multi(["a", "b", "missing"]),
+                     {"a": 1, "b": {"c": [2]}})
+
+  def test_add_multi(self):
+    """Existing keys are not overwritten by add."""
+    self.client.set("a", "old")
+    self.assertEqual(self.client.add_multi({"a": "new", "b": "new"}), ["a"])
+    self.assertEqual(self.client.get_multi(["a", "b"]),
+                     {"a": "old", "b": "new"})
+
+  def test_cas(self):
+    """Compare and set fails if the value changed after gets."""
+    self.client.set("a", 1)
+    self.assertFalse(self.client.cas("a", 2))
+    self.assertEqual(self.client.gets("a"), 1)
+    self.client.set("a", 3)
+    self.assertFalse(self.client.cas("a", 2))
+    self.client.get_multi(["a"], for_cas=True)
+    self.assertEqual(self.client.cas_multi({"a": 4}), [])
+    self.assertEqual(self.client.get("a"), 4)
+
+  def test_delete_multi(self):
+    """Deleted keys are no longer returned."""
+    self.client.set_multi({"a": 1, "b": 2})
+    self.assertTrue(self.client.delete_multi(["a", "missing"]))
+    self.assertEqual(self.client.delete("b"), backends.DELETE_SUCCESSFUL)
+    self.assertEqual(self.client.delete("b"), backends.DELETE_ITEM_MISSING)
+    self.assertEqual(self.client.get_multi(["a", "b"]), {})
+
+  def test_incr(self):
+    """Counters start at initial_value."""
+    self.assertIsNone(self.client.incr("counter"))
+    self.assertEqual(self.client.incr("counter", initial_value=0), 1)
+    self.assertEqual(self.client.incr("counter", delta=5), 6)
+    self.assertEqual(self.client.get("counter"), 6)
+
+
+class TestLRUCacheClient(ClientTests, unittest.TestCase):
+  """Tests for the in-process LRU client."""
+
+  def setUp(self):
+    self.client = backends.LRUCacheClient(backends.LRUStore(3))
+
+  def test_eviction(self):
+    """Least recently used entries are evicted first."""
+    for key, value in [("a", 1), ("b", 2), ("c", 3)]:
+      self.client.set(key, value)
+    self.client.get("a")
+    self.client.set("d", 4)
+    self.assertEqual(self.client.get_multi(["a", "b", "c", "d"]),
+                     {"a": 1, "c": 3, "d": 4})
+
+  def test_copies(self):
+    """Cached values can not be modified through references."""
+    value = {"a": 1}
+    self.client.set("key", value)
+    value["a"] = 2
+    self.client.get("key")["a"] = 3
+    self.assertEqual(self.client.get("key"), {"a": 1})
+
+
+class TestMemcachedClient(ClientTests, unittest.TestCase):
+  """Tests for the memcached protocol client."""
+
+  def setUp(self):
+    self.server = SocketServer.ThreadingTCPServer(
+        ("127.0.0.1", 0), MemcachedStandIn)
+    self.server.daemon_threads = True
+    self.server.data = {}
+    self.server.cas_id = 0
+    thread = threading.Thread(target=self.server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    self.client = backends.MemcachedClient(
+        ["127.0.0.1:{}".format(self.server.server_address[1])])
+
+  def tearDown(self):
+    # pylint: disable=protected-access
+    for connection in backends.MemcachedClient._local.connections.values():
+      connection.close()
+    self.server.shutdown()
+    self.server.server_close()
+
+  def test_long_keys(self):
+    """Keys that are invalid in the protocol are hashed."""
+    key = "key with spaces " + "x" * 300
+    self.client.set(key, "value")
+    self.assertEqual(self.client.get_multi([key]), {key: "value"})
@@ -0,0 +1,43 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for full text n-gram tokenization."""
+
+import unittest
+
+from ggrc.fulltext import ngrams
+
+
+class TestNgrams(unittest.TestCase):
+  """Tests for n-gram helpers."""
+
+  def test_normalize(self):
+    """Text is lowercased and accents are removed."""
+    self.assertEqual(ngrams.normalize(u"R\u00e9SUM\u00c9"), u"resume")
+    self.assertEqual(ngrams.normalize("caf\xc3\xa9"), u"cafe")
+    self.assertEqual(ngrams.normalize(42), u"42")
+    self.assertEqual(ngrams.normalize(None), u"")
+
+  def test_get_ngrams(self):
+    """N-grams do not cross word boundaries."""
+    self.assertEqual(ngrams.get_ngrams("Some TEXT, ok"),
+                     {u"som", u"ome", u"tex", u"ext"})
+
+  def test_substring_ngrams(self):
+    """Substrings of a text have only n-grams of that text."""
+    text = u"Access control for the main datacenter"
+    for start in range(len(text)):
+      for end in range(start, len(text) + 1):
+        query_ngrams = ngrams.get_query_ngrams(text[start:end]) or []
+        self.assertLessEqual(set(query_ngrams), ngrams.get_ngrams(text))
+
+  def test_short_terms(self):
+    """Terms without long enough words have no query n-grams."""
+    self.assertIsNone(ngrams.get_query_ngrams(u"ab cd"))
+    self.assertIsNone(ngrams.get_query_ngrams(u"  "))
+    self.assertEqual(ngrams.get_query_ngrams(u"ab cde"), [u"cde"])
+
+  def test_query_ngram_limit(self):
+    """Long terms are matched with a bounded number of n-grams."""
+    query_ngrams = ngrams.get_query_ngrams(u"abcdefghijklmnopqrstuvwxyz")
+    self.assertEqual(len(query_ngrams), ngrams.MAX_QUERY_NGRAMS)
@@ -0,0 +1,59 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for custom ORM data types."""
+
+import pickle
+import unittest
+
+from ggrc.models.types import CompressedType
+
+
+class TestCompressedType(unittest.TestCase):
+  """Tests for encoding of compressed values."""
+
+  def setUp(self):
+    self.type_ = CompressedType(stream_key="content")
+    self.value = {
+        "content": "x" * 100000,
+        "status_code": 200,
+        "headers": [("Content-Type", "text/html")],
+    }
+
+  def _roundtrip(self, value, type_=None):
+    type_ = type_ or self.type_
+    return type_.process_result_value(
+        type_.process_bind_param(value, None), None)
+
+  def test_roundtrip(self):
+    """Values are compressed and decoded back."""
+    stored = self.type_.process_bind_param(self.value, None)
+    self.assertLess(len(stored), 1000)
+    self.assertEqual(stored[:1], CompressedType.FORMAT_ZLIB_STREAM)
+    self.assertEqual(self.type_.process_result_value(stored, None),
+                     self.value)
+    for value in [None, {"id": 1, "content": u"text"}, [1, {"a": set()}]]:
+      self.assertEqual(self._roundtrip(value), value)
+      self.assertEqual(self._roundtrip(value, CompressedType()), value)
+
+  def test_legacy_pickle(self):
+    """Values stored as plain pickle are decoded."""
+    for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+      stored = pickle.dumps(self.value, protocol)
+      self.assertEqual(self.type_.process_result_value(stored, None),
+                       self.value)
+
+  def test_iter_stream(self):
+    """Streamed values are decompressed in chunks."""
+    stored = self.type_.process_bind_param(self.value, None)
+    head, chunks = self.type_.iter_stream(stored, chunk_size=1000)
+    chunks = list(chunks)
+    self.assertEqual(head, {"status_code": 200,
+                            "headers": [("Content-Type", "text/html")]})
+    self.assertTrue(all(len(chunk) <= 1000 for chunk in chunks))
+    self.assertEqual("".join(chunks), self.value["content"])
+
+  def test_iter_stream_plain(self):
+    """Values that are not streamed are returned whole."""
+    stored = CompressedType().process_bind_param(self.value, None)
+    self.assertEqual(self.type_.iter_stream(stored), (self.value, None))
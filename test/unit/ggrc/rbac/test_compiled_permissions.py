@@ -0,0 +1,55 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for compiled permission lookup tables."""
+
+import unittest
+
+from ggrc.rbac.permissions_provider import CompiledPermissions
+
+
+class TestCompiledPermissions(unittest.TestCase):
+  """Tests for CompiledPermissions."""
+
+  def setUp(self):
+    self.permissions = {
+        "__user": "user@example.com",
+        "read": {
+            "Control": {
+                "contexts": [1, 2, None],
+                "resources": [5, 6],
+            },
+            "Program": {
+                "contexts": [3],
+            },
+        },
+        "update": {},
+    }
+    self.compiled = CompiledPermissions(self.permissions)
+
+  def test_source(self):
+    """Compiled permissions keep a reference to the permissions dict."""
+    self.assertIs(self.compiled.source, self.permissions)
+
+  def test_lookups(self):
+    """Contexts and resources are stored in frozen sets."""
+    self.assertEqual(self.compiled.contexts_for("read", "Control"),
+                     frozenset([1, 2, None]))
+    self.assertEqual(self.compiled.resources_for("read", "Control"),
+                     frozenset([5, 6]))
+    self.assertEqual(self.compiled.contexts_for("read", "Program"),
+                     frozenset([3]))
+    self.assertEqual(self.compiled.resources_for("read", "Program"),
+                     frozenset())
+
+  def test_missing_entries(self):
+    """Missing actions and types result in empty sets."""
+    self.assertEqual(self.compiled.contexts_for("update", "Control"),
+                     frozenset())
+    self.assertEqual(self.compiled.resources_for("delete", "Audit"),
+                     frozenset())
+
+  def test_empty_permissions(self):
+    """Permissions that were not loaded compile to empty lookup tables."""
+    compiled = CompiledPermissions(None)
+    self.assertEqual(compiled.contexts_for("read", "Control"), frozenset())
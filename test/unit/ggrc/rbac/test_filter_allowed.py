@@ -0,0 +1,76 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for set based permission checks."""
+
+import itertools
+import unittest
+
+from ggrc.rbac.permissions_provider import CompiledPermissions
+from ggrc.rbac.permissions_provider import DefaultUserPermissions
+
+
+class StaticUserPermissions(DefaultUserPermissions):
+  """User permissions that do not depend on the request globals."""
+
+  def __init__(self, permissions):
+    self.permissions = permissions
+    self.compiled = CompiledPermissions(permissions)
+
+  def _permissions(self):
+    return self.permissions
+
+  def _compiled_permissions(self, permissions):
+    return self.compiled
+
+
+class TestFilterAllowed(unittest.TestCase):
+  """Tests for DefaultUserPermissions.filter_allowed."""
+
+  STUBS = set(itertools.product(
+      ["Control", "Program", "Audit"],
+      [1, 2, 3],
+      [None, 1, 2, 3],
+  ))
+
+  def assert_same_as_single_checks(self, permissions):
+    user_permissions = StaticUserPermissions(permissions)
+    expected = {stub for stub in self.STUBS
+                if user_permissions.is_allowed_read(*stub)}
+    self.assertEqual(user_permissions.filter_allowed("read", self.STUBS),
+                     expected)
+    return expected
+
+  def test_no_permissions(self):
+    """Users without permissions can not read anything."""
+    self.assertEqual(self.assert_same_as_single_checks({}), set())
+
+  def test_context_and_resource_permissions(self):
+    """Context and resource permissions match single checks."""
+    allowed = self.assert_same_as_single_checks({
+        "read": {
+            "Control": {"contexts": [1], "resources": [3]},
+            "Program": {"contexts": [None]},
+            "__GGRC_ALL__": {"contexts": [2]},
+        },
+        "__GGRC_ADMIN__": {
+            "__GGRC_ALL__": {"contexts": [3]},
+        },
+    })
+    self.assertIn(("Control", 1, 1), allowed)
+    self.assertIn(("Control", 3, None), allowed)
+    self.assertIn(("Audit", 1, 2), allowed)
+    self.assertIn(("Audit", 1, 3), allowed)
+    self.assertNotIn(("Audit", 1, 1), allowed)
+
+  def test_global_permissions(self):
+    """Permissions for all contexts match single checks."""
+    self.assert_same_as_single_checks({
+        "read": {"__GGRC_ALL__": {"contexts": [None]}},
+    })
+
+  def test_admin(self):
+    """Admins can read everything."""
+    self.assertEqual(self.assert_same_as_single_checks({
+        "__GGRC_ADMIN__": {"__GGRC_ALL__": {"contexts": [0]}},
+    }), self.STUBS)
@@ -0,0 +1,53 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for invalidation of cached collection responses."""
+
+import unittest
+
+import flask
+import mock
+
+from ggrc.services import common
+
+
+class TestInvalidateCollectionResponses(unittest.TestCase):
+  """Tests for invalidate_collection_responses."""
+
+  def test_bump_modified_collections(self):
+    """Generations are bumped once per modified collection."""
+    cache_manager = mock.MagicMock()
+    cache_manager.marked_for_delete = [
+        "collection:controls:1",
+        "collection:controls:2",
+        "collection:programs:3",
+        "DeleteOp:collection:audits:4",
+    ]
+    common.invalidate_collection_responses(cache_manager)
+    incr = cache_manager.cache_object.memcache_client.incr
+    self.assertItemsEqual(
+        [call[0][0] for call in incr.call_args_list],
+        [common.get_collection_generation_key("controls"),
+         common.get_collection_generation_key("programs")],
+    )
+
+  def test_no_modified_collections(self):
+    """Nothing is bumped without modified objects."""
+    cache_manager = mock.MagicMock()
+    cache_manager.marked_for_delete = []
+    common.invalidate_collection_responses(cache_manager)
+    self.assertFalse(cache_manager.cache_object.memcache_client.incr.called)
+
+
+class TestCollectionResponseCacheKey(unittest.TestCase):
+  """Tests for Resource.get_collection_response_cache_key."""
+
+  def test_include_not_cached(self):
+    """Responses with included objects of other types are not cached."""
+    resource = mock.MagicMock(spec=common.Resource)
+    resource.has_cache.return_value = True
+    resource.model.__name__ = "Audit"
+    app = flask.Flask(__name__)
+    with app.test_request_context("/api/audits?__include=program"):
+      self.assertIsNone(
+          common.Resource.get_collection_response_cache_key(resource))
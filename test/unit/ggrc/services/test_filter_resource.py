@@ -0,0 +1,46 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for filtering of unreadable resources."""
+
+import unittest
+
+import mock
+
+from ggrc.builder.json import walk_representation
+from ggrc.services import common
+from ggrc.utils import json_codec
+
+
+class TestLazyContent(unittest.TestCase):
+  """Tests for resources with lazily decoded JSON content."""
+
+  def setUp(self):
+    self.content = json_codec.loads_lazy(json_codec.dumps({
+        "type": "Control", "id": 2, "context_id": None,
+        "owner": {"type": "Person", "id": 3, "context_id": None},
+    }))
+    self.resource = {
+        "type": "Revision", "id": 1, "context_id": None,
+        "content": self.content,
+    }
+
+  def test_prune_content(self):
+    """Unreadable resources inside lazy content are removed."""
+    user_permissions = mock.Mock(spec=["is_allowed_read"])
+    user_permissions.is_allowed_read.side_effect = (
+        lambda type_, *_: type_ != "Person")
+    with mock.patch.object(common, "_is_creator", return_value=False):
+      resource = common.filter_resource(self.resource,
+                                        user_permissions=user_permissions)
+    self.assertIsNone(resource["content"]["owner"])
+    checked = {call[0][0] for call
+               in user_permissions.is_allowed_read.call_args_list}
+    self.assertEqual(checked, {"Revision", "Control", "Person"})
+
+  def test_walk_content(self):
+    """Values inside lazy content are walked."""
+    items = {(key, value) for value, key, _ in
+             walk_representation(self.resource)}
+    self.assertIn(("type", "Person"), items)
+    self.assertIn(("id", 3), items)
@@ -0,0 +1,141 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+ Micro-benchmark for the JSON codec
+
+ Encodes and decodes payloads shaped like Control and Assessment revision
+ content with the encoder and json.loads used before the codec was added, and
+ with ggrc.utils.json_codec. Loading revisions whose content is never read is
+ measured separately, since that is where lazy decoding pays off.
+
+ Usage: python benchmark_json_codec.py [num_iterations]
+"""
+
+import datetime
+import json
+import sys
+import timeit
+
+from ggrc.utils import json_codec
+
+
+class BaselineEncoder(json.JSONEncoder):
+  """GrcEncoder as it was before ggrc.utils.json_codec."""
+
+  def default(self, obj):  # pylint: disable=method-hidden
+    if isinstance(obj, datetime.datetime):
+      return obj.isoformat()
+    elif isinstance(obj, datetime.date):
+      return obj.isoformat()
+    elif isinstance(obj, datetime.timedelta):
+      return (datetime.datetime.min + obj).time().isoformat()
+    elif isinstance(obj, set):
+      return list(obj)
+    else:
+      return super(BaselineEncoder, self).default(obj)
+
+
+def _person(person_id):
+  return {
+      "id": person_id,
+      "type": "Person",
+      "href": "/api/people/{}".format(person_id),
+      "context_id": None,
+  }
+
+
+def _custom_attribute_values(count):
+  return [{
+      "id": i,
+      "type": "CustomAttributeValue",
+      "custom_attribute_id": i,
+      "attribute_value": "value {}".format(i),
+      "attribute_object_id": None,
+      "created_at": datetime.datetime(2017, 1, 1, 10, 0, i % 60),
+      "updated_at": datetime.datetime(2017, 1, 2, 10, 0, i % 60),
+  } for i in range(count)]
+
+
+def get_control():
+  """Get content of a Control revision."""
+  return {
+      "id": 1,
+      "type": "Control",
+      "title": "Control title",
+      "slug": "CONTROL-1",
+      "description": "Control description " * 20,
+      "test_plan": "Test plan " * 20,
+      "status": "Draft",
+      "os_state": "UNREVIEWED",
+      "start_date": datetime.date(2017, 1, 1),
+      "end_date": None,
+      "created_at": datetime.datetime(2017, 1, 1, 10, 0, 0),
+      "updated_at": datetime.datetime(2017, 1, 2, 10, 0, 0),
+      "owners": [_person(i) for i in range(5)],
+      "people": [_person(i) for i in range(10)],
+      "categories": [{"id": i, "type": "ControlCategory"} for i in range(5)],
+      "custom_attribute_values": _custom_attribute_values(30),
+      "custom_attribute_definitions": [],
+      "related_sources": [{"id": i, "type": "Relationship"}
+                          for i in range(20)],
+      "related_destinations": [{"id": i, "type": "Relationship"}
+                               for i in range(20)],
+      "display_name": "Control title",
+      "resource_type": "Control",
+  }
+
+
+def get_assessment():
+  """Get content of an Assessment revision."""
+  return {
+      "id": 1,
+      "type": "Assessment",
+      "title": "Assessment title",
+      "slug": "ASSESSMENT-1",
+      "status": "In Progress",
+      "design": "Effective",
+      "operationally": "Effective",
+      "notes": "Notes " * 50,
+      "finished_date": datetime.datetime(2017, 2, 1, 10, 0, 0),
+      "verified_date": None,
+      "created_at": datetime.datetime(2017, 1, 1, 10, 0, 0),
+      "updated_at": datetime.datetime(2017, 1, 2, 10, 0, 0),
+      "assignees": {"Assessor": [_person(1)], "Verifier": [_person(2)]},
+      "labels": {"labels-1", "labels-2"},
+      "object_people": [{"id": i, "type": "ObjectPerson"} for i in range(10)],
+      "custom_attribute_values": _custom_attribute_values(50),
+      "audit": {"id": 1, "type": "Audit"},
+      "resource_type": "Assessment",
+  }
+
+
+def run(name, func, number):
+  seconds = min(timeit.repeat(func, number=number, repeat=5))
+  print("{:<40} {:8.2f} us".format(name, seconds / number * 1e6))
+
+
+def main(number):
+  """Run the benchmark for all payloads."""
+  for payload in (get_control(), get_assessment()):
+    text = json_codec.dumps(payload)
+    print("{} ({} bytes)".format(payload["type"], len(text)))
+    run("encode baseline",
+        lambda: json.dumps(payload, cls=BaselineEncoder), number)
+    run("encode json_codec.dumps",
+        lambda: json_codec.dumps(payload), number)
+    run("load baseline, unread", lambda: json.loads(text), number)
+    run("load json_codec.loads_lazy, unread",
+        lambda: json_codec.loads_lazy(text), number)
+    run("load baseline + store",
+        lambda: json.dumps(json.loads(text), cls=BaselineEncoder), number)
+    run("load json_codec.loads_lazy + store",
+        lambda: json_codec.loads_lazy(text).get_text(), number)
+    run("decode baseline + access",
+        lambda: json.loads(text)["resource_type"], number)
+    run("decode json_codec.loads_lazy + access",
+        lambda: json_codec.loads_lazy(text)["resource_type"], number)
+
+
+if __name__ == "__main__":
+  main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
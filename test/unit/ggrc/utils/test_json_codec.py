@@ -0,0 +1,90 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for the JSON codec."""
+
+import datetime
+import json
+import pickle
+import unittest
+
+from ggrc.utils import json_codec
+
+
+class TestDumps(unittest.TestCase):
+  """Tests for encoding of values that JSON does not support natively."""
+
+  def test_special_types(self):
+    """Dates, sets and time deltas are converted."""
+    value = {
+        "datetime": datetime.datetime(2017, 3, 4, 5, 6, 7),
+        "date": datetime.date(2017, 3, 4),
+        "delta": datetime.timedelta(hours=1, minutes=2),
+        "set": {1},
+        "frozenset": frozenset([2]),
+    }
+    self.assertEqual(json.loads(json_codec.dumps(value)), {
+        "datetime": "2017-03-04T05:06:07",
+        "date": "2017-03-04",
+        "delta": "01:02:00",
+        "set": [1],
+        "frozenset": [2],
+    })
+
+  def test_subclasses(self):
+    """Subclasses of supported types are converted by their base type."""
+
+    class Timestamp(datetime.datetime):
+      pass
+
+    self.assertEqual(json_codec.dumps(Timestamp(2017, 3, 4, 5, 6, 7)),
+                     '"2017-03-04T05:06:07"')
+
+  def test_keyword_arguments(self):
+    """Extra arguments are passed to the encoder."""
+    self.assertEqual(json_codec.dumps({"b": 1, "a": {2}}, sort_keys=True),
+                     '{"a": [2], "b": 1}')
+
+  def test_unsupported(self):
+    """Unsupported types raise TypeError."""
+    with self.assertRaises(TypeError):
+      json_codec.dumps(object())
+
+
+class TestLazyJson(unittest.TestCase):
+  """Tests for postponed decoding of JSON objects."""
+
+  def setUp(self):
+    self.text = '{"title": "Control", "owners": [{"id": 1}]}'
+    self.value = json_codec.loads_lazy(self.text)
+
+  def test_loads_lazy(self):
+    """Only JSON objects are decoded lazily."""
+    self.assertIsInstance(self.value, json_codec.LazyJson)
+    self.assertFalse(self.value.is_parsed)
+    self.assertEqual(json_codec.loads_lazy("[1, 2]"), [1, 2])
+
+  def test_mapping(self):
+    """Lazy objects are parsed on first access and behave as dicts."""
+    self.assertEqual(self.value["title"], "Control")
+    self.assertTrue(self.value.is_parsed)
+    self.assertEqual(self.value, {"title": "Control", "owners": [{"id": 1}]})
+    self.assertEqual(self.value.get("missing", 1), 1)
+    self.value["title"] = "Changed"
+    self.assertEqual(json.loads(self.value.get_text())["title"], "Changed")
+
+  def test_unparsed_text(self):
+    """Unparsed objects keep their original text."""
+    self.assertIs(self.value.get_text(), self.text)
+    self.assertFalse(self.value.is_parsed)
+    self.assertEqual(json.loads(json_codec.dumps({"content": self.value})),
+                     {"content": json.loads(self.text)})
+
+  def test_pickle(self):
+    """Lazy objects can be stored in memcache."""
+    unpickled = pickle.loads(pickle.dumps(self.value))
+    self.assertFalse(unpickled.is_parsed)
+    self.assertEqual(unpickled, json.loads(self.text))
+    self.value["title"] = "Changed"
+    self.assertEqual(pickle.loads(pickle.dumps(self.value))["title"],
+                     "Changed")